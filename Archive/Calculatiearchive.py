@@ -7,6 +7,7 @@ if ROOT not in sys.path:
 from utils.shared import *
 import io, streamlit as st, pandas as pd, plotly.express as px, plotly.graph_objects as go
 from utils.shared import *
+from utils.facts import write_facts, DEFAULT_ROOT as POWERBI_ROOT
 
 st.set_page_config(page_title="Calculatie", page_icon="🧮", layout="wide")
 st.title("Calculatie")
@@ -141,6 +142,14 @@ out_buf.seek(0)
 st.download_button("⬇️ Download Excel", out_buf.getvalue(), f"{project}_calc.xlsx",
                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
+# append-only Parquet-dataset (RunDate/Project-partities) voor Power BI/DuckDB, i.p.v. losse CSV's per run
+if st.button("🗄️ Run toevoegen aan Power BI-dataset (Parquet)"):
+    try:
+        out=write_facts(pb)
+        st.success(f"Run {out['run_id'][:8]} toegevoegd aan {POWERBI_ROOT}: {out['rows']}")
+    except Exception as e:
+        st.error(f"Parquet-export mislukt: {e}")
+
 cols=st.columns(5)
 cols[0].download_button("CSV FactRun", pb["FactRun"].to_csv(index=False).encode("utf-8"), f"{project}_FactRun.csv","text/csv")
 cols[1].download_button("CSV FactRouting", pb["FactRouting"].to_csv(index=False).encode("utf-8"), f"{project}_FactRouting.csv","text/csv")
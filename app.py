@@ -3,15 +3,16 @@
 # Monte-Carlo, Capaciteit, Make-vs-Buy, GitHub presets, 12m prijsprojectie, PDF/Excel export.
 
 import io
+import os
 import re
 import json
 import base64
+import time
 from typing import Dict, Tuple, Optional, List
 
 import numpy as np
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
 
 import streamlit as st
 import plotly.express as px
@@ -21,6 +22,24 @@ from reportlab.lib import colors
 from reportlab.pdfgen import canvas
 from reportlab.platypus import Table, TableStyle
 
+from utils.kernel import routing_columns, bom_buy_pc, cost_kernel, capacity_kernel, cost_curve
+from utils.montecarlo import SAMPLERS, mc_converge
+from utils.cache import ResultCache, fingerprint
+from utils.calcgraph import CalcGraph
+from utils.export import write_xlsx
+from utils.makebuy import OFFER_COLS, quantity_grid, make_unit_curve, buy_unit_curve, breakeven, crossovers
+from utils.bom import BOM_TREE_COLS, is_multilevel, explode_bom, bom_unit_pc, preset_routing_loader
+from utils.feeds import FEEDS
+from utils.pricestore import PriceStore, cached_fetch, fetch_all, feed_label
+from utils.ghsync import sync_presets
+from utils.presets import load_preset
+from utils.presetlib import PresetLibrary, open_preset
+from utils.runstore import RunStore
+from utils.loading import load_matrix, load_table, overload_windows
+from utils.flowsim import simulate
+from utils.queueing import lead_time_sweep, queue_table
+from utils.sensitivity import sensitivity
+
 # ---------- App config ----------
 st.set_page_config(page_title="Maakindustrie Cost Tool", layout="wide", page_icon="🧮")
 
@@ -30,7 +49,8 @@ T = {
     "Nederlands": {
         "input": "Invoer", "project": "Project", "qty": "Aantal stuks (Q)",
         "material": "Materiaal", "netkg": "Netto gewicht per stuk (kg)",
-        "debug": "🧪 Debug Outokumpu parsing",
+        "debug": "🧪 Debug Outokumpu parsing", "offline": "📴 Offline (laatst bekende prijzen)",
+        "price_hist": "📈 Prijshistorie",
         "rvs_hdr": "RVS – Outokumpu alloy surcharge (€/ton)",
         "rvs_src": "Bron", "auto": "Automatisch (scrape)", "manual": "Handmatig",
         "manual_otk": "Handmatig: OTK surcharge (€/ton)",
@@ -44,7 +64,10 @@ T = {
         "rework_pct": "Herbewerkingskans per stuk (%)", "rework_min": "Herbewerkingsminuten/stuk (min)",
         "energy_eur_kwh": "Energiekosten (€/kWh)",
         "mc_hdr": "Monte-Carlo onzekerheid", "mc_on": "Monte-Carlo simulatie aan",
-        "iters": "Iteraties", "sd_mat": "σ materiaalprijs (%)",
+        "iters": "Iteraties (max.)", "mc_workers": "MC-processen (0 = in-proces, vaste stroom)", "sampler": "Sampler",
+        "mc_tol": "Stop bij P95 ± (%, 0 = uit)", "mc_used": "{n} van max. {m} iteraties – {s}",
+        "mc_conv": "P95 stabiel", "mc_noconv": "tolerantie niet gehaald",
+        "mc_keep": "Ruwe samples bewaren (Excel MC_samples)", "mc_err": "Foutgrens schets: ± € {e:.3f}", "sd_mat": "σ materiaalprijs (%)",
         "sd_cycle": "σ cyclustijd (%)", "sd_scrap": "σ scrap additief (abs)",
         "mvb_hdr": "Make vs Buy parameters", "buy_price": "Inkoopprijs/stuk (€)",
         "moq": "MOQ", "transport_buy": "Transport/handling (€/stuk)",
@@ -56,6 +79,8 @@ T = {
         "presets": "📂 Presets & JSON", "save_preset": "💾 Save preset (JSON)",
         "dl_preset": "⬇️ Download preset.json", "upload_preset": "Upload JSON preset",
         "gh_block": "🔗 GitHub presets laden / aanmaken",
+        "library": "📚 Presetbibliotheek", "lib_text": "Zoek (naam/project)", "lib_client": "Klant bevat",
+        "lib_procs": "Processen (allemaal)", "lib_q": "Q-bereik", "lib_open": "📂 Preset openen",
         "owner": "GitHub owner", "repo": "Repository", "folder": "Folder",
         "branch": "Branch (leeg = autodetect)", "token": "Token (alleen nodig voor schrijven of private repo)",
         "list": "📂 Lijst presets", "load": "⬇️ Preset laden", "push": "🆕 Push voorbeeldpreset naar repo",
@@ -66,20 +91,34 @@ T = {
         "bom_tpl": "⬇️ BOM sjabloon", "upload_route": "Upload Routing CSV",
         "upload_bom": "Upload BOM CSV", "replace": "Replace", "append": "Append",
         "route_editor": "Routing editor", "bom_editor": "BOM editor",
+        "bom_tree": "🌳 BOM-boom (meerlaags, kostprijs-rollup)",
         "kpi_hdr": "📊 Kostencalculatie (basis)", "mat_pc": "Materiaal €/stuk",
         "conv_total": "Conversie totaal", "buy_total": "Inkoopdelen totaal",
         "unit_cost": "Kostprijs/stuk", "mc_title": "🎲 Monte-Carlo simulatie (kostprijs/stuk)",
+        "sens_hdr": "🌪️ Gevoeligheid (tornado)", "sens_on": "Gevoeligheidsanalyse aan (ook in Excel)",
+        "sens_rel": "Verstoring ± (%)", "sens_scrap": "Scrap ± (procentpunt)", "sens_top": "Toon top",
         "cap_title": "🏭 Capaciteit & WIP", "bneck": "🔧 Bottleneck",
+        "load_hdr": "📅 Orderboek-belasting (alle orders)", "load_upload": "Orderboek CSV (Routing, Q, Due en/of Start)",
+        "load_bucket": "Bucket", "load_over": "Overbelaste periodes",
+        "flow_hdr": "⏱️ Doorlooptijd & WIP (simulatie)", "flow_lead": "Doorlooptijd deze order (dagen)",
+        "flow_date": "Verwachte levering", "flow_book": "Inclusief orderboek", "flow_wip": "WIP (orders in productie)",
+        "qm_hdr": "📈 Doorlooptijd vs Q (wachtrijmodel)", "qm_util": "Bezettingsgraad werkplaats (%)",
+        "qm_batch": "Batchgrootte × routing", "qm_book": "Bezetting per proces uit orderboek",
         "mvb_title": "🔄 Make vs Buy", "make": "MAKE", "buy": "BUY",
+        "mvb_sweep": "Breakeven over aantallen / meerdere leveranciers", "crossovers": "Omslagpunten MAKE↔BUY (Q)",
+        "staffel_hdr": "📉 Staffel (prijs per aantal)", "staffel_q": "Staffel-aantallen (komma-gescheiden)",
         "export": "📤 Export", "dl_route": "⬇️ Download Routing CSV",
         "dl_bom": "⬇️ Download BOM CSV", "gen_pdf": "📄 Genereer PDF",
-        "dl_pdf": "⬇️ Download PDF", "dl_xlsx": "⬇️ Download Excel",
-        "ready": "✅ Gereed – alle functies geactiveerd."
+        "dl_pdf": "⬇️ Download PDF", "gen_xlsx": "📊 Genereer Excel", "dl_xlsx": "⬇️ Download Excel",
+        "ready": "✅ Gereed – alle functies geactiveerd.", "graph_dbg": "⏱️ Rekengraaf (debug: tijden per knoop)",
+        "hist_hdr": "🗂️ Eerdere offertes (run-historie)", "hist_none": "Nog geen runs voor dit project.",
+        "hist_trend": "Kostprijs/stuk per maand – {m} (12 mnd)", "hist_steps": "Stapkosten van run"
     },
     "English": {
         "input": "Inputs", "project": "Project", "qty": "Quantity (Q)",
         "material": "Material", "netkg": "Net weight per piece (kg)",
-        "debug": "🧪 Debug Outokumpu parsing",
+        "debug": "🧪 Debug Outokumpu parsing", "offline": "📴 Offline (last known prices)",
+        "price_hist": "📈 Price history",
         "rvs_hdr": "Stainless – Outokumpu alloy surcharge (€/ton)",
         "rvs_src": "Source", "auto": "Automatic (scrape)", "manual": "Manual",
         "manual_otk": "Manual: OTK surcharge (€/ton)",
@@ -93,7 +132,10 @@ T = {
         "rework_pct": "Rework probability per unit (%)", "rework_min": "Rework minutes/unit (min)",
         "energy_eur_kwh": "Energy cost (€/kWh)",
         "mc_hdr": "Monte Carlo uncertainty", "mc_on": "Enable Monte Carlo",
-        "iters": "Iterations", "sd_mat": "σ material price (%)",
+        "iters": "Iterations (max)", "mc_workers": "MC processes (0 = in-process, fixed stream)", "sampler": "Sampler",
+        "mc_tol": "Stop at P95 ± (%, 0 = off)", "mc_used": "{n} of max {m} iterations – {s}",
+        "mc_conv": "P95 stable", "mc_noconv": "tolerance not reached",
+        "mc_keep": "Keep raw samples (Excel MC_samples)", "mc_err": "Sketch error bound: ± € {e:.3f}", "sd_mat": "σ material price (%)",
         "sd_cycle": "σ cycle time (%)", "sd_scrap": "σ scrap additive (abs)",
         "mvb_hdr": "Make vs Buy parameters", "buy_price": "Purchase price/unit (€)",
         "moq": "MOQ", "transport_buy": "Transport/handling (€/unit)",
@@ -105,6 +147,8 @@ T = {
         "presets": "📂 Presets & JSON", "save_preset": "💾 Save preset (JSON)",
         "dl_preset": "⬇️ Download preset.json", "upload_preset": "Upload JSON preset",
         "gh_block": "🔗 GitHub presets load / create",
+        "library": "📚 Preset library", "lib_text": "Search (name/project)", "lib_client": "Customer contains",
+        "lib_procs": "Processes (all of)", "lib_q": "Q range", "lib_open": "📂 Open preset",
         "owner": "GitHub owner", "repo": "Repository", "folder": "Folder",
         "branch": "Branch (empty = autodetect)", "token": "Token (write/private repo)",
         "list": "📂 List presets", "load": "⬇️ Load preset", "push": "🆕 Push example preset to repo",
@@ -115,15 +159,28 @@ T = {
         "bom_tpl": "⬇️ BOM template", "upload_route": "Upload Routing CSV",
         "upload_bom": "Upload BOM CSV", "replace": "Replace", "append": "Append",
         "route_editor": "Routing editor", "bom_editor": "BOM editor",
+        "bom_tree": "🌳 BOM tree (multi-level, cost roll-up)",
         "kpi_hdr": "📊 Costing (base)", "mat_pc": "Material €/unit",
         "conv_total": "Conversion total", "buy_total": "Purchased items total",
         "unit_cost": "Unit cost", "mc_title": "🎲 Monte Carlo (unit cost)",
+        "sens_hdr": "🌪️ Sensitivity (tornado)", "sens_on": "Enable sensitivity analysis (also in Excel)",
+        "sens_rel": "Perturbation ± (%)", "sens_scrap": "Scrap ± (percentage points)", "sens_top": "Show top",
         "cap_title": "🏭 Capacity & WIP", "bneck": "🔧 Bottleneck",
+        "load_hdr": "📅 Order book load (all orders)", "load_upload": "Order book CSV (Routing, Q, Due and/or Start)",
+        "load_bucket": "Bucket", "load_over": "Overload windows",
+        "flow_hdr": "⏱️ Lead time & WIP (simulation)", "flow_lead": "Lead time this order (days)",
+        "flow_date": "Expected delivery", "flow_book": "Including order book", "flow_wip": "WIP (orders in production)",
+        "qm_hdr": "📈 Lead time vs Q (queueing model)", "qm_util": "Shop utilisation (%)",
+        "qm_batch": "Batch size × routing", "qm_book": "Utilisation per process from order book",
         "mvb_title": "🔄 Make vs Buy", "make": "MAKE", "buy": "BUY",
+        "mvb_sweep": "Breakeven across quantities / multiple suppliers", "crossovers": "MAKE↔BUY crossover quantities (Q)",
+        "staffel_hdr": "📉 Price breaks (price per quantity)", "staffel_q": "Price-break quantities (comma-separated)",
         "export": "📤 Export", "dl_route": "⬇️ Download Routing CSV",
         "dl_bom": "⬇️ Download BOM CSV", "gen_pdf": "📄 Generate PDF",
-        "dl_pdf": "⬇️ Download PDF", "dl_xlsx": "⬇️ Download Excel",
-        "ready": "✅ Ready – all features enabled."
+        "dl_pdf": "⬇️ Download PDF", "gen_xlsx": "📊 Generate Excel", "dl_xlsx": "⬇️ Download Excel",
+        "ready": "✅ Ready – all features enabled.", "graph_dbg": "⏱️ Calculation graph (debug: node timings)",
+        "hist_hdr": "🗂️ Previous quotes (run history)", "hist_none": "No runs for this project yet.",
+        "hist_trend": "Unit cost per month – {m} (12 mo)", "hist_steps": "Step costs of run"
     }
 }[LANG]
 
@@ -157,220 +214,196 @@ CONTINGENCY_PCT = 0.05
 def eurton_to_eurkg(value_eur_per_ton: float) -> float:
     return (value_eur_per_ton or 0.0) / 1000.0
 
-def parse_eur_number(s: str) -> Optional[float]:
-    if not s:
-        return None
-    s = s.replace("\xa0", " ").strip()
-    m = re.search(r"([0-9][0-9\.\,\s]*)", s)
-    if not m:
-        return None
-    num = m.group(1).replace(" ", "")
-    if "," in num and "." in num:
-        last = max(num.rfind(","), num.rfind("."))
-        dec = num[last]
-        thou = "." if dec == "," else ","
-        num = num.replace(thou, "").replace(dec, ".")
-    elif "," in num:
-        parts = num.split(",")
-        if len(parts[-1]) in (1, 2):
-            num = num.replace(".", "").replace(",", ".")
-        else:
-            num = num.replace(",", "")
-    else:
-        if num.count(".") > 1:
-            num = num.replace(".", "")
-    try:
-        return float(num)
-    except Exception:
-        return None
+# ---------- prijsbronnen (utils/feeds.py) met lokale historie (utils/pricestore.py) ----------
+# Verse waarden komen direct uit de SQLite-store; pas na de TTL wordt opnieuw gescraped.
+# Offline (of bij een fout) → laatste bekende waarde. prefetch_feeds haalt alle actieve bronnen parallel op.
+FEED_STATUS: Dict[str, dict] = {}
+
+@st.cache_resource
+def price_store() -> PriceStore:
+    return PriceStore()
+
+@st.cache_resource
+def run_store() -> RunStore:
+    return RunStore()
+
+def prefetch_feeds(series: List[str], offline: bool):
+    FEED_STATUS.update(fetch_all(price_store(), {k: FEEDS[k] for k in series if k not in FEED_STATUS},
+                                 offline=offline))
+
+def _feed(series: str) -> Dict[str, float]:
+    if series not in FEED_STATUS:
+        fetch, max_age, source = FEEDS[series]
+        FEED_STATUS[series] = cached_fetch(price_store(), series, fetch, max_age, source, offline=price_offline)
+    return FEED_STATUS[series]["values"]
 
-# ---------- scrapers (cached) ----------
-@st.cache_data(ttl=60*60*3)
 def fetch_outokumpu_surcharge_eur_ton() -> Dict[str,float]:
-    url = "https://www.outokumpu.com/en/surcharges"
-    r = requests.get(url, headers=HEADERS, timeout=15)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "lxml")
-    grade_aliases = {
-        "304":["304","1.4301"], "316L":["316l","1.4404"],
-        "2205":["2205","1.4462","duplex 2205"], "2507":["2507","1.4410","super duplex"],
-        "904L":["904l","1.4539"]
-    }
-    out: Dict[str, float] = {}
-    # Tabelrijen
-    for tr in soup.find_all("tr"):
-        cells = tr.find_all(["th","td"])
-        if not cells:
-            continue
-        row_txt = " ".join(td.get_text(" ", strip=True) for td in cells)
-        low = row_txt.lower()
-        for k, als in grade_aliases.items():
-            if any(a in low for a in als):
-                euros = re.findall(r"€\s*([0-9\.\,\s]+)", row_txt)
-                if not euros:
-                    euros = re.findall(r"([0-9\.\,\s]+)\s*(?:€/t|€/ton|per ton)", row_txt, flags=re.IGNORECASE)
-                vals = [parse_eur_number(e) for e in euros]
-                vals = [v for v in vals if v is not None]
-                if vals:
-                    out[k] = max(vals)
-    # fallback regex hele tekst
-    if not out:
-        text = soup.get_text(" ", strip=True)
-        pats = {
-            "304":  r"(?:304|1\.4301)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
-            "316L": r"(?:316L|1\.4404)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
-            "2205": r"(?:2205|1\.4462)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
-            "2507": r"(?:2507|1\.4410)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
-            "904L": r"(?:904L|1\.4539)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
-        }
-        for k, pat in pats.items():
-            m = re.search(pat, text, flags=re.IGNORECASE)
-            if m:
-                v = parse_eur_number(m.group(1))
-                if v is not None:
-                    out[k] = v
-    return out
-
-@st.cache_data(ttl=60*60)
+    return _feed("otk_surcharge")
+
 def fetch_ecb_usd_eur() -> Optional[float]:
-    try:
-        r = requests.get("https://api.exchangerate.host/latest?base=USD&symbols=EUR",
-                         headers=HEADERS, timeout=10)
-        r.raise_for_status()
-        return float(r.json()["rates"]["EUR"])
-    except Exception:
-        return None
+    return _feed("fx_usd_eur").get("USD_EUR")
 
-@st.cache_data(ttl=30*60)
 def fetch_lme_via_tradingeconomics() -> Optional[float]:
-    try:
-        url = "https://tradingeconomics.com/commodity/aluminum"
-        r = requests.get(url, headers=HEADERS, timeout=12)
-        r.raise_for_status()
-        text = r.text
-        m = re.search(r'data-price="(\d{3,5}(?:\.\d{1,2})?)"', text)
-        if not m:
-            m = re.search(r'(?i)Aluminum.*?(\d{3,5}(?:\.\d{1,2})?)', text)
-        if not m:
-            return None
-        usd_per_ton = float(m.group(1))
-        fx = fetch_ecb_usd_eur() or 0.92
-        return usd_per_ton * fx
-    except Exception:
+    usd_per_ton = _feed("lme_usd_ton").get("USD_TON")
+    if usd_per_ton is None:
         return None
+    fx = fetch_ecb_usd_eur() or 0.92
+    return usd_per_ton * fx
 
 def fetch_lme_eur_ton() -> Tuple[Optional[float], str]:
     v = fetch_lme_via_tradingeconomics()
     if v:
-        return v, "TradingEconomics scrape → ECB FX"
+        return v, f"TradingEconomics scrape → ECB FX ({feed_label(FEED_STATUS['lme_usd_ton'])})"
     return None, "Geen LME online bron gevonden (fallback handmatig)"
 
 # ---------- Sidebar ----------
+# vaste keys: bij wisselen van taal verandert alleen het label, de waarden (en dus de rekengraaf) blijven staan
 st.sidebar.header(T["input"])
-project = st.sidebar.text_input(T["project"], "Demo")
-Q = st.sidebar.number_input(T["qty"], min_value=1, value=50, step=1)
-materiaal = st.sidebar.selectbox(T["material"], list(MATERIALS.keys()))
-net_kg = st.sidebar.number_input(T["netkg"], min_value=0.01, value=2.0)
+project = st.sidebar.text_input(T["project"], "Demo", key="project")
+Q = st.sidebar.number_input(T["qty"], min_value=1, value=50, step=1, key="Q")
+materiaal = st.sidebar.selectbox(T["material"], list(MATERIALS.keys()), key="materiaal")
+net_kg = st.sidebar.number_input(T["netkg"], min_value=0.01, value=2.0, key="net_kg")
 
-debug_otk = st.sidebar.checkbox(T["debug"], value=False)
+debug_otk = st.sidebar.checkbox(T["debug"], value=False, key="debug_otk")
+price_offline = st.sidebar.checkbox(T["offline"], value=False, key="price_offline")
 
 st.sidebar.subheader(T["rvs_hdr"])
-otk_mode = st.sidebar.radio(T["rvs_src"], [T["auto"], T["manual"]], horizontal=True)
-manual_otk_eur_ton = st.sidebar.number_input(T["manual_otk"], min_value=0.0, value=0.0, step=10.0)
+otk_mode = st.sidebar.radio(T["rvs_src"], ["auto", "manual"], format_func=T.get, horizontal=True, key="otk_mode")
+manual_otk_eur_ton = st.sidebar.number_input(T["manual_otk"], min_value=0.0, value=0.0, step=10.0, key="manual_otk_eur_ton")
 
 st.sidebar.subheader(T["alu_hdr"])
-lme_mode = st.sidebar.radio(T["lme_src"], [T["nasdaq"], T["manual"]], horizontal=True)
-manual_lme_eur_ton = st.sidebar.number_input(T["manual_lme"], min_value=0.0, value=2200.0, step=10.0)
-region_premium_eurkg = st.sidebar.number_input(T["region_prem"], min_value=0.0, value=0.25, step=0.01)
-conversion_adder_eurkg = st.sidebar.number_input(T["conv_add"], min_value=0.0, value=0.40, step=0.01)
+lme_mode = st.sidebar.radio(T["lme_src"], ["nasdaq", "manual"], format_func=T.get, horizontal=True, key="lme_mode")
+manual_lme_eur_ton = st.sidebar.number_input(T["manual_lme"], min_value=0.0, value=2200.0, step=10.0, key="manual_lme_eur_ton")
+region_premium_eurkg = st.sidebar.number_input(T["region_prem"], min_value=0.0, value=0.25, step=0.01, key="region_premium_eurkg")
+conversion_adder_eurkg = st.sidebar.number_input(T["conv_add"], min_value=0.0, value=0.40, step=0.01, key="conversion_adder_eurkg")
 
 # Lean
 st.sidebar.subheader(T["lean_hdr"])
-storage_days = st.sidebar.number_input(T["storage_days"], 0.0, 180.0, 0.0, 0.5)
-storage_eur_day_per_batch = st.sidebar.number_input(T["storage_cost"], 0.0, 1000.0, 0.0, 0.5)
-transport_km = st.sidebar.number_input(T["transport_km"], 0.0, 10000.0, 0.0, 1.0)
-transport_eur_km = st.sidebar.number_input(T["transport_eurkm"], 0.0, 20.0, 0.0, 0.1)
-rework_pct = st.sidebar.number_input(T["rework_pct"], 0.0, 100.0, 0.0, 0.5) / 100.0
-rework_min = st.sidebar.number_input(T["rework_min"], 0.0, 240.0, 0.0, 1.0)
-energy_eur_kwh = st.sidebar.number_input(T["energy_eur_kwh"], 0.0, 2.0, 0.20, 0.01)
+storage_days = st.sidebar.number_input(T["storage_days"], 0.0, 180.0, 0.0, 0.5, key="storage_days")
+storage_eur_day_per_batch = st.sidebar.number_input(T["storage_cost"], 0.0, 1000.0, 0.0, 0.5, key="storage_eur_day_per_batch")
+transport_km = st.sidebar.number_input(T["transport_km"], 0.0, 10000.0, 0.0, 1.0, key="transport_km")
+transport_eur_km = st.sidebar.number_input(T["transport_eurkm"], 0.0, 20.0, 0.0, 0.1, key="transport_eur_km")
+rework_pct = st.sidebar.number_input(T["rework_pct"], 0.0, 100.0, 0.0, 0.5, key="rework_pct") / 100.0
+rework_min = st.sidebar.number_input(T["rework_min"], 0.0, 240.0, 0.0, 1.0, key="rework_min")
+energy_eur_kwh = st.sidebar.number_input(T["energy_eur_kwh"], 0.0, 2.0, 0.20, 0.01, key="energy_eur_kwh")
 
 # Monte-Carlo
 st.sidebar.subheader(T["mc_hdr"])
-mc_on = st.sidebar.checkbox(T["mc_on"], value=False)
-mc_iter = st.sidebar.number_input(T["iters"], 100, 20000, 1000, step=100)
-sd_mat = st.sidebar.number_input(T["sd_mat"], 0.0, 0.5, 0.05, step=0.01)
-sd_cycle = st.sidebar.number_input(T["sd_cycle"], 0.0, 0.5, 0.08, step=0.01)
-sd_scrap = st.sidebar.number_input(T["sd_scrap"], 0.0, 0.5, 0.01, step=0.005)
+mc_on = st.sidebar.checkbox(T["mc_on"], value=False, key="mc_on")
+mc_iter = st.sidebar.number_input(T["iters"], 100, 1_000_000, 1000, step=100, key="mc_iter")
+mc_sampler = st.sidebar.selectbox(T["sampler"], SAMPLERS, index=0, key="mc_sampler",
+                                  format_func=lambda k: {"random": "Random", "antithetic": "Antithetisch",
+                                                         "lhs": "Latin hypercube", "sobol": "Sobol (QMC)"}[k])
+mc_tol = st.sidebar.number_input(T["mc_tol"], 0.0, 10.0, 0.0, step=0.1, key="mc_tol") / 100.0
+# 0 = één stroom default_rng(seed) zoals altijd; ≥ 1 = child-streams per blok (andere, wel reproduceerbare samples)
+mc_workers = st.sidebar.number_input(T["mc_workers"], 0, 64, 0, step=1, key="mc_workers")
+mc_keep = st.sidebar.checkbox(T["mc_keep"], value=False, key="mc_keep")
+sd_mat = st.sidebar.number_input(T["sd_mat"], 0.0, 0.5, 0.05, step=0.01, key="sd_mat")
+sd_cycle = st.sidebar.number_input(T["sd_cycle"], 0.0, 0.5, 0.08, step=0.01, key="sd_cycle")
+sd_scrap = st.sidebar.number_input(T["sd_scrap"], 0.0, 0.5, 0.01, step=0.005, key="sd_scrap")
+
+# Staffel
+st.sidebar.subheader(T["staffel_hdr"])
+staffel_txt = st.sidebar.text_input(T["staffel_q"], "1,10,25,50,100,250,500,1000", key="staffel_txt")
+staffel_qs = sorted({int(x) for x in re.findall(r"\d+", staffel_txt) if int(x) > 0}) or [int(Q)]
 
 # Make vs Buy
 st.sidebar.subheader(T["mvb_hdr"])
-buy_price = st.sidebar.number_input(T["buy_price"], 0.0, 1e6, 15.0)
-moq = st.sidebar.number_input(T["moq"], 1, 100000, 250)
-transport_buy = st.sidebar.number_input(T["transport_buy"], 0.0, 1e6, 0.6)
+buy_price = st.sidebar.number_input(T["buy_price"], 0.0, 1e6, 15.0, key="buy_price")
+moq = st.sidebar.number_input(T["moq"], 1, 100000, 250, key="moq")
+transport_buy = st.sidebar.number_input(T["transport_buy"], 0.0, 1e6, 0.6, key="transport_buy")
 
 # Capaciteit
 st.sidebar.subheader(T["cap_hdr"])
-hours_per_day = st.sidebar.number_input(T["hours_day"], 1.0, 24.0, 8.0, step=0.5)
+hours_per_day = st.sidebar.number_input(T["hours_day"], 1.0, 24.0, 8.0, step=0.5, key="hours_per_day")
 with st.sidebar.expander(T["cap_hdr"]):
     cap_per_process = {p: st.number_input(f"{p} (h/dag)", 0.0, 24.0, 8.0, key=f"cap_{p}") for p in MACHINE_RATES.keys()}
 
+# ---------- rekengraaf (utils/calcgraph.py) ----------
+# De berekening als benoemde knopen met gedeclareerde invoer; een rerun rekent alleen knopen opnieuw
+# waarvan de invoer veranderd is. Taal, labels en debug-vinkjes zijn géén invoer.
+if "calc_cache" not in st.session_state:
+    st.session_state["calc_cache"] = ResultCache(maxsize=64)
+calc_cache = st.session_state["calc_cache"]
+if "calc_graph" not in st.session_state:
+    st.session_state["calc_graph"] = CalcGraph(calc_cache)
+G = st.session_state["calc_graph"].rerun()
+
 # ---------- actuele materiaalprijs ----------
-def get_stainless_price_eurkg(grade_key: str) -> Tuple[float, str]:
-    base = MATERIALS[materiaal]["base_eurkg"]
-    surcharge_eurkg = 0.0
+# meldingen worden als (niveau, tekst, alleen-debug) verzameld en na de knoop getoond
+def get_stainless_price_eurkg(material: str, otk_auto: bool, manual_otk: float, notes: list) -> Tuple[float, str]:
+    base = MATERIALS[material]["base_eurkg"]
+    grade_key = OTK_GRADE_KEY.get(material, "")
+    eur_ton = manual_otk
     source = "OTK: manual (€/ton)"
-    if otk_mode == T["auto"]:
+    if otk_auto:
         try:
             data = fetch_outokumpu_surcharge_eur_ton()
-            if debug_otk:
-                st.sidebar.caption(f"OTK raw: {data}")
+            notes.append(("caption", f"OTK raw: {data}", True))
             if data and grade_key in data:
                 eur_ton = data[grade_key]
-                surcharge_eurkg = eurton_to_eurkg(eur_ton)
-                source = "OTK: scraped (€/ton)"
-            else:
-                eur_ton = manual_otk_eur_ton
-                surcharge_eurkg = eurton_to_eurkg(eur_ton)
+                source = f"OTK: scraped (€/ton, {feed_label(FEED_STATUS['otk_surcharge'])})"
         except Exception as e:
-            if debug_otk:
-                st.sidebar.warning(f"OTK scrape error: {e}")
-            eur_ton = manual_otk_eur_ton
-            surcharge_eurkg = eurton_to_eurkg(eur_ton)
-    else:
-        eur_ton = manual_otk_eur_ton
-        surcharge_eurkg = eurton_to_eurkg(eur_ton)
+            notes.append(("warning", f"OTK scrape error: {e}", True))
+    surcharge_eurkg = eurton_to_eurkg(eur_ton)
     if surcharge_eurkg > 20:
-        st.sidebar.error("OTK surcharge lijkt >20 €/kg; controleer site/decimalen.")
+        notes.append(("error", "OTK surcharge lijkt >20 €/kg; controleer site/decimalen.", False))
     return base + surcharge_eurkg, source
 
-def get_aluminium_price_eurkg() -> Tuple[float, str]:
-    if lme_mode == T["nasdaq"]:
+def get_aluminium_price_eurkg(lme_auto: bool, manual_lme: float, premium: float, conv_add: float) -> Tuple[float, str]:
+    if lme_auto:
         lme_eur_ton, src = fetch_lme_eur_ton()
         if lme_eur_ton is None:
-            lme_eur_ton = manual_lme_eur_ton
+            lme_eur_ton = manual_lme
             src = "LME: fallback manual"
     else:
-        lme_eur_ton = manual_lme_eur_ton
+        lme_eur_ton = manual_lme
         src = "LME: manual"
     lme_eurkg = eurton_to_eurkg(lme_eur_ton)
-    total = lme_eurkg + float(region_premium_eurkg) + float(conversion_adder_eurkg)
+    total = lme_eurkg + float(premium) + float(conv_add)
     return total, f"{src} + premium + conversion"
 
-def get_other_price_eurkg() -> Tuple[float, str]:
-    return MATERIALS[materiaal]["base_eurkg"], "Fixed base"
-
+def get_other_price_eurkg(material: str) -> Tuple[float, str]:
+    return MATERIALS[material]["base_eurkg"], "Fixed base"
+
+def resolve_price(material: str, otk_auto: bool, manual_otk: float, lme_auto: bool, manual_lme: float,
+                  premium: float, conv_add: float, offline: bool, tick: int) -> dict:
+    # knoop "price"; tick = TTL-venster van de actieve bronnen, zodat na de TTL opnieuw wordt opgevraagd
+    # alle automatische bronnen in één keer parallel (ook die van andere materialen: wisselen is dan direct)
+    prefetch_feeds((["otk_surcharge"] if otk_auto else []) + (["lme_usd_ton", "fx_usd_eur"] if lme_auto else []),
+                   offline)
+    kind, notes = MATERIALS[material]["kind"], []
+    if kind == "stainless":
+        price, source = get_stainless_price_eurkg(material, otk_auto, manual_otk, notes)
+    elif kind == "aluminium":
+        price, source = get_aluminium_price_eurkg(lme_auto, manual_lme, premium, conv_add)
+    else:
+        price, source = get_other_price_eurkg(material)
+    return {"price": price, "source": source, "notes": notes}
+
+otk_auto = otk_mode == "auto"; lme_auto = lme_mode == "nasdaq"
+active_ttl = [FEEDS[k][1] for k, on in (("otk_surcharge", otk_auto), ("lme_usd_ton", lme_auto)) if on]
+G.node("price", resolve_price, material=materiaal, otk_auto=otk_auto, manual_otk=manual_otk_eur_ton,
+       lme_auto=lme_auto, manual_lme=manual_lme_eur_ton, premium=region_premium_eurkg,
+       conv_add=conversion_adder_eurkg, offline=price_offline,
+       tick=int(time.time() // min(active_ttl)) if active_ttl else 0)
+# alleen het getal stroomt door naar de kostknopen; een nieuw bronlabel met dezelfde prijs rekent niets opnieuw
+G.node("mat_eurkg", lambda price: price["price"], deps=("price",))
+price_eurkg, price_source = G.get("mat_eurkg"), G.get("price")["source"]
+for level, msg, debug_only in G.get("price")["notes"]:
+    if debug_otk or not debug_only:
+        getattr(st.sidebar, level)(msg)
 kind = MATERIALS[materiaal]["kind"]
-if kind == "stainless":
-    gradekey = OTK_GRADE_KEY.get(materiaal, "")
-    price_eurkg, price_source = get_stainless_price_eurkg(gradekey)
-elif kind == "aluminium":
-    price_eurkg, price_source = get_aluminium_price_eurkg()
-else:
-    price_eurkg, price_source = get_other_price_eurkg()
 
 st.sidebar.markdown("---")
 st.sidebar.markdown(f"**{T['act_price']}: € {price_eurkg:.3f}/kg**")
 st.sidebar.caption(f"{T['source']}: {price_source}")
+hist_series = {"stainless": ("otk_surcharge", OTK_GRADE_KEY.get(materiaal)), "aluminium": ("lme_usd_ton", "USD_TON")}.get(kind)
+if hist_series:
+    hist = price_store().history(*hist_series)
+    if len(hist) > 1:
+        with st.sidebar.expander(T["price_hist"]):
+            st.line_chart(hist.set_index("time")["value"])
 
 # ---------- prijsprojectie (12m) ----------
 st.sidebar.subheader(T["forecast_hdr"])
@@ -397,6 +430,8 @@ if proj_btn:
 ROUTING_COLS = ["Step","Proces","Qty_per_parent","Cycle_min","Setup_min","Attend_pct",
                 "kWh_pc","QA_min_pc","Scrap_pct","Parallel_machines","Batch_size","Queue_days"]
 BOM_COLS = ["Part","Qty","UnitPrice","Scrap_pct"]
+# optioneel: Parent_step = Step waar deze stap in opgaat ("30" of "30;40") → routing als DAG
+ROUTING_OPTIONAL = ["Parent_step"]
 
 def routing_template_df():
     return pd.DataFrame([{
@@ -421,14 +456,16 @@ def validate_routing_csv(df: pd.DataFrame):
     if miss: return df,[f"Routing CSV mist {miss}"]
     df=_coerce_numeric(df.copy(),[c for c in ROUTING_COLS if c!="Proces"])
     df["Proces"]=df["Proces"].astype(str)
-    return df[ROUTING_COLS].sort_values("Step").reset_index(drop=True),[]
+    keep=ROUTING_COLS+[c for c in ROUTING_OPTIONAL if c in df]
+    return df[keep].sort_values("Step").reset_index(drop=True),[]
 
 def validate_bom_csv(df: pd.DataFrame):
     miss=[c for c in BOM_COLS if c not in df]
     if miss: return df,[f"BOM CSV mist {miss}"]
     df=_coerce_numeric(df.copy(),["Qty","UnitPrice","Scrap_pct"])
     df["Part"]=df["Part"].astype(str)
-    return df[BOM_COLS].reset_index(drop=True),[]
+    keep=BOM_COLS+[c for c in BOM_TREE_COLS if c in df]  # meerlaagse BOM (utils/bom.py)
+    return df[keep].reset_index(drop=True),[]
 
 # ---------- GitHub presets ----------
 def gh_get_default_branch(owner:str, repo:str, token:Optional[str]=None):
@@ -441,55 +478,6 @@ def gh_get_default_branch(owner:str, repo:str, token:Optional[str]=None):
     r.raise_for_status()
     return r.json().get("default_branch","main")
 
-@st.cache_data(ttl=300)
-def gh_list_files(owner:str, repo:str, folder:str, branch:Optional[str]=None, token:Optional[str]=None):
-    if not branch:
-        branch = gh_get_default_branch(owner, repo, token)
-    headers = {"Accept":"application/vnd.github+json"}
-    if token: headers["Authorization"]=f"Bearer {token}"
-    def _list(br):
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{folder.strip('/')}"
-        r = requests.get(url, params={"ref": br}, headers=headers, timeout=20)
-        r.raise_for_status()
-        return r.json()
-    try:
-        items = _list(branch)
-    except requests.HTTPError as e:
-        if e.response is not None and e.response.status_code==404 and branch!="master":
-            items = _list("master"); branch="master"
-        else:
-            raise
-    files = [it for it in items
-             if isinstance(it, dict) and it.get("type")=="file" and it.get("name","").lower().endswith(".json")]
-    return files, branch
-
-@st.cache_data(ttl=300)
-def gh_fetch_json(owner:str, repo:str, path:str, branch:Optional[str]=None, token:Optional[str]=None):
-    if not branch:
-        branch = gh_get_default_branch(owner, repo, token)
-    headers = {"Accept":"application/vnd.github+json"}
-    if token: headers["Authorization"]=f"Bearer {token}"
-    def _fetch(br):
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path.strip('/')}"
-        r = requests.get(url, params={"ref": br}, headers=headers, timeout=20)
-        r.raise_for_status()
-        obj = r.json()
-        if "content" in obj and obj.get("encoding")=="base64":
-            raw = base64.b64decode(obj["content"])
-            return json.loads(raw.decode("utf-8")), br
-        if "download_url" in obj and obj["download_url"]:
-            r2 = requests.get(obj["download_url"], timeout=20); r2.raise_for_status()
-            return r2.json(), br
-        raise RuntimeError("Geen content in GitHub API response.")
-    try:
-        data, used = _fetch(branch)
-    except requests.HTTPError as e:
-        if e.response is not None and e.response.status_code==404 and branch!="master":
-            data, used = _fetch("master")
-        else:
-            raise
-    return data
-
 def gh_put_file(owner:str, repo:str, branch:Optional[str], path:str, content_bytes:bytes, message:str, token:str):
     if not token:
         raise PermissionError("Token met 'repo' scope vereist voor schrijven.")
@@ -532,6 +520,38 @@ with colp2:
         except Exception as e:
             st.error(f"Kon JSON niet laden: {e}")
 
+# Bibliotheek: metadata-index (utils/presetlib.py) over presets/ + de GitHub-spiegel; JSON pas bij openen
+@st.cache_resource
+def preset_library() -> PresetLibrary:
+    return PresetLibrary()
+
+with st.expander(T["library"]):
+    lib = preset_library()
+    lib_roots = ["presets"] + ([st.session_state["gh_sync"]["dir"]] if "gh_sync" in st.session_state else [])
+    for r in lib_roots:
+        lib.refresh(r)
+    fac = lib.facets()
+    lc1, lc2, lc3 = st.columns(3)
+    lib_text = lc1.text_input(T["lib_text"], key="lib_text")
+    lib_mat = lc2.multiselect(T["material"], fac["material"], key="lib_mat")
+    lib_client = lc3.text_input(T["lib_client"], key="lib_client")
+    lc4, lc5 = st.columns(2)
+    lib_procs = lc4.multiselect(T["lib_procs"], fac["processes"], key="lib_procs")
+    q_lo, q_hi = float(fac["Q"][0]), float(fac["Q"][1])
+    q_full = (q_lo, max(q_hi, q_lo + 1.0))
+    lib_q = lc5.slider(T["lib_q"], *q_full, q_full, key="lib_q")
+    # alleen filteren als de schuif is versmald: presets zonder Q (bv. zelf opgeslagen) anders niet verbergen
+    q_range = tuple(lib_q) if (lib_q[0] > q_lo or lib_q[1] < q_full[1]) else None
+    hits = pd.concat([lib.search(r, lib_mat, lib_procs, lib_client, q_range, text=lib_text) for r in lib_roots],
+                     ignore_index=True)
+    st.dataframe(hits.drop(columns=["path"]), use_container_width=True, hide_index=True)
+    if len(hits):
+        lib_sel = st.selectbox("Preset", range(len(hits)), format_func=lambda i: hits["name"].iloc[i], key="lib_sel")
+        if st.button(T["lib_open"]):
+            _, r_df, b_df = open_preset(hits["path"].iloc[lib_sel])
+            st.session_state["routing_df"] = r_df; st.session_state["bom_buy_df"] = b_df
+            st.success(f"Preset '{hits['name'].iloc[lib_sel]}' geladen.")
+
 with st.expander(T["gh_block"]):
     owner = st.text_input(T["owner"], "gerrit0492-create")
     repo = st.text_input(T["repo"], "maakindustrie-cost-tool")
@@ -539,25 +559,25 @@ with st.expander(T["gh_block"]):
     branch_in = st.text_input(T["branch"], "")
     token = st.text_input(T["token"], type="password")
     cols = st.columns(3)
+    # "Lijst" synchroniseert de hele map naar de lokale spiegel (utils/ghsync.py); laden leest lokaal
     if cols[0].button(T["list"]):
         try:
-            files, used_branch = gh_list_files(owner, repo, folder, branch_in or None, token or None)
-            st.session_state["gh_filelist"] = files
-            st.info(f"Branch gebruikt: {used_branch}")
-            if not files:
+            sync = sync_presets(owner, repo, folder, branch_in or None, token or None)
+            st.session_state["gh_sync"] = sync
+            st.info(f"Branch gebruikt: {sync['branch']} – {sync['requests']} requests, "
+                    f"{sync['fetched']} bijgewerkt{' (ongewijzigd, 304)' if sync['not_modified'] else ''}")
+            if not sync["files"]:
                 st.warning(f"Geen JSON-bestanden in '{folder}'.")
             else:
-                st.success(f"Gevonden: {[f['name'] for f in files]}")
+                st.success(f"Gevonden: {sync['files']}")
         except Exception as e:
             st.error(f"GitHub fout: {e}")
-    files = st.session_state.get("gh_filelist", [])
-    if files:
-        names = [f['name'] for f in files]
-        sel = st.selectbox("Preset", names, key="gh_sel_name")
+    sync = st.session_state.get("gh_sync")
+    if sync and sync["files"]:
+        sel = st.selectbox("Preset", sync["files"], key="gh_sel_name")
         if st.button(T["load"]):
             try:
-                path = f"{folder}/{sel}"
-                data = gh_fetch_json(owner, repo, path, branch_in or None, token or None)
+                data = load_preset(os.path.join(sync["dir"], sel))
                 if "routing" in data: st.session_state["routing_df"] = pd.DataFrame(data["routing"])
                 if "bom_buy" in data: st.session_state["bom_buy_df"] = pd.DataFrame(data["bom_buy"])
                 st.success(f"Preset '{sel}' geladen.")
@@ -673,107 +693,112 @@ bom_view=st.data_editor(st.session_state["bom_buy_df"],key="bom_editor_widget",n
 st.session_state["bom_buy_df"]=pd.DataFrame(bom_view)
 
 # ---------- core calcs ----------
-def propagate_scrap(df: pd.DataFrame, Q: int):
-    df=df.sort_values("Step").reset_index(drop=True).copy()
-    need=float(Q); eff=[]
-    for _,r in df[::-1].iterrows():
-        scrap=float(r.get("Scrap_pct",0.0))
-        good=max(1e-9,1.0-scrap)
-        input_qty=need/good
-        eff.append(input_qty)
-        need=input_qty
-    df["Eff_Input_Qty"]=list(reversed(eff))
-    return df
-
-def lean_costs(qty_in: float, batch_size: int, energy_kwh_pc: float) -> float:
-    batches = int(np.ceil(qty_in / max(1,batch_size)))
-    cost_storage = storage_days * storage_eur_day_per_batch * batches
-    cost_transport = transport_km * transport_eur_km
-    cost_rework = rework_pct * qty_in * (rework_min/60.0) * LABOR_RATE
-    cost_energy = qty_in * energy_kwh_pc * energy_eur_kwh
-    return cost_storage + cost_transport + cost_rework + cost_energy
-
-def cost_once(routing_df: pd.DataFrame, bom_df: pd.DataFrame,
-              Q: int, net_kg: float, mat_price: float,
-              labor_rate: float = LABOR_RATE, machine_rates: Optional[Dict[str,float]] = None) -> Dict[str, float]:
-    if machine_rates is None:
-        machine_rates = MACHINE_RATES
-    mat_pc = net_kg * mat_price
-    conv_total = 0.0
-    lean_total = 0.0
-    if not routing_df.empty:
-        r=propagate_scrap(routing_df,Q)
-        for _,row in r.iterrows():
-            proc=str(row.get("Proces",""))
-            qty_in=float(row.get("Eff_Input_Qty",Q))
-            par=max(1, int(row.get("Parallel_machines",1)))
-            batch=max(1, int(row.get("Batch_size",50)))
-            batches=int(np.ceil(qty_in/batch))
-            setup_min=float(row.get("Setup_min",0.0))*batches
-            cycle_min=float(row.get("Cycle_min",0.0))*qty_in
-            qa_min=float(row.get("QA_min_pc",0.0))*qty_in
-            attend=float(row.get("Attend_pct",100.0))/100.0
-            kwh=float(row.get("kWh_pc",0.0))*qty_in
-
-            mach_rate=float(machine_rates.get(proc, labor_rate))
-            machine_min=(setup_min+cycle_min)/par
-            labor_min=(setup_min+cycle_min+qa_min)*attend
-            conv_total += (machine_min/60.0)*mach_rate + (labor_min/60.0)*labor_rate
-            conv_total += kwh * energy_eur_kwh
-            lean_total += lean_costs(qty_in=qty_in, batch_size=batch, energy_kwh_pc=0.0)
-    buy_total = 0.0
-    if not bom_df.empty:
-        b=bom_df.copy()
-        b["Line"]=b["Qty"]*b["UnitPrice"]
-        b["Line"]*= (1.0 + b.get("Scrap_pct",0.0))
-        buy_total = float(b["Line"].sum()) * Q
-    total_pc = (mat_pc*Q + conv_total + lean_total + buy_total) / Q
-    return {"mat_pc":mat_pc, "conv_total":conv_total, "lean_total":lean_total, "buy_total":buy_total, "total_pc":total_pc}
-
-res = cost_once(st.session_state["routing_df"], st.session_state["bom_buy_df"], Q, net_kg, price_eurkg)
-
-# Monte-Carlo
-def run_mc(routing_df, bom_df, Q, net_kg, mat_mu, sd_mat, sd_cycle, sd_scrap,
-           labor_rate, machine_rates, iters=1000, seed=123):
-    rng=np.random.default_rng(seed)
-    out=[]
-    r0=pd.DataFrame(routing_df); b0=pd.DataFrame(bom_df)
-    for _ in range(int(iters)):
-        mat_price=max(0.01, rng.normal(mat_mu, sd_mat*mat_mu))
-        r=r0.copy()
-        if not r.empty:
-            if "Cycle_min" in r:
-                r["Cycle_min"]=r["Cycle_min"]*(1.0+rng.normal(0.0,sd_cycle,size=len(r)))
-                r["Cycle_min"]=r["Cycle_min"].clip(lower=0.05)
-            if "Scrap_pct" in r:
-                r["Scrap_pct"]=(r["Scrap_pct"]+rng.normal(0.0,sd_scrap,size=len(r))).clip(0.0,0.35)
-        rr=cost_once(r,b0,Q,net_kg,mat_price,labor_rate,machine_rates)
-        out.append(rr["total_pc"])
-    return np.array(out)
+# lean = (energie €/kWh, opslagdagen, opslag €/dag/batch, km, €/km, rework, rework-min): de sidebar-waarden
+# die de kernel nodig heeft; als knoop-parameter onderdeel van de sleutel
+def kernel_args(lean: tuple) -> tuple:
+    # → (energie, arbeid, machinetarieven, opslag…rework-min), de argumentvolgorde van de kernels
+    return (lean[0], LABOR_RATE, MACHINE_RATES) + tuple(lean[1:])
+
+# Inkoopdelen/stuk: platte BOM of meerlaagse rollup (MAKE-onderdelen via hun preset-routing)
+def bom_pc(bom_df: pd.DataFrame, Q: int, lean: tuple) -> float:
+    return bom_unit_pc(bom_df, Q, preset_routing_loader(), kernel_args(lean))
+
+def bom_tree(bom_df: pd.DataFrame, Q: int, lean: tuple) -> dict:
+    return explode_bom(bom_df, Q, preset_routing_loader(), kernel_args(lean))
+
+def cost_once(routing: Dict[str, np.ndarray], buy: float, mat_eurkg: float, Q: int, net_kg: float,
+              lean: tuple) -> Dict[str, float]:
+    # alle stappen in één NumPy-pass (utils/kernel.py); "steps" bevat de breakdown per stap
+    return cost_kernel(routing, buy, Q, net_kg, mat_eurkg, *kernel_args(lean))
+
+# Monte-Carlo (gebatcht, utils/montecarlo.py) zónder inkoopdelen: die verschuiven elke sample met dezelfde
+# constante en worden pas in "mc_samples" opgeteld, zodat een BOM-wijziging de MC niet opnieuw draait.
+# iters is het maximum: met tol > 0 stopt de run zodra P95 stabiel is (→ {"sketch", "samples", "iters", …}).
+# Percentielen komen uit de streaming-schets (utils/quantiles.py); ruwe samples alleen met keep (Excel-export).
+def run_mc(routing, mat_eurkg, Q, net_kg, sd_mat, sd_cycle, sd_scrap, lean, iters=1000, seed=123, workers=None,
+           sampler="random", tol=0.0, keep=False):
+    return mc_converge(routing, 0.0, Q, net_kg, mat_eurkg, sd_mat, sd_cycle, sd_scrap, iters, seed,
+                       *kernel_args(lean), workers=workers, sampler=sampler, tol=tol, keep_samples=keep)
+
+def mc_stats(mc: dict, buy: float) -> Dict[str, float]:
+    # {"P50", "P50_err", "P80", …}: _err = foutgrens van de schets in €/stuk
+    return mc["sketch"].shifted(buy).summary((0.5, 0.8, 0.95))
+
+# Staffel: alle aantallen in één kernel-aanroep (utils/kernel.cost_curve)
+def price_breaks(routing: Dict[str, np.ndarray], mat_eurkg: float, bom_df: pd.DataFrame, Qs: List[int],
+                 net_kg: float, lean: tuple) -> pd.DataFrame:
+    c = cost_curve(routing, bom_buy_pc(bom_df), Qs, net_kg, mat_eurkg, *kernel_args(lean))
+    q = c["Q"]
+    if is_multilevel(bom_df):
+        # meerlaagse BOM: inkoop/stuk hangt van Q af (MAKE-subassemblies) → per staffel-aantal uitrollen
+        buy = np.array([bom_pc(bom_df, int(x), lean) for x in q])
+        c["total_pc"] = c["total_pc"] + buy - c["buy_total"]/q
+        c["buy_total"] = buy*q
+    return pd.DataFrame({"Q": q.astype(int), "Materiaal/stuk": c["mat_pc"], "Conversie/stuk": c["conv_total"]/q,
+                         "Lean/stuk": c["lean_total"]/q, "Inkoop/stuk": c["buy_total"]/q,
+                         "Kostprijs/stuk": c["total_pc"],
+                         "Verkoop/stuk": c["total_pc"]*(1+PROFIT_PCT+CONTINGENCY_PCT)})
 
 # Capaciteit
-def capacity_table(routing_df: pd.DataFrame, Q: int, hours_per_day: float, cap_per_process: dict):
-    if routing_df is None or len(routing_df)==0:
+def capacity_table(routing: Dict[str, np.ndarray], Q: int, hours_per_day: float, cap_per_process: dict):
+    if len(routing["Proces"])==0:
         return pd.DataFrame(columns=["Proces","Hours_need","Hours_cap","Util_pct","Batches","Setup_min","Cycle_min"])
-    r=propagate_scrap(routing_df.copy(),Q)
-    rows=[]
-    for _,row in r.iterrows():
-        proc=str(row["Proces"])
-        qty_in=float(row.get("Eff_Input_Qty",Q))
-        par=max(1,int(row.get("Parallel_machines",1)))
-        batch=max(1,int(row.get("Batch_size",50)))
-        batches=int(np.ceil(qty_in/batch))
-        setup_min=float(row.get("Setup_min",0.0))*batches
-        cycle_min=float(row.get("Cycle_min",0.0))*qty_in
-        machine_min=(setup_min+cycle_min)/par
-        need_h=machine_min/60.0
-        cap_h=float(cap_per_process.get(proc, hours_per_day))
-        util=(need_h/max(cap_h,1e-6)) if cap_h>0 else np.nan
-        rows.append([proc,need_h,cap_h,util,batches,setup_min,cycle_min])
-    df=pd.DataFrame(rows,columns=["Proces","Hours_need","Hours_cap","Util_pct","Batches","Setup_min","Cycle_min"])
-    df=df.groupby("Proces",as_index=False).sum(numeric_only=True)
-    df["Util_pct"]=(df["Hours_need"]/df["Hours_cap"]).replace([np.inf,-np.inf],np.nan)
-    return df.sort_values("Util_pct",ascending=False)
+    return capacity_kernel(routing, Q, hours_per_day, cap_per_process)
+
+# Make-vs-Buy sweep (utils/makebuy.py); inkoopdelen/stuk zoals bij de order-Q (cost)
+def mvb_sweep(routing, cost, mat_eurkg, offers, Q, q_max, net_kg, hours_per_day, cap_per_process, lean):
+    Qs = quantity_grid(q_max)
+    args = kernel_args(lean)
+    mk = make_unit_curve(routing, cost["buy_total"]/Q, Qs, net_kg, mat_eurkg, *args[:3], hours_per_day,
+                         cap_per_process, args[3:])
+    offers = pd.DataFrame(offers).dropna(subset=["Price","MOQ"]).fillna({"Transport":0.0,"Supplier":"?"})
+    buy_best = buy_unit_curve(Qs, offers["Price"], offers["MOQ"], offers["Transport"]).min(axis=0) if len(offers) else None
+    return Qs, mk["make_unit"], buy_best, breakeven(mk["make_unit"], Qs, offers)
+
+# Gevoeligheid: alle drivers ±, gebatcht in één kernel-pass (utils/sensitivity.py)
+def sensitivity_table(routing, buy, mat_eurkg, Q, net_kg, lean, rel, scrap_abs) -> pd.DataFrame:
+    return sensitivity(routing, buy, Q, net_kg, mat_eurkg, *kernel_args(lean), rel=rel, scrap_abs=scrap_abs)
+
+def build_excel(routing_df, bom_df, cost, staffel, capacity, trace, tree=None, mc_samples=None, mc_stats=None,
+                sens=None) -> bytes:
+    # alleen op verzoek (knop); rij-voor-rij in constant-memory modus (utils/export.py)
+    res = cost
+    sheets = [("Routing", routing_df), ("BOM_buy", bom_df)]
+    if tree is not None:
+        sheets.append(("BOM_tree", tree["parts"]))
+    sheets += [("Summary", {"Post": ["Materiaal","Conversie","Lean","Inkoopdelen","Totaal","Verkoop (incl. marge+cont.)"],
+                            "Bedrag": [res['mat_pc'], res['conv_total'], res['lean_total'], res['buy_total'], res['total_pc'],
+                                       res['total_pc']*(1+PROFIT_PCT+CONTINGENCY_PCT)]}),
+               # Traceability
+               ("Params_Trace", {k: [v] for k, v in trace.items()}),
+               ("Staffel", staffel)]
+    if not capacity.empty:
+        sheets.append(("Capacity", capacity))
+    if mc_samples is not None:
+        sheets.append(("MC_samples", {"Kostprijs/stuk": mc_samples}))
+    if mc_stats is not None:
+        sheets.append(("MC_stats", {k: [v] for k, v in mc_stats.items()}))
+    if sens is not None:
+        sheets.append(("Sensitivity", sens))
+    return write_xlsx(sheets)
+
+# ---------- knopen ----------
+routing_df, bom_df = st.session_state["routing_df"], st.session_state["bom_buy_df"]
+lean_key = (energy_eur_kwh, storage_days, storage_eur_day_per_batch, transport_km, transport_eur_km, rework_pct, rework_min)
+multilevel = is_multilevel(bom_df)
+G.node("routing", routing_columns, routing_df=routing_df)  # kolommen + DAG-plan (scrap-propagatie in de kernel)
+G.node("buy", bom_pc, bom_df=bom_df, Q=Q, lean=lean_key)
+G.node("cost", cost_once, deps=("routing", "buy", "mat_eurkg"), Q=Q, net_kg=net_kg, lean=lean_key)
+G.node("tree", bom_tree, bom_df=bom_df, Q=Q, lean=lean_key)
+G.node("mc", run_mc, deps=("routing", "mat_eurkg"), Q=Q, net_kg=net_kg, sd_mat=sd_mat, sd_cycle=sd_cycle,
+       sd_scrap=sd_scrap, lean=lean_key, iters=mc_iter, seed=123, workers=mc_workers or None, sampler=mc_sampler, tol=mc_tol,
+       keep=mc_keep)
+G.node("mc_samples", lambda mc, buy: None if mc["samples"] is None else mc["samples"] + buy, deps=("mc", "buy"))
+G.node("mc_stats", mc_stats, deps=("mc", "buy"))
+G.node("staffel", price_breaks, deps=("routing", "mat_eurkg"), bom_df=bom_df, Qs=staffel_qs, net_kg=net_kg, lean=lean_key)
+G.node("capacity", capacity_table, deps=("routing",), Q=Q, hours_per_day=hours_per_day, cap_per_process=cap_per_process)
+
+res = G.get("cost")
 
 # ---------- KPI’s ----------
 st.markdown(f"## {T['kpi_hdr']}")
@@ -788,23 +813,61 @@ fig = go.Figure(go.Pie(labels=["Materiaal","Conversie","Lean","Inkoopdelen"],
                        values=[res['mat_pc'], res['conv_total'], res['lean_total'], res['buy_total']]))
 st.plotly_chart(fig, use_container_width=True)
 
+# Meerlaagse BOM: vraag + kostprijs per (gedeeld) onderdeel
+tree = None
+if multilevel:
+    tree = G.get("tree")
+    with st.expander(T["bom_tree"]):
+        st.dataframe(tree["parts"].round(4), use_container_width=True, hide_index=True)
+        st.dataframe(tree["edges"].round(4), use_container_width=True, hide_index=True)
+
 # Monte-Carlo
 if mc_on:
     st.markdown(f"### {T['mc_title']}")
-    samples=run_mc(st.session_state["routing_df"], st.session_state["bom_buy_df"],
-                   Q, net_kg, price_eurkg, sd_mat, sd_cycle, sd_scrap,
-                   LABOR_RATE, MACHINE_RATES, iters=mc_iter, seed=123)
-    p50=float(np.percentile(samples,50)); p80=float(np.percentile(samples,80)); p95=float(np.percentile(samples,95))
+    mc_p = G.get("mc_stats"); mc_run = G.get("mc")
+    st.caption(T["mc_used"].format(n=mc_run["iters"], m=int(mc_iter), s=mc_run["sampler"])
+               + (f" – {T['mc_conv'] if mc_run['converged'] else T['mc_noconv']}" if mc_tol > 0 else ""))
     c1,c2,c3=st.columns(3)
-    c1.metric("P50", f"€ {p50:.2f}")
-    c2.metric("P80", f"€ {p80:.2f}")
-    c3.metric("P95", f"€ {p95:.2f}")
-    st.plotly_chart(px.histogram(pd.DataFrame({"Kostprijs/stuk":samples}), x="Kostprijs/stuk", nbins=40),
+    c1.metric("P50", f"€ {mc_p['P50']:.2f}", help=T["mc_err"].format(e=mc_p["P50_err"]))
+    c2.metric("P80", f"€ {mc_p['P80']:.2f}", help=T["mc_err"].format(e=mc_p["P80_err"]))
+    c3.metric("P95", f"€ {mc_p['P95']:.2f}", help=T["mc_err"].format(e=mc_p["P95_err"]))
+    # histogram uit de schets (CDF-verschillen per bin): geen samples nodig, ook niet bij 1M iteraties
+    counts, edges = mc_run["sketch"].shifted(G.get("buy")).histogram(40)
+    st.plotly_chart(px.bar(pd.DataFrame({"Kostprijs/stuk":(edges[:-1]+edges[1:])/2, "count":counts}),
+                           x="Kostprijs/stuk", y="count").update_traces(width=float(edges[1]-edges[0])),
                     use_container_width=True)
 
+# Gevoeligheid (tornado)
+with st.expander(T["sens_hdr"]):
+    sens_on = st.checkbox(T["sens_on"], value=False, key="sens_on")
+    if sens_on:
+        s1, s2, s3 = st.columns(3)
+        sens_rel = s1.slider(T["sens_rel"], 1, 50, 10, key="sens_rel") / 100.0
+        sens_scrap = s2.slider(T["sens_scrap"], 0.0, 5.0, 1.0, step=0.5, key="sens_scrap") / 100.0
+        sens_top = s3.number_input(T["sens_top"], 5, 100, 15, key="sens_top")
+        G.node("sens", sensitivity_table, deps=("routing", "buy", "mat_eurkg"), Q=Q, net_kg=net_kg, lean=lean_key,
+               rel=sens_rel, scrap_abs=sens_scrap)
+        sens = G.get("sens")
+        top = sens.head(int(sens_top)).iloc[::-1]
+        base_pc = sens.attrs.get("base_pc", res["total_pc"])
+        fig_t = go.Figure([go.Bar(y=top["Driver"], x=top["Cost_low"] - base_pc, orientation="h", name="−"),
+                           go.Bar(y=top["Driver"], x=top["Cost_high"] - base_pc, orientation="h", name="+")])
+        fig_t.update_layout(barmode="overlay", xaxis_title=f"Δ {T['unit_cost']} (€, basis {base_pc:.2f})",
+                            height=max(300, 22 * len(top) + 120))
+        st.plotly_chart(fig_t, use_container_width=True)
+        st.dataframe(sens.round(4), use_container_width=True, hide_index=True)
+        df_to_csv_download(sens, f"{project}_sensitivity.csv", "⬇️ CSV")
+
+# Staffel
+st.markdown(f"### {T['staffel_hdr']}")
+staffel_df = G.get("staffel")
+st.dataframe(staffel_df.round(2), use_container_width=True, hide_index=True)
+st.plotly_chart(px.line(staffel_df, x="Q", y=["Kostprijs/stuk","Verkoop/stuk"], markers=True, log_x=True),
+                use_container_width=True)
+
 # Capaciteit
 st.markdown(f"### {T['cap_title']}")
-cap_df = capacity_table(st.session_state["routing_df"], Q, hours_per_day, cap_per_process)
+cap_df = G.get("capacity")
 if cap_df.empty:
     st.info("Geen routingdata om capaciteit te berekenen.")
 else:
@@ -816,6 +879,76 @@ else:
     bottleneck = cap_df.sort_values("Util_pct", ascending=False).iloc[0]
     st.warning(f"{T['bneck']}: **{bottleneck['Proces']}** – {(bottleneck['Util_pct']*100):.1f}%")
 
+# Orderboek: machine-uren van alle orders per proces en dag/week (utils/loading.py); lege Routing = huidige routing
+def order_book_load(routing, orders, bucket, hours_per_day, cap_per_process):
+    presets = preset_routing_loader()
+    loader = lambda ref: routing if ref == "" else presets(ref)
+    return load_matrix(orders.assign(Routing=orders.get("Routing", "")), loader, bucket, hours_per_day, cap_per_process)
+
+order_book = None
+with st.expander(T["load_hdr"]):
+    ob_csv = st.file_uploader(T["load_upload"], type="csv", key="ob_csv")
+    ob_bucket = st.radio(T["load_bucket"], ["week", "day"], horizontal=True, key="ob_bucket")
+    if ob_csv:
+        order_book = pd.read_csv(ob_csv, dtype={"Routing": str})
+        G.node("load", order_book_load, deps=("routing",), orders=order_book,
+               bucket=ob_bucket, hours_per_day=hours_per_day, cap_per_process=cap_per_process)
+        load = G.get("load")
+        if load["Util"].size:
+            st.plotly_chart(px.imshow(load["Util"], x=pd.to_datetime(load["Buckets"]), y=list(load["Proces"]),
+                                      color_continuous_scale="RdYlGn_r", zmin=0, zmax=1.5, aspect="auto"),
+                            use_container_width=True)
+            st.markdown(f"**{T['load_over']}**")
+            st.dataframe(overload_windows(load).round(2), use_container_width=True, hide_index=True)
+            df_to_csv_download(load_table(load), "orderbook_load.csv", "⬇️ CSV")
+
+# Doorstroming (utils/flowsim.py): deze order vandaag vrijgegeven, eventueel achter het orderboek (Start = vrijgave)
+def flow_sim(routing, orders, Q, hours_per_day):
+    jobs = pd.DataFrame({"Job": ["(huidig)"], "Routing": [""], "Q": [Q], "Release": [0.0]})
+    if orders is not None:
+        start = pd.to_datetime(orders["Start"], errors="coerce") if "Start" in orders else pd.Series(pd.NaT, index=orders.index)
+        rel = ((start - pd.Timestamp.today().normalize()).dt.days).clip(lower=0).fillna(0).astype(float)
+        jobs = pd.concat([jobs, pd.DataFrame({"Job": orders.get("Order", orders.index), "Routing": orders.get("Routing", ""),
+                                              "Q": orders["Q"], "Release": rel})], ignore_index=True)
+    presets = preset_routing_loader()
+    return simulate(jobs, lambda ref: routing if ref == "" else presets(ref), hours_per_day)
+
+with st.expander(T["flow_hdr"]):
+    use_book = st.checkbox(T["flow_book"], value=order_book is not None, disabled=order_book is None, key="flow_book")
+    G.node("flow", flow_sim, deps=("routing",), orders=order_book if use_book else None, Q=Q, hours_per_day=hours_per_day)
+    flow = G.get("flow")
+    lead = float(flow["jobs"]["Lead_days"].iloc[0])
+    f1, f2 = st.columns(2)
+    f1.metric(T["flow_lead"], f"{lead:.1f}")
+    f2.metric(T["flow_date"], str(np.busday_offset(np.datetime64("today", "D"), int(np.ceil(lead)), roll="forward")))
+    st.dataframe(flow["machines"].round(3), use_container_width=True, hide_index=True)
+    if len(flow["jobs"]) > 1:
+        st.plotly_chart(px.line(flow["wip"], x="t", y="WIP", line_shape="hv", title=T["flow_wip"]), use_container_width=True)
+        st.plotly_chart(px.line(flow["queue"], x="t", y="Queue", color="Proces", line_shape="hv"), use_container_width=True)
+
+# Wachtrijmodel (utils/queueing.py): gesloten formule, dus live mee met elke schuifregelaar
+def lead_sweep(routing, Q, q_max, factors, util, default_util, hours_per_day):
+    Qs = np.unique(np.append(np.geomspace(1, max(q_max, Q), 120).round(), Q))
+    r = lead_time_sweep(routing, Qs, factors, util, default_util, hours_per_day)
+    curve = pd.DataFrame({"Q": np.tile(Qs, len(factors)), "Lead_days": r["Lead_days"].ravel(),
+                          "Batch": np.repeat([f"{f:g}×" for f in factors], Qs.size)})
+    return curve, queue_table(routing, Q, util=util, default_util=default_util, hours_per_day=hours_per_day)
+
+with st.expander(T["qm_hdr"]):
+    q1, q2 = st.columns(2)
+    qm_util = q1.slider(T["qm_util"], 0, 99, 75, key="qm_util") / 100.0
+    qm_fac = q2.multiselect(T["qm_batch"], [0.25, 0.5, 1.0, 2.0, 4.0], default=[0.5, 1.0, 2.0], key="qm_fac") or [1.0]
+    util_book = {}
+    if order_book is not None and st.checkbox(T["qm_book"], value=True, key="qm_book"):
+        util_book = {p: float(min(np.mean(u[np.isfinite(u)]), 0.99)) for p, u in zip(load["Proces"], load["Util"])}
+    G.node("queue", lead_sweep, deps=("routing",), Q=Q, q_max=int(max(1000, 4 * Q)), factors=tuple(sorted(qm_fac)), util=util_book,
+           default_util=qm_util, hours_per_day=hours_per_day)
+    curve, qtab = G.get("queue")
+    fig_lead = px.line(curve, x="Q", y="Lead_days", color="Batch", log_x=True, labels={"Batch": T["qm_batch"]})
+    fig_lead.add_vline(x=Q, line_dash="dot")
+    st.plotly_chart(fig_lead, use_container_width=True)
+    st.dataframe(qtab.round(3), use_container_width=True, hide_index=True)
+
 # Make vs Buy
 st.markdown(f"### {T['mvb_title']}")
 if Q >= moq:
@@ -834,6 +967,24 @@ cc1.metric("Make €/stuk", f"€ {make_unit:.2f}")
 cc2.metric("Buy €/stuk", f"€ {buy_unit:.2f}")
 cc3.metric("Advies", adv)
 
+# Breakeven over het hele Q-bereik, eventueel met meerdere leveranciers
+with st.expander(T["mvb_sweep"]):
+    offers_df = st.data_editor(pd.DataFrame([{"Supplier":"Offerte 1","Price":buy_price,"MOQ":moq,"Transport":transport_buy}],
+                                            columns=OFFER_COLS), key="offers_editor", num_rows="dynamic", use_container_width=True)
+    q_max = int(max(1000, 4*max(Q, moq)))
+    G.node("mvb", mvb_sweep, deps=("routing", "cost", "mat_eurkg"), offers=pd.DataFrame(offers_df), Q=Q,
+           q_max=q_max, net_kg=net_kg, hours_per_day=hours_per_day, cap_per_process=cap_per_process, lean=lean_key)
+    Qs_mvb, make_curve, buy_curve, segments = G.get("mvb")
+    st.dataframe(segments.round(2), use_container_width=True, hide_index=True)
+    xo = crossovers(segments)
+    st.caption(f"{T['crossovers']}: {', '.join(map(str, xo)) if xo else '–'}")
+    idx = np.unique(np.geomspace(1, len(Qs_mvb), 300).astype(int) - 1)
+    plot_df = pd.DataFrame({"Q": Qs_mvb[idx], "Make €/stuk": make_curve[idx]})
+    if buy_curve is not None:
+        plot_df["Buy €/stuk"] = buy_curve[idx]
+    st.plotly_chart(px.line(plot_df, x="Q", y=[c for c in plot_df.columns if c != "Q"], log_x=True),
+                    use_container_width=True)
+
 # ---------- Export ----------
 st.markdown(f"## {T['export']}")
 ccsv1, ccsv2 = st.columns(2)
@@ -866,45 +1017,68 @@ if st.button(T["gen_pdf"]):
                         ("GRID",(0,0),(-1,-1),0.5,colors.black)])
     table.setStyle(style); table.wrapOn(c, 400, 600)
     table.drawOn(c, 30, 700-20*len(data))
+    # staffel
+    y_st = 700-20*len(data)-40
+    c.setFont("Helvetica-Bold", 11); c.drawString(30, y_st, "Staffel")
+    st_data = [["Aantal","Kostprijs/stuk (€)","Verkoop/stuk (€)"]] + [
+        [f"{int(r['Q'])}", f"{r['Kostprijs/stuk']:.2f}", f"{r['Verkoop/stuk']:.2f}"] for _, r in staffel_df.iterrows()]
+    st_table = Table(st_data, colWidths=[80,125,125])
+    st_table.setStyle(style); _, st_h = st_table.wrapOn(c, 400, 600)
+    st_table.drawOn(c, 30, y_st-10-st_h)
     c.save(); buffer.seek(0)
     st.download_button(T["dl_pdf"], buffer.getvalue(), "quote.pdf", "application/pdf")
 
 # Excel
-out_buf = io.BytesIO()
-with pd.ExcelWriter(out_buf, engine="xlsxwriter") as writer:
-    st.session_state["routing_df"].to_excel(writer, index=False, sheet_name="Routing")
-    st.session_state["bom_buy_df"].to_excel(writer, index=False, sheet_name="BOM_buy")
-    pd.DataFrame([
-        {"Post":"Materiaal","Bedrag":res['mat_pc']},
-        {"Post":"Conversie","Bedrag":res['conv_total']},
-        {"Post":"Lean","Bedrag":res['lean_total']},
-        {"Post":"Inkoopdelen","Bedrag":res['buy_total']},
-        {"Post":"Totaal","Bedrag":res['total_pc']},
-        {"Post":"Verkoop (incl. marge+cont.)","Bedrag":res['total_pc']*(1+PROFIT_PCT+CONTINGENCY_PCT)}
-    ]).to_excel(writer, index=False, sheet_name="Summary")
-    # Traceability
-    pd.DataFrame([{
-        "Materiaal": materiaal, "Actuele €/kg": price_eurkg, "Bron": price_source,
-        "Energy €/kWh": energy_eur_kwh, "Storage_days": storage_days,
-        "Storage €/day/batch": storage_eur_day_per_batch, "Transport_km": transport_km,
-        "Transport €/km": transport_eur_km, "Rework_pct": rework_pct, "Rework_min": rework_min,
-        "Project": project, "Q": Q, "Net_kg": net_kg
-    }]).to_excel(writer, index=False, sheet_name="Params_Trace")
-    # Capacity
-    cap_x = capacity_table(st.session_state["routing_df"], Q, hours_per_day, cap_per_process)
-    if not cap_x.empty:
-        cap_x.to_excel(writer, index=False, sheet_name="Capacity")
-    # MC
-    if mc_on:
-        samples = run_mc(st.session_state["routing_df"], st.session_state["bom_buy_df"],
-                         Q, net_kg, price_eurkg, sd_mat, sd_cycle, sd_scrap,
-                         LABOR_RATE, MACHINE_RATES, iters=mc_iter, seed=123)
-        pd.DataFrame({"Kostprijs/stuk": samples}).to_excel(writer, index=False, sheet_name="MC_samples")
-        pd.DataFrame([{"P50":float(np.percentile(samples,50)),
-                       "P80":float(np.percentile(samples,80)),
-                       "P95":float(np.percentile(samples,95))}]).to_excel(writer, index=False, sheet_name="MC_stats")
-out_buf.seek(0)
-st.download_button(T["dl_xlsx"], out_buf.getvalue(), f"{project}_calc.xlsx",
-                   "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+trace = {
+    "Materiaal": materiaal, "Actuele €/kg": price_eurkg, "Bron": price_source,
+    "Energy €/kWh": energy_eur_kwh, "Storage_days": storage_days,
+    "Storage €/day/batch": storage_eur_day_per_batch, "Transport_km": transport_km,
+    "Transport €/km": transport_eur_km, "Rework_pct": rework_pct, "Rework_min": rework_min,
+    "Project": project, "Q": Q, "Net_kg": net_kg
+}
+G.node("excel", build_excel, deps=("cost", "staffel", "capacity") + (("tree",) if multilevel else ())
+       + (("mc_stats",) if mc_on else ()) + (("mc_samples",) if mc_on and mc_keep else ())
+       + (("sens",) if sens_on else ()),
+       routing_df=routing_df, bom_df=bom_df, trace=trace)
+# pas op verzoek: de knoop wordt alleen dan geëvalueerd (en is bij ongewijzigde invoer direct terug)
+if st.button(T["gen_xlsx"]):
+    st.download_button(T["dl_xlsx"], G.get("excel"), f"{project}_calc.xlsx",
+                       "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+# Run-historie (utils/runstore.py): elke nieuwe berekening wordt vastgelegd; de knoop draait alleen bij andere
+# invoer (of als er MC-percentielen bijkomen), dus reruns zonder wijziging schrijven niets
+def record_run(cost: dict, project: str, material: str, Q: int, net_kg: float, mat_eurkg: float, price_source: str,
+               routing_df: pd.DataFrame, bom_df: pd.DataFrame, lean: tuple, trace: dict,
+               mc_stats: Optional[dict] = None) -> str:
+    key = fingerprint(project, material, Q, net_kg, mat_eurkg, routing_df, bom_df, lean)
+    return run_store().record(key, project, material, Q, net_kg, mat_eurkg, price_source, cost,
+                              sales_pc=cost["total_pc"] * (1 + PROFIT_PCT + CONTINGENCY_PCT), mc=mc_stats,
+                              params=trace)
+
+G.node("history", record_run, deps=("cost", "mat_eurkg") + (("mc_stats",) if mc_on else ()), project=project,
+       material=materiaal, Q=Q, net_kg=net_kg, price_source=price_source, routing_df=routing_df, bom_df=bom_df,
+       lean=lean_key, trace=trace)
+run_id = G.get("history")
+with st.expander(T["hist_hdr"]):
+    prev = run_store().runs(project=project, limit=50)
+    if prev.empty:
+        st.info(T["hist_none"])
+    else:
+        money = ["mat_eurkg", "unit_cost", "sales_pc", "p50", "p95"]
+        st.dataframe(prev[["time", "material", "Q"] + money + ["price_source"]].round(dict.fromkeys(money, 2)),
+                     use_container_width=True, hide_index=True)
+        labels = {r.run_id: f"{r.time:%Y-%m-%d %H:%M} – {r.material} – Q {r.Q} – € {r.unit_cost:.2f}"
+                  for r in prev.itertuples()}
+        pick = st.selectbox(T["hist_steps"], list(labels), index=int(np.argmax(prev["run_id"].eq(run_id))),
+                            format_func=labels.get)
+        st.dataframe(run_store().steps(pick).round(2), use_container_width=True, hide_index=True)
+    trend = run_store().trend(material=materiaal, since=time.time() - 365 * 86400)
+    if len(trend) > 1:
+        st.caption(T["hist_trend"].format(m=materiaal))
+        st.plotly_chart(px.line(trend, x="period", y=["unit_cost", "unit_cost_min", "unit_cost_max"], markers=True),
+                        use_container_width=True)
 
 st.markdown(T["ready"])
+st.caption("Cache: {hits} hits / {misses} misses ({size}/{maxsize})".format(**calc_cache.stats()))
+with st.expander(T["graph_dbg"]):
+    st.dataframe(G.timings(), use_container_width=True, hide_index=True)
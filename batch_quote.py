@@ -0,0 +1,221 @@
+# batch_quote.py — headless batch-offertes over een jobbestand (CSV / JSON / JSON-lines), zonder Streamlit
+# Eén regel per offerte:
+#   id, preset (naam of pad) óf routing (+ bom) CSV-pad, material, Q, net_kg
+#   optionele overrides: mat_price (€/kg), surcharge_eur_ton, lme_eur_ton, region_premium, conv_add,
+#   energy, labor, storage_days, storage_cost, km, eur_km, rework (fractie), rework_min, hours_day,
+#   rate_<Proces> (machinetarief, bv. rate_CNC); in JSON mag dit ook onder "overrides": {...}
+#   due / start (datum) voor de orderboek-belasting (--load)
+# Gebruik:
+#   python batch_quote.py jobs.csv -o quotes.csv
+#   python batch_quote.py jobs.jsonl -o quotes.parquet --chunk 2000
+#   python batch_quote.py orders.csv -o quotes.csv --load load.csv --bucket week
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.constants import MATERIALS, MACHINE_RATES, LABOR, PROFIT, CONT
+from utils.kernel import routing_columns, bom_buy_pc, cost_kernel, capacity_arrays
+from utils.presets import load_preset, resolve_preset_path, preset_frames, normalize_bom
+from utils.bom import is_multilevel, explode_bom, preset_routing_loader
+from utils.loading import load_matrix, load_table, overload_windows
+
+try:
+    import pyarrow as pa, pyarrow.parquet as pq; HAVE_ARROW = True
+except Exception:
+    pa = pq = None; HAVE_ARROW = False
+
+OUT_COLS = ["id", "preset", "material", "Q", "net_kg", "mat_eurkg", "price_source", "mat_pc", "conv_total",
+            "lean_total", "buy_total", "total_pc", "sales_pc", "bottleneck", "util_max", "error"]
+# vaste types, zodat elk Parquet-blok hetzelfde schema heeft (ook blokken met alleen fouten)
+OUT_DTYPES = {c: "string" for c in ["id", "preset", "material", "price_source", "bottleneck", "error"]}
+OUT_DTYPES.update({c: "float64" for c in OUT_COLS if c not in OUT_DTYPES})
+OUT_DTYPES["Q"] = "Int64"
+
+# ---------- jobs inlezen (streaming) ----------
+def _clean(rec: dict) -> dict:
+    out = {}
+    for k, v in rec.items():
+        if isinstance(v, float) and math.isnan(v):
+            continue
+        out[k] = v
+    if isinstance(out.get("overrides"), dict):
+        out = {**out, **out.pop("overrides")}
+    return out
+
+def iter_jobs(path: str, chunk: int = 1000) -> Iterator[dict]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        for part in pd.read_csv(path, chunksize=chunk):
+            for rec in part.to_dict("records"):
+                yield _clean(rec)
+    elif ext in (".jsonl", ".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield _clean(json.loads(line))
+    elif ext == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for rec in (data["jobs"] if isinstance(data, dict) else data):
+            yield _clean(rec)
+    else:
+        raise ValueError(f"Onbekend jobformaat '{ext}' (csv, json, jsonl).")
+
+# ---------- routing / prijs ----------
+@lru_cache(maxsize=256)
+def load_routing(preset: Optional[str], routing: Optional[str], bom: Optional[str], preset_dir: str):
+    # per (preset/routing, bom) één keer naar kolommen; begrensd zodat geheugen vlak blijft
+    meta = {}
+    if preset:
+        meta = load_preset(resolve_preset_path(preset, preset_dir))
+        routing_df, bom_df = preset_frames(meta)
+    else:
+        routing_df = pd.read_csv(routing)
+        bom_df = normalize_bom(pd.DataFrame())
+    if bom:
+        bom_df = normalize_bom(pd.read_csv(bom))
+    # meerlaagse BOM hangt van Q af → DataFrame bewaren en per regel uitrollen
+    return routing_columns(routing_df), (bom_df if is_multilevel(bom_df) else bom_buy_pc(bom_df)), meta
+
+def material_price(material: str, job: dict):
+    if "mat_price" in job:
+        return float(job["mat_price"]), "override"
+    if material not in MATERIALS:
+        raise KeyError(f"Onbekend materiaal '{material}' (geef mat_price op).")
+    m = MATERIALS[material]
+    if m["kind"] == "stainless" and job.get("surcharge_eur_ton") is not None:
+        return m["base_eurkg"] + float(job["surcharge_eur_ton"]) / 1000.0, "base + OTK surcharge"
+    if m["kind"] == "aluminium":
+        lme = float(job.get("lme_eur_ton", 2200.0)) / 1000.0
+        return lme + float(job.get("region_premium", 0.25)) + float(job.get("conv_add", 0.40)), "LME + premium + conversion"
+    return m["base_eurkg"], "Fixed base"
+
+def quote_line(job: dict, preset_dir: str = "presets") -> dict:
+    row = {"id": job.get("id"), "preset": job.get("preset") or job.get("routing")}
+    try:
+        cols, buy_pc, meta = load_routing(job.get("preset"), job.get("routing"), job.get("bom"), preset_dir)
+        material = job.get("material") or meta.get("material")
+        Q = int(job.get("Q", meta.get("Q", 1)))
+        net_kg = float(job.get("net_kg", meta.get("net_weight", 0.0)))
+        price, src = material_price(material, job)
+        labor = float(job.get("labor", LABOR))
+        rates = {**MACHINE_RATES, **{k[5:]: float(v) for k, v in job.items() if k.startswith("rate_")}}
+        args = (float(job.get("energy", 0.2)), labor, rates,
+                float(job.get("storage_days", 0.0)), float(job.get("storage_cost", 0.0)),
+                float(job.get("km", 0.0)), float(job.get("eur_km", 0.0)),
+                float(job.get("rework", 0.0)), float(job.get("rework_min", 0.0)))
+        if isinstance(buy_pc, pd.DataFrame):
+            buy_pc = explode_bom(buy_pc, Q, preset_routing_loader(preset_dir), args)["buy_pc"]
+        res = cost_kernel(cols, buy_pc, Q, net_kg, price, *args)
+        cap = capacity_arrays(cols, Q, float(job.get("hours_day", 8.0)), {})
+        util = cap["Util_pct"]; b = int(np.nanargmax(util)) if np.isfinite(util).any() else None
+        row.update({"material": material, "Q": Q, "net_kg": net_kg, "mat_eurkg": price, "price_source": src,
+                    "mat_pc": res["mat_pc"], "conv_total": res["conv_total"], "lean_total": res["lean_total"],
+                    "buy_total": res["buy_total"], "total_pc": res["total_pc"],
+                    "sales_pc": res["total_pc"] * (1 + PROFIT + CONT),
+                    "bottleneck": None if b is None else str(cap["Proces"][b]),
+                    "util_max": None if b is None else float(util[b])})
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+# ---------- output (per chunk wegschrijven) ----------
+class ResultWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = os.path.splitext(path)[1].lower() == ".parquet"
+        self._pq = None; self._f = None; self._csv = None
+        if self.parquet and not HAVE_ARROW:
+            raise RuntimeError("Parquet-output vereist pyarrow (pip install pyarrow).")
+
+    def write(self, rows: List[dict]):
+        if not rows:
+            return
+        if self.parquet:
+            df = pd.DataFrame(rows, columns=OUT_COLS).astype(OUT_DTYPES)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pq is None:
+                self._pq = pq.ParquetWriter(self.path, table.schema)
+            self._pq.write_table(table)
+        else:
+            if self._csv is None:
+                self._f = open(self.path, "w", newline="", encoding="utf-8")
+                self._csv = csv.DictWriter(self._f, fieldnames=OUT_COLS)
+                self._csv.writeheader()
+            self._csv.writerows(rows)
+            self._f.flush()
+
+    def close(self):
+        if self._pq is not None:
+            self._pq.close()
+        if self._f is not None:
+            self._f.close()
+
+def run_batch(jobs_path: str, out_path: str, preset_dir: str = "presets", chunk: int = 1000,
+              progress: bool = True, load_path: Optional[str] = None, bucket: str = "week",
+              hours_day: float = 8.0) -> Dict[str, int]:
+    writer = ResultWriter(out_path); buf: List[dict] = []
+    done = errors = 0; t0 = time.perf_counter()
+    orders: List[tuple] = []; refs: Dict[str, tuple] = {}
+    try:
+        for job in iter_jobs(jobs_path, chunk):
+            row = quote_line(job, preset_dir)
+            errors += bool(row.get("error")); done += 1
+            buf.append(row)
+            if load_path and not row.get("error") and (job.get("due") or job.get("start")):
+                ref = str(job.get("preset") or job.get("routing"))
+                refs[ref] = (job.get("preset"), job.get("routing"), job.get("bom"))
+                orders.append((ref, row["Q"], job.get("due"), job.get("start")))
+            if len(buf) >= chunk:
+                writer.write(buf); buf = []
+                if progress:
+                    print(f"\r{done} regels ({done / (time.perf_counter() - t0):.0f}/s), {errors} fouten",
+                          end="", file=sys.stderr, flush=True)
+        writer.write(buf)
+    finally:
+        writer.close()
+    if progress:
+        print(f"\r{done} regels in {time.perf_counter() - t0:.1f}s, {errors} fouten", file=sys.stderr)
+    if load_path:
+        write_load(orders, refs, load_path, preset_dir, bucket, hours_day, progress)
+    return {"done": done, "errors": errors}
+
+def write_load(orders: List[tuple], refs: Dict[str, tuple], load_path: str, preset_dir: str, bucket: str,
+               hours_day: float, progress: bool = True):
+    # belasting per (proces, bucket) → load_path; overbelaste periodes → <load>_overload.csv
+    df = pd.DataFrame(orders, columns=["Routing", "Q", "Due", "Start"])
+    load = load_matrix(df, lambda ref: load_routing(*refs[ref], preset_dir)[0], bucket, hours_day)
+    load_table(load).to_csv(load_path, index=False)
+    over = overload_windows(load)
+    over.to_csv(os.path.splitext(load_path)[0] + "_overload.csv", index=False)
+    if progress:
+        print(f"Belasting: {len(df)} orders, {load['Util'].shape[1]} {bucket}-buckets, "
+              f"{len(over)} overbelaste periodes", file=sys.stderr)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Batch-offertes (zelfde rekenkern als de Streamlit-app).")
+    ap.add_argument("jobs", help="jobbestand: .csv, .json of .jsonl")
+    ap.add_argument("-o", "--out", required=True, help="output: .csv of .parquet")
+    ap.add_argument("--presets", default="presets", help="map met preset-JSON's")
+    ap.add_argument("--chunk", type=int, default=1000, help="regels per schrijfblok")
+    ap.add_argument("-q", "--quiet", action="store_true", help="geen voortgang tonen")
+    ap.add_argument("--load", help="orderboek-belasting per proces/bucket naar dit CSV (jobs met due/start)")
+    ap.add_argument("--bucket", choices=["day", "week"], default="week", help="bucket voor --load")
+    ap.add_argument("--hours-day", type=float, default=8.0, help="capaciteit (uren/dag per proces) voor --load")
+    a = ap.parse_args(argv)
+    stats = run_batch(a.jobs, a.out, a.presets, a.chunk, progress=not a.quiet, load_path=a.load,
+                      bucket=a.bucket, hours_day=a.hours_day)
+    return 1 if stats["errors"] and stats["errors"] == stats["done"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# benchmarks/bench_otk_parse.py — parse-tijd OTK-surcharge: huidige parser vs. de oude BeautifulSoup-versie
+# Fixtures (opgeslagen pagina's) staan in benchmarks/fixtures/:
+#   otk_surcharges_table.html  surcharges in tabelrijen (normale pad)
+#   otk_surcharges_text.html   geen tabel, alleen tekst (fallback-pad)
+# Gebruik:
+#   python benchmarks/bench_otk_parse.py            # controleert gelijke uitkomst + timing
+#   python benchmarks/bench_otk_parse.py -n 200
+
+import argparse
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.feeds import parse_otk_surcharges, parse_eur_number, OTK_ALIASES  # noqa: E402
+
+try:
+    from bs4 import BeautifulSoup; HAVE_BS4 = True
+except Exception:
+    BeautifulSoup = None; HAVE_BS4 = False
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+EXPECTED = {
+    "otk_surcharges_table.html": {"304": 1518.0, "316L": 2620.0, "2205": 2105.0, "2507": 3340.0, "904L": 4890.0},
+    "otk_surcharges_text.html": {"304": 1518.0, "316L": 2620.0, "2205": 2105.0, "2507": 3340.0, "904L": 4890.0},
+}
+
+# ---------- referentie: de oude parser (soup + per rij alle aliaslijsten + regexes) ----------
+def legacy_parse(html: str) -> dict:
+    soup = BeautifulSoup(html, "lxml")
+    out = {}
+    for tr in soup.find_all("tr"):
+        cells = tr.find_all(["th", "td"])
+        if not cells:
+            continue
+        row_txt = " ".join(td.get_text(" ", strip=True) for td in cells)
+        low = row_txt.lower()
+        for k, als in OTK_ALIASES.items():
+            if any(a in low for a in als):
+                euros = re.findall(r"€\s*([0-9\.\,\s]+)", row_txt)
+                if not euros:
+                    euros = re.findall(r"([0-9\.\,\s]+)\s*(?:€/t|€/ton|per ton)", row_txt, flags=re.IGNORECASE)
+                vals = [v for v in (parse_eur_number(e) for e in euros) if v is not None]
+                if vals:
+                    out[k] = max(vals)
+    if not out:
+        text = soup.get_text(" ", strip=True)
+        pats = {
+            "304":  r"(?:304|1\.4301)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
+            "316L": r"(?:316L|1\.4404)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
+            "2205": r"(?:2205|1\.4462)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
+            "2507": r"(?:2507|1\.4410)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
+            "904L": r"(?:904L|1\.4539)[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+)",
+        }
+        for k, pat in pats.items():
+            m = re.search(pat, text, flags=re.IGNORECASE)
+            if m:
+                v = parse_eur_number(m.group(1))
+                if v is not None:
+                    out[k] = v
+    return out
+
+def timed(fn, html: str, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(html)
+    return (time.perf_counter() - t0) / n * 1000.0
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark OTK-surcharge parser")
+    ap.add_argument("-n", type=int, default=50, help="herhalingen per fixture")
+    a = ap.parse_args(argv)
+    ok = True
+    print(f"{'fixture':<28}{'KB':>7}{'nieuw ms':>11}{'oud ms':>10}{'x':>7}")
+    for name, expected in EXPECTED.items():
+        with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+            html = f.read()
+        got = parse_otk_surcharges(html)
+        if got != expected:
+            ok = False
+            print(f"  {name}: verwacht {expected}, kreeg {got}")
+        new_ms = timed(parse_otk_surcharges, html, a.n)
+        if HAVE_BS4:
+            if legacy_parse(html) != got:
+                ok = False
+                print(f"  {name}: wijkt af van de oude parser: {legacy_parse(html)}")
+            old_ms = timed(legacy_parse, html, max(1, a.n // 5))
+            print(f"{name:<28}{len(html) / 1024:>7.0f}{new_ms:>11.2f}{old_ms:>10.2f}{old_ms / new_ms:>7.1f}")
+        else:
+            print(f"{name:<28}{len(html) / 1024:>7.0f}{new_ms:>11.2f}{'-':>10}{'-':>7}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# tests/conftest.py — lokale HTTP-stub (http.server in een thread) voor de feed- en GitHub-sync-tests
+# Een route is een lijst antwoorden: (status, body[, headers[, delay]]) of een functie(request) → zo'n tuple.
+# Elk verzoek neemt het volgende antwoord; het laatste blijft herhalen. dict/list-body → JSON.
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class Stub:
+    def __init__(self):
+        self.url = ""
+        self.routes = {}
+        self.hits = []  # (pad, {"query", "headers"})
+        self._lock = threading.Lock()
+
+    def route(self, path: str, *responses):
+        self.routes[path] = list(responses)
+
+    def count(self, path: str) -> int:
+        return sum(1 for p, _ in self.hits if p == path)
+
+    def _next(self, path: str, req: dict):
+        with self._lock:
+            self.hits.append((path, req))
+            todo = self.routes.get(path)
+            if not todo:
+                return (404, {"message": "Not Found"})
+            resp = todo.pop(0) if len(todo) > 1 else todo[0]
+        return resp(req) if callable(resp) else resp
+
+def _handler(stub: Stub):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            u = urlsplit(self.path)
+            req = {"query": {k: v[0] for k, v in parse_qs(u.query).items()}, "headers": dict(self.headers)}
+            status, body, headers, delay = (tuple(stub._next(u.path, req)) + (None, 0.0))[:4]
+            if delay:
+                time.sleep(delay)
+            data = json.dumps(body).encode() if isinstance(body, (dict, list)) else str(body or "").encode()
+            try:
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client gaf het op (timeout-test)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+@pytest.fixture
+def stub():
+    s = Stub()
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _handler(s))
+    srv.daemon_threads = True; srv.block_on_close = False
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    s.url = f"http://127.0.0.1:{srv.server_port}"
+    yield s
+    srv.shutdown(); srv.server_close()
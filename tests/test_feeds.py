@@ -0,0 +1,98 @@
+# tests/test_feeds.py — prijsbronnen + SQLite-store tegen een lokale stub-server (geen internet)
+
+import time
+from functools import partial
+
+import pytest
+
+from utils.feeds import fetch_lme_usd_ton, fetch_otk_surcharges, fetch_usd_eur, make_session
+from utils.pricestore import PriceStore, cached_fetch, fetch_all, feed_label
+
+FX = {"rates": {"EUR": 0.92}}
+OTK_HTML = ("<html><body><table><tr><th>Grade</th><th>Surcharge</th></tr>"
+            "<tr><td>1.4301 / 304</td><td>€ 1.234,50</td></tr>"
+            "<tr><td>1.4404 / 316L</td><td>€ 2.345,00</td></tr></table></body></html>")
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(str(tmp_path / "prices.sqlite"))
+
+@pytest.fixture
+def session():
+    s = make_session(retries=2, backoff=0.01)
+    s.trust_env = False  # geen proxy voor 127.0.0.1
+    return s
+
+def fx(stub, session, timeout=5.0):
+    return partial(fetch_usd_eur, f"{stub.url}/fx", timeout=timeout, session=session)
+
+def test_fetchers_parse_stub_pages(stub, session):
+    stub.route("/otk", (200, OTK_HTML)); stub.route("/te", (200, '<div data-price="2345.5"></div>'))
+    stub.route("/fx", (200, FX))
+    assert fetch_otk_surcharges(f"{stub.url}/otk", session=session) == {"304": 1234.5, "316L": 2345.0}
+    assert fetch_lme_usd_ton(f"{stub.url}/te", session=session) == {"USD_TON": 2345.5}
+    assert fetch_usd_eur(f"{stub.url}/fx", session=session) == {"USD_EUR": 0.92}
+
+def test_empty_otk_page_raises(stub, session):
+    stub.route("/otk", (200, "<html><body>onderhoud</body></html>"))
+    with pytest.raises(ValueError):
+        fetch_otk_surcharges(f"{stub.url}/otk", session=session)
+
+def test_ttl_hit_uses_store_without_network(stub, session, store):
+    store.record("fx_usd_eur", {"USD_EUR": 0.90}, "stub")
+    stub.route("/fx", (200, FX))
+    res = cached_fetch(store, "fx_usd_eur", fx(stub, session), 3600, "stub")
+    assert res["state"] == "store" and res["values"] == {"USD_EUR": 0.90}
+    assert stub.count("/fx") == 0
+
+def test_ttl_miss_fetches_live_and_records(stub, session, store):
+    store.record("fx_usd_eur", {"USD_EUR": 0.90}, "stub", ts=time.time() - 7200)
+    stub.route("/fx", (200, FX))
+    res = cached_fetch(store, "fx_usd_eur", fx(stub, session), 3600, "stub")
+    assert res["state"] == "live" and res["values"] == {"USD_EUR": 0.92}
+    assert stub.count("/fx") == 1
+    assert store.latest("fx_usd_eur")["values"] == {"USD_EUR": 0.92}
+    assert len(store.history("fx_usd_eur")) == 2
+
+def test_server_error_falls_back_to_last_good_value(stub, session, store):
+    old = time.time() - 7200
+    store.record("fx_usd_eur", {"USD_EUR": 0.90}, "stub", ts=old)
+    stub.route("/fx", (500, "kapot"))
+    res = cached_fetch(store, "fx_usd_eur", fx(stub, session), 3600, "stub")
+    assert res["state"] == "stale" and res["values"] == {"USD_EUR": 0.90} and res["ts"] == old
+    assert stub.count("/fx") == 3  # eerste poging + 2 retries
+    assert feed_label(res).startswith("laatste bekende waarde")
+
+def test_offline_never_hits_network(stub, session, store):
+    store.record("fx_usd_eur", {"USD_EUR": 0.90}, "stub", ts=time.time() - 7200)
+    stub.route("/fx", (200, FX))
+    res = cached_fetch(store, "fx_usd_eur", fx(stub, session), 3600, "stub", offline=True)
+    assert res["state"] == "stale" and res["values"] == {"USD_EUR": 0.90}
+    empty = cached_fetch(store, "lme_usd_ton", fx(stub, session), 3600, "stub", offline=True)
+    assert empty["state"] == "missing" and empty["values"] == {}
+    assert stub.count("/fx") == 0
+
+def test_missing_when_source_fails_without_history(stub, session, store):
+    stub.route("/fx", (500, "kapot"))
+    res = cached_fetch(store, "fx_usd_eur", fx(stub, session), 3600, "stub")
+    assert res["state"] == "missing" and res["ts"] is None and "stub" in res["source"]
+    assert feed_label(res) == "geen waarde"
+
+def test_retry_on_503(stub, session):
+    stub.route("/fx", (503, "druk", {"Retry-After": "0"}), (200, FX))
+    assert fetch_usd_eur(f"{stub.url}/fx", session=session) == {"USD_EUR": 0.92}
+    assert stub.count("/fx") == 2
+
+def test_fetch_all_parallel_with_one_source_timing_out(stub, store, session):
+    for p in ("/a", "/b"):
+        stub.route(p, (200, FX, None, 0.5))
+    stub.route("/slow", (200, FX, None, 3.0))
+    store.record("slow", {"USD_EUR": 0.80}, "stub", ts=time.time() - 7200)
+    feeds = {k: (partial(fetch_usd_eur, f"{stub.url}/{k}", timeout=1.0, session=session), 3600, k) for k in ("a", "b", "slow")}
+    t0 = time.perf_counter()
+    res = fetch_all(store, feeds)
+    elapsed = time.perf_counter() - t0
+    assert res["a"]["state"] == res["b"]["state"] == "live"
+    assert res["slow"]["state"] == "stale" and res["slow"]["values"] == {"USD_EUR": 0.80}
+    assert elapsed < 1.9  # parallel: ≈ timeout van de traagste bron, niet 0,5 + 0,5 + 1,0
+    assert stub.count("/slow") == 1  # session heeft retries, maar een read-timeout wordt niet herhaald
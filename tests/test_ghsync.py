@@ -0,0 +1,96 @@
+# tests/test_ghsync.py — GitHub-presetspiegel tegen een lokale contents-API-stub (ETag/304, sha-diff, reparatie)
+
+import base64
+import hashlib
+import json
+import os
+
+import pytest
+
+from utils.feeds import make_session
+from utils.ghsync import load_manifest, mirrored_files, sync_presets
+
+REPO = "/repos/acme/presets"
+LISTING = f"{REPO}/contents/presets"
+
+class FakeRepo:
+    # minimale contents-API: repo-info, map-listing en bestanden, elk met ETag (304 bij If-None-Match)
+    def __init__(self, stub):
+        self.files = {}  # naam → sha
+        self.stub = stub
+        stub.route(REPO, lambda req: self._etag(req, "repo-1", {"default_branch": "main"}))
+        stub.route(LISTING, lambda req: self._etag(req, self._listing_tag(), self._listing()))
+
+    def put(self, name: str, data: dict):
+        raw = json.dumps(data).encode()
+        sha = self.files[name] = hashlib.sha1(raw).hexdigest()
+        self.stub.route(f"{LISTING}/{name}", lambda req: self._etag(
+            req, sha, {"name": name, "sha": sha, "encoding": "base64", "content": base64.b64encode(raw).decode()}))
+
+    def delete(self, name: str):
+        self.files.pop(name)
+        self.stub.routes.pop(f"{LISTING}/{name}")
+
+    def _listing(self):
+        return [{"name": n, "type": "file", "sha": s} for n, s in sorted(self.files.items())] + \
+               [{"name": "README.md", "type": "file", "sha": "x"}, {"name": "sub", "type": "dir", "sha": "y"}]
+
+    def _listing_tag(self):
+        return "-".join(e["sha"][:6] for e in self._listing())
+
+    @staticmethod
+    def _etag(req, tag, body):
+        if req["headers"].get("If-None-Match") == f'"{tag}"':
+            return (304, "", {"ETag": f'"{tag}"'})
+        return (200, body, {"ETag": f'"{tag}"'})
+
+@pytest.fixture
+def repo(stub):
+    r = FakeRepo(stub)
+    r.put("a.json", {"Q": 10}); r.put("b.json", {"Q": 20})
+    return r
+
+@pytest.fixture
+def sync(stub, tmp_path):
+    session = make_session(retries=0); session.trust_env = False
+    return lambda: sync_presets("acme", "presets", api=stub.url, mirror_dir=str(tmp_path), session=session)
+
+def test_cold_sync_mirrors_json_files(repo, sync, tmp_path):
+    r = sync()
+    assert r["branch"] == "main" and r["files"] == ["a.json", "b.json"]
+    assert (r["fetched"], r["removed"], r["not_modified"], r["requests"]) == (2, 0, False, 4)
+    with open(os.path.join(r["dir"], "a.json")) as f:
+        assert json.load(f) == {"Q": 10}
+    assert [os.path.basename(p) for p in mirrored_files("acme", "presets", mirror_dir=str(tmp_path))] == ["a.json", "b.json"]
+    assert load_manifest("acme", "presets", str(tmp_path))["default_branch"]["value"] == "main"
+
+def test_warm_sync_is_two_304s(repo, sync, stub):
+    sync()
+    n_files = stub.count(f"{LISTING}/a.json")
+    r = sync()
+    assert r["not_modified"] and (r["fetched"], r["requests"]) == (0, 2)
+    assert stub.hits[-1][1]["headers"].get("If-None-Match")  # conditioneel gevraagd
+    assert stub.count(f"{LISTING}/a.json") == n_files
+
+def test_changed_and_deleted_files(repo, sync):
+    first = sync()
+    repo.put("a.json", {"Q": 11, "Klant": "X"}); repo.delete("b.json"); repo.put("c.json", {"Q": 30})
+    r = sync()
+    assert r["files"] == ["a.json", "c.json"] and (r["fetched"], r["removed"], r["not_modified"]) == (2, 1, False)
+    assert not os.path.exists(os.path.join(first["dir"], "b.json"))
+    with open(os.path.join(r["dir"], "a.json")) as f:
+        assert json.load(f) == {"Q": 11, "Klant": "X"}
+
+def test_missing_local_file_is_repaired(repo, sync, stub):
+    first = sync()
+    os.remove(os.path.join(first["dir"], "b.json"))
+    r = sync()
+    assert not r["not_modified"] and r["fetched"] == 1
+    listing = [h for p, h in stub.hits if p == LISTING][-1]
+    assert "If-None-Match" not in listing["headers"]  # onvolledige spiegel → onvoorwaardelijke listing
+    assert os.path.isfile(os.path.join(r["dir"], "b.json"))
+
+def test_unknown_repo_raises(stub, tmp_path):
+    session = make_session(retries=0); session.trust_env = False
+    with pytest.raises(FileNotFoundError):
+        sync_presets("acme", "nope", api=stub.url, mirror_dir=str(tmp_path), session=session)
@@ -0,0 +1,27 @@
+# tests/test_presetlib.py — presetindex: facetten, Q-filter en onleesbare bestanden
+
+import json
+import shutil
+
+import pytest
+
+from utils.presetlib import PresetLibrary
+
+@pytest.fixture
+def root(tmp_path):
+    shutil.copy("presets/duplex_lasframe.json", tmp_path)
+    (tmp_path / "saved.json").write_text(json.dumps({"project": "eigen", "routing": [{"Step": 10, "Proces": "Lassen"}]}))
+    return tmp_path
+
+def test_presets_without_q_only_drop_out_of_explicit_q_filter(root):
+    lib = PresetLibrary(":memory:"); lib.refresh(str(root))
+    assert list(lib.search(str(root))["name"]) == ["duplex_lasframe.json", "saved.json"]
+    assert list(lib.search(str(root), q_range=(1, 1000))["name"]) == ["duplex_lasframe.json"]
+
+@pytest.mark.parametrize("body", ["[1, 2, 3]", '"tekst"', '{"routing": 5}', "{kapot"])
+def test_unreadable_preset_is_skipped(root, body):
+    (root / "bad.json").write_text(body)
+    lib = PresetLibrary(":memory:")
+    assert lib.refresh(str(root))["total"] == 3
+    assert "bad.json" not in set(lib.search(str(root))["name"])
+    assert lib.search(str(root))["name"].size == 2
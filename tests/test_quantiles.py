@@ -0,0 +1,53 @@
+# tests/test_quantiles.py — streaming-kwantielschets: nauwkeurigheid, foutgrens, merge en fingerprint
+
+import numpy as np
+
+from utils.cache import fingerprint
+from utils.quantiles import QuantileSketch
+
+PS = np.array([0.01, 0.5, 0.8, 0.95, 0.99])
+
+def _sketch(x, blocks=50, exact=0):
+    s = QuantileSketch(exact=exact)
+    for b in np.array_split(x, blocks):
+        s.update(b)
+    return s
+
+def test_quantiles_within_error_bound():
+    x = np.random.default_rng(1).lognormal(0.0, 0.5, 100_000)
+    s = _sketch(x)
+    exact = np.quantile(x, PS)
+    lo, hi = s.bounds(PS)
+    assert np.all((exact >= lo) & (exact <= hi))
+    assert len(s) < 300 and s.n == x.size
+    assert (s.min, s.max) == (x.min(), x.max())
+
+def test_merge_and_shift():
+    x = np.random.default_rng(2).normal(10.0, 1.0, 40_000)
+    a, b = _sketch(x[:20_000]), _sketch(x[20_000:])
+    a.merge(b)
+    assert a.n == x.size
+    assert abs(a.quantile(0.95) - np.quantile(x, 0.95)) < 0.01
+    assert abs(a.shifted(5.0).quantile(0.5) - (a.quantile(0.5) + 5.0)) < 1e-12
+
+def test_histogram_counts_sum_to_n():
+    s = _sketch(np.random.default_rng(3).normal(size=10_000))
+    counts, edges = s.histogram(40)
+    assert edges.size == 41 and abs(counts.sum() - 10_000) < 1e-6
+
+def test_fingerprint_by_content():
+    x = np.random.default_rng(4).normal(size=5_000)
+    assert fingerprint(_sketch(x)) == fingerprint(_sketch(x))
+    assert fingerprint(_sketch(x)) != fingerprint(_sketch(x + 1e-9))
+    assert fingerprint(_sketch(x, exact=4096)) != fingerprint(_sketch(x))  # is_exact telt mee
+
+def test_small_runs_are_exact():
+    x = np.random.default_rng(5).normal(20.0, 2.0, 1000)
+    s = _sketch(x, blocks=7, exact=4096)
+    assert s.is_exact and s.summary()["P95_err"] == 0.0
+    assert np.array_equal(s.shifted(1.5).quantile([0.5, 0.8, 0.95]), np.percentile(x + 1.5, [50, 80, 95]))
+    counts, edges = s.histogram(40)
+    ref_counts, ref_edges = np.histogram(x, bins=40)
+    assert np.array_equal(counts, ref_counts) and np.array_equal(edges, ref_edges)
+    s.update(np.tile(x, 4))
+    assert not s.is_exact and s.n == 5000
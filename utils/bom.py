@@ -0,0 +1,130 @@
+# utils/bom.py — meerlaagse BOM: explosie + kostprijs-rollup met gedeelde subassemblies
+# Platte BOM_COLS blijven werken; optionele kolommen maken er een boom van:
+#   Parent     onderdeel waar deze regel in gaat (leeg = direct in het eindproduct)
+#   Source     "BUY" (UnitPrice) of "MAKE" (eigen routing, kostprijs via de kernel bij de eigen vraag)
+#   Routing    preset-naam/pad voor MAKE-onderdelen
+#   Net_kg, Mat_eurkg  materiaal van een MAKE-onderdeel
+# Elk onderdeel staat één keer in de index (ook als het onder meerdere parents hangt), dus
+# vraag en kostprijs worden per onderdeel één keer berekend, per niveau vectorieel:
+#   vraag[kind] = Σ vraag[parent] · Qty · (1 + Scrap_pct)
+#   rollup[p]   = eigen[p] + Σ Qty · (1 + Scrap_pct) · rollup[kind]
+
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.kernel import routing_columns, bom_buy_pc, cost_kernel
+from utils.routing_graph import topo_levels
+from utils.presets import load_preset, resolve_preset_path, preset_frames
+
+BOM_TREE_COLS = ["Parent", "Source", "Routing", "Net_kg", "Mat_eurkg"]
+TREE_COLS = ["Part", "Level", "Source", "Routing", "Demand", "Own_pc", "Rolled_pc", "Extended"]
+
+def _text(s: pd.Series) -> pd.Series:
+    return s.astype("string").str.strip().fillna("").astype(object)
+
+def is_multilevel(bom_df: Optional[pd.DataFrame]) -> bool:
+    if bom_df is None or len(bom_df) == 0:
+        return False
+    if "Parent" in bom_df and (_text(bom_df["Parent"]) != "").any():
+        return True
+    return "Source" in bom_df and (_text(bom_df["Source"]).str.upper() == "MAKE").any()
+
+def preset_routing_loader(preset_dir: str = "presets") -> Callable[[str], Dict[str, np.ndarray]]:
+    def load(ref: str) -> Dict[str, np.ndarray]:
+        return routing_columns(preset_frames(load_preset(resolve_preset_path(ref, preset_dir)))[0])
+    return load
+
+def _num(df: pd.DataFrame, col: str, default: float) -> np.ndarray:
+    if col not in df:
+        return np.full(len(df), default)
+    return pd.to_numeric(df[col], errors="coerce").fillna(default).to_numpy(dtype=float)
+
+def explode_bom(bom_df: pd.DataFrame, Q: float, routing_loader: Optional[Callable[[str], Dict[str, np.ndarray]]] = None,
+                kernel_args: tuple = (0.0, 0.0, {})) -> dict:
+    # kernel_args: alles na mat_price in cost_kernel (energy, labor, machine_rates, storage…, rework_min)
+    # → {"buy_pc": inkoop/stuk eindproduct, "parts": boom per onderdeel, "edges": parent→kind met bijdrage}
+    df = pd.DataFrame(bom_df).reset_index(drop=True)
+    part = _text(df["Part"]).to_numpy()
+    parent = _text(df["Parent"]).to_numpy() if "Parent" in df else np.full(len(df), "", dtype=object)
+    ok = part != ""
+    df, part, parent = df[ok].reset_index(drop=True), part[ok], parent[ok]
+    w = _num(df, "Qty", 0.0) * (1.0 + _num(df, "Scrap_pct", 0.0))
+
+    codes, names = pd.factorize(np.concatenate([part, parent[parent != ""]]))
+    n = names.size
+    pc = codes[:len(part)]
+    is_edge = parent != ""
+    child = pc[is_edge]; par = codes[len(part):]; we = w[is_edge]
+
+    # onderdeel-attributen: eerste ingevulde waarde over al zijn regels
+    attr = pd.DataFrame({"code": pc, "UnitPrice": _num(df, "UnitPrice", np.nan), "Net_kg": _num(df, "Net_kg", np.nan),
+                         "Mat_eurkg": _num(df, "Mat_eurkg", np.nan),
+                         "Source": _text(df["Source"]).str.upper().replace("", None) if "Source" in df else None,
+                         "Routing": _text(df["Routing"]).replace("", None) if "Routing" in df else None})
+    attr = attr.groupby("code").first().reindex(np.arange(n))
+    price = attr["UnitPrice"].fillna(0.0).to_numpy(dtype=float)
+    source = attr["Source"].fillna("BUY").to_numpy(dtype=object)
+    routing = attr["Routing"].to_numpy(dtype=object)
+
+    # top-level: lege Parent; parents zonder eigen regel tellen als 1× in het eindproduct
+    top = np.bincount(pc[~is_edge], weights=w[~is_edge], minlength=n)
+    orphan = np.ones(n, dtype=bool); orphan[pc] = False
+    top[orphan] = 1.0
+
+    plan = topo_levels(n, child, par, "BOM bevat een cyclus (onderdeel zit in zichzelf).")
+    level = np.empty(n, dtype=int)
+    for k, (nodes, _, _) in enumerate(plan):
+        level[nodes] = k
+    order = np.argsort(level[child], kind="stable")
+    bounds = np.searchsorted(level[child][order], np.arange(len(plan) + 1))
+    by_level = [order[bounds[k]:bounds[k + 1]] for k in range(len(plan))]
+
+    # explosie: vraag per onderdeel, niveau voor niveau naar beneden
+    demand = top * float(Q)
+    for e in by_level[1:]:
+        np.add.at(demand, child[e], demand[par[e]] * we[e])
+
+    # eigen kostprijs: BUY = UnitPrice; MAKE = kernel bij de eigen vraag (één keer per routing/vraag)
+    own = price.copy()
+    make = np.flatnonzero(source == "MAKE")
+    if make.size:
+        if routing_loader is None:
+            raise ValueError("MAKE-onderdelen in de BOM vereisen een routing_loader.")
+        netkg = attr["Net_kg"].fillna(0.0).to_numpy(dtype=float)
+        mat = attr["Mat_eurkg"].fillna(0.0).to_numpy(dtype=float)
+        cols_memo: Dict[str, Dict[str, np.ndarray]] = {}; cost_memo: Dict[tuple, float] = {}
+        for i in make:
+            ref = routing[i]
+            if ref is None:
+                raise ValueError(f"MAKE-onderdeel '{names[i]}' heeft geen Routing.")
+            if ref not in cols_memo:
+                cols_memo[ref] = routing_loader(ref)
+            q = max(1.0, float(np.ceil(demand[i] - 1e-9)))
+            key = (ref, q, netkg[i], mat[i])
+            if key not in cost_memo:
+                cost_memo[key] = cost_kernel(cols_memo[ref], 0.0, q, netkg[i], mat[i], *kernel_args)["total_pc"]
+            own[i] = cost_memo[key]
+
+    # rollup: van het diepste niveau terug naar boven
+    rolled = np.zeros(n); below = np.zeros(n)
+    for k in range(len(plan) - 1, -1, -1):
+        nodes = plan[k][0]
+        rolled[nodes] = own[nodes] + below[nodes]
+        e = by_level[k]
+        np.add.at(below, par[e], rolled[child[e]] * we[e])
+
+    parts = pd.DataFrame({"Part": names.astype(object), "Level": level, "Source": source, "Routing": routing,
+                          "Demand": demand, "Own_pc": own, "Rolled_pc": rolled, "Extended": demand * own},
+                         columns=TREE_COLS).sort_values(["Level", "Part"], kind="stable").reset_index(drop=True)
+    edges = pd.DataFrame({"Parent": names[par].astype(object), "Part": names[child].astype(object), "Qty_eff": we,
+                          "Rolled_pc": rolled[child], "Contribution": we * rolled[child]})
+    return {"buy_pc": float(top @ rolled), "parts": parts, "edges": edges}
+
+def bom_unit_pc(bom_df: Optional[pd.DataFrame], Q: float, routing_loader: Optional[Callable[[str], Dict[str, np.ndarray]]] = None,
+                kernel_args: tuple = (0.0, 0.0, {})) -> float:
+    # platte BOM: Σ Qty·UnitPrice·(1+Scrap_pct); meerlaags (Parent/MAKE): rollup bij deze Q
+    if not is_multilevel(bom_df):
+        return bom_buy_pc(bom_df)
+    return explode_bom(bom_df, Q, routing_loader, kernel_args)["buy_pc"]
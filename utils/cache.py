@@ -0,0 +1,79 @@
+# utils/cache.py — resultaat-cache op basis van een content-hash (fingerprint)
+# Sleutel = hash van routing/BOM-DataFrames + alle scalaire parameters, zodat identieke
+# berekeningen binnen (en tussen) Streamlit-reruns maar één keer worden uitgevoerd.
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+def _feed(h, obj: Any):
+    if isinstance(obj, pd.DataFrame):
+        h.update(b"df"); h.update(repr((list(map(str, obj.columns)), list(map(str, obj.dtypes)))).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(b"s"); h.update(str(obj.name).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(b"nd"); h.update(repr((obj.dtype.str, obj.shape)).encode())
+        h.update(obj.tobytes() if obj.dtype != object else repr(obj.tolist()).encode())
+    elif callable(getattr(obj, "__fingerprint__", None)):
+        # eigen objecten (bv. QuantileSketch) leveren zelf hun inhoud: gelijke inhoud → gelijke sleutel
+        h.update(b"fp"); h.update(type(obj).__name__.encode())
+        _feed(h, obj.__fingerprint__())
+    elif isinstance(obj, (bytes, bytearray)):
+        h.update(b"b"); h.update(bytes(obj))
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for k in sorted(obj, key=repr):
+            _feed(h, k); _feed(h, obj[k])
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"(")
+        for x in obj:
+            _feed(h, x)
+        h.update(b")")
+    else:
+        h.update(type(obj).__name__.encode()); h.update(repr(obj).encode())
+
+def fingerprint(*parts: Any) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        _feed(h, p)
+    return h.hexdigest()
+
+class ResultCache:
+    # begrensde LRU met hit/miss-tellers
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_or_compute(self, key: str, fn: Callable[[], Any]) -> Any:
+        if key in self._data:
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+        self.misses += 1
+        val = fn()
+        self._data[key] = val
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return val
+
+    def call(self, fn: Callable, *args, extra: Any = (), **kwargs) -> Any:
+        # extra: waarden die fn impliciet gebruikt (globals), maar niet als argument krijgt
+        key = fingerprint(getattr(fn, "__qualname__", repr(fn)), args, kwargs, extra)
+        return self.get_or_compute(key, lambda: fn(*args, **kwargs))
+
+    def clear(self):
+        self._data.clear(); self.hits = 0; self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
@@ -0,0 +1,74 @@
+# utils/calcgraph.py — rekengraaf voor de Streamlit-rerun: benoemde knopen met expliciete invoer
+# Een knoop = naam + functie + deps (andere knopen) + params (scalars/DataFrames van deze rerun).
+# Sleutel = fingerprint(naam, params, waarde-fingerprints van de deps); alleen bij een andere sleutel
+# wordt de functie opnieuw uitgevoerd, anders blijft het vorige resultaat staan. Een knoop die na
+# herberekening hetzelfde oplevert (bv. prijs na TTL) laat zijn afnemers dus ongemoeid.
+# Lazy: get() rekent alleen wat (transitief) gevraagd wordt. Met een ResultCache eronder zijn ook
+# eerdere sleutels (heen-en-weer schakelen) direct terug. Bewust zonder streamlit-import.
+
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import pandas as pd
+
+from utils.cache import ResultCache, fingerprint
+
+TIMING_COLS = ["Node", "Deps", "Status", "ms", "Runs"]
+
+class CalcGraph:
+    def __init__(self, cache: Optional[ResultCache] = None):
+        self.cache = cache
+        self._nodes: Dict[str, tuple] = {}   # naam → (fn, deps, params)
+        self._last: Dict[str, dict] = {}     # naam → {"key", "vkey", "value", "ms", "status", "runs"}
+        self._checked: set = set()           # knopen die in deze rerun al gecontroleerd zijn
+
+    def rerun(self) -> "CalcGraph":
+        # begin van een Streamlit-rerun: alle knopen opnieuw controleren (niet herberekenen)
+        self._checked.clear()
+        return self
+
+    def node(self, name: str, fn: Callable[..., Any], deps: Sequence[str] = (), **params) -> "CalcGraph":
+        # (her)definieert een knoop; fn krijgt de waarden van deps + params als keyword-argumenten
+        self._nodes[name] = (fn, tuple(deps), params)
+        self._invalidate(name)
+        return self
+
+    def _invalidate(self, name: str):
+        todo = [name]
+        while todo:
+            n = todo.pop()
+            if n in self._checked:
+                self._checked.discard(n)
+                todo += [m for m, (_, deps, _) in self._nodes.items() if n in deps]
+
+    def get(self, name: str) -> Any:
+        if name in self._checked:
+            return self._last[name]["value"]
+        fn, deps, params = self._nodes[name]
+        args = {d: self.get(d) for d in deps}
+        key = fingerprint(name, params, [self._last[d]["vkey"] for d in deps])
+        last = self._last.get(name)
+        if last is not None and last["key"] == key:
+            last.update(status="reused", ms=0.0)
+        else:
+            t0 = time.perf_counter(); computed = []
+            def run():
+                computed.append(True)
+                return fn(**args, **params)
+            value = self.cache.get_or_compute(key, run) if self.cache is not None else run()
+            ms = (time.perf_counter() - t0) * 1000.0
+            runs = (last["runs"] if last else 0) + bool(computed)
+            self._last[name] = last = {"key": key, "vkey": fingerprint(value), "value": value, "ms": ms,
+                                       "status": "computed" if computed else "cached", "runs": runs}
+        self._checked.add(name)
+        return last["value"]
+
+    def timings(self) -> pd.DataFrame:
+        # debugpaneel: status van deze rerun per knoop (niet-gevraagde knopen: "idle")
+        rows = []
+        for name, (_, deps, _) in self._nodes.items():
+            last = self._last.get(name)
+            fresh = name in self._checked and last is not None
+            rows.append({"Node": name, "Deps": ", ".join(deps), "Status": last["status"] if fresh else "idle",
+                         "ms": round(last["ms"], 2) if fresh else 0.0, "Runs": last["runs"] if last else 0})
+        return pd.DataFrame(rows, columns=TIMING_COLS)
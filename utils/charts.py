@@ -0,0 +1,82 @@
+# utils/charts.py — grafieken voor de PDF-rapportage
+# Twee paden:
+#   - afbeelding: plotly-figuur → PNG via kaleido (headless browser per figuur); gecachet op een hash van de
+#     figuur-spec (JSON) + afmetingen, dus een PDF opnieuw maken na een tekstwijziging rendert niets opnieuw;
+#   - vector: dezelfde eenvoudige grafieken (taart, staaf, lijn, histogram) direct met reportlab.graphics,
+#     zonder browserproces en scherp op elk zoomniveau.
+# Bewust zonder streamlit/plotly-import; figuren worden alleen als object doorgegeven.
+
+from typing import List, Sequence
+
+import numpy as np
+from reportlab.graphics import renderPDF
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib import colors
+
+from utils.cache import ResultCache, fingerprint
+
+PNG_CACHE = ResultCache(maxsize=32)
+# plotly-standaardkleuren, zodat vector- en afbeeldingspad er hetzelfde uitzien
+PALETTE = [colors.HexColor(c) for c in ("#636EFA", "#EF553B", "#00CC96", "#AB63FA", "#FFA15A", "#19D3F3")]
+
+# ---------- afbeelding (kaleido), gecachet ----------
+def fig_png(fig, width: int = 900, height: int = 600, scale: float = 1) -> bytes:
+    key = fingerprint("png", fig.to_json(), width, height, scale)
+    return PNG_CACHE.get_or_compute(key, lambda: fig.to_image(format="png", width=width, height=height, scale=scale))
+
+# ---------- vector (reportlab) ----------
+def pie_drawing(labels: Sequence[str], values: Sequence[float], w: float = 520, h: float = 360) -> Drawing:
+    d = Drawing(w, h)
+    vals = [max(0.0, float(v)) for v in values]
+    keep = [i for i, v in enumerate(vals) if v > 0] or list(range(len(vals)))
+    total = sum(vals) or 1.0
+    p = Pie()
+    size = min(w, h) - 80
+    p.x, p.y, p.width, p.height = (w - size) / 2, (h - size) / 2, size, size
+    p.data = [vals[i] or 1e-9 for i in keep]
+    p.labels = [f"{labels[i]} {vals[i] / total:.0%}" for i in keep]
+    p.sideLabels = True
+    p.slices.strokeColor = colors.white
+    for k in range(len(keep)):
+        p.slices[k].fillColor = PALETTE[k % len(PALETTE)]
+    d.add(p)
+    return d
+
+def bar_drawing(categories: Sequence[str], values: Sequence[float], w: float = 520, h: float = 360,
+                pct: bool = False, label_every: int = 1) -> Drawing:
+    # pct: waarden zijn fracties → as in %
+    d = Drawing(w, h)
+    vals = [0.0 if not np.isfinite(v) else float(v) * (100.0 if pct else 1.0) for v in values]
+    b = VerticalBarChart()
+    b.x, b.y, b.width, b.height = 50, 40, w - 70, h - 60
+    b.data = [vals]
+    b.categoryAxis.categoryNames = [str(c) if i % label_every == 0 else "" for i, c in enumerate(categories)]
+    b.categoryAxis.labels.fontSize = 7
+    b.valueAxis.valueMin = min(0.0, min(vals, default=0.0))
+    b.valueAxis.labelTextFormat = "%d%%" if pct else None
+    b.bars[0].fillColor = PALETTE[0]
+    b.bars.strokeColor = None
+    b.barSpacing = 0 if label_every > 1 else 2
+    d.add(b)
+    return d
+
+def line_drawing(x: Sequence[float], y: Sequence[float], w: float = 520, h: float = 360) -> Drawing:
+    d = Drawing(w, h)
+    lp = LinePlot()
+    lp.x, lp.y, lp.width, lp.height = 50, 40, w - 70, h - 60
+    lp.data = [list(zip(map(float, x), map(float, y)))]
+    lp.lines[0].strokeColor = PALETTE[0]
+    lp.lines[0].strokeWidth = 2
+    d.add(lp)
+    return d
+
+def hist_drawing(samples: np.ndarray, bins: int = 40, w: float = 520, h: float = 360) -> Drawing:
+    counts, edges = np.histogram(np.asarray(samples, dtype=float), bins=bins)
+    mids: List[str] = [f"{m:.2f}" for m in (edges[:-1] + edges[1:]) / 2]
+    return bar_drawing(mids, counts, w, h, label_every=max(1, bins // 8))
+
+def draw_vector(c, drawing: Drawing, x: float, y: float):
+    renderPDF.draw(drawing, c, x, y)
@@ -0,0 +1,25 @@
+# utils/constants.py — materialen, tarieven en kolommen (zonder streamlit, ook voor CLI/batch)
+HEADERS={"User-Agent":"Mozilla/5.0 (CostTool/1.0)","Accept-Language":"en-US,en;q=0.9,nl;q=0.8"}
+
+MATERIALS = {
+    "SS304":{"base_eurkg":2.8,"kind":"stainless"},
+    "SS316L":{"base_eurkg":3.4,"kind":"stainless"},
+    "1.4462_Duplex":{"base_eurkg":4.2,"kind":"stainless"},
+    "SuperDuplex_2507":{"base_eurkg":5.4,"kind":"stainless"},
+    "SS904L":{"base_eurkg":6.1,"kind":"stainless"},
+    "Al_6082":{"base_eurkg":0.0,"kind":"aluminium"},
+    "Extruded_Al_6060":{"base_eurkg":0.0,"kind":"aluminium"},
+    "Cast_Aluminium":{"base_eurkg":0.0,"kind":"aluminium"},
+    "S235JR_steel":{"base_eurkg":1.4,"kind":"other"},
+    "S355J2_steel":{"base_eurkg":1.7,"kind":"other"},
+    "C45":{"base_eurkg":1.9,"kind":"other"},
+    "42CrMo4":{"base_eurkg":2.6,"kind":"other"},
+    "Cu_ECW":{"base_eurkg":8.0,"kind":"other"},
+}
+OTK_KEY={"SS304":"304","SS316L":"316L","1.4462_Duplex":"2205","SuperDuplex_2507":"2507","SS904L":"904L"}
+
+MACHINE_RATES={"CNC":85.0,"Laser":110.0,"Lassen":55.0,"Buigen":75.0,"Montage":40.0,"Casting":65.0}
+LABOR=45.0; PROFIT=0.12; CONT=0.05
+
+ROUTING_COLS=["Step","Proces","Qty_per_parent","Cycle_min","Setup_min","Attend_pct","kWh_pc","QA_min_pc","Scrap_pct","Parallel_machines","Batch_size","Queue_days"]
+BOM_COLS=["Part","Qty","UnitPrice","Scrap_pct"]
@@ -0,0 +1,69 @@
+# utils/export.py — Excel-export in constant-memory (streaming) modus van xlsxwriter
+# Elke sheet wordt rij voor rij weggeschreven; xlsxwriter houdt dan maar één rij in het geheugen.
+# Bronnen: DataFrames of {kolom: array}-dicts (bv. 20k+ MC-samples) — zonder extra DataFrame-kopieën:
+# kolommen worden per blok naar Python-waarden omgezet en direct als rijen geschreven.
+# Bewust zonder streamlit-import, zodat ook CLI/batch-code dit kan gebruiken.
+
+import io
+import math
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+Sheet = Union[pd.DataFrame, dict]
+ROW_BLOCK = 4096  # rijen per omzet-blok (kolom → Python-lijst)
+
+def _cell(v: Any) -> Any:
+    # NaN/inf/NA → lege cel (xlsxwriter weigert NaN/inf), numpy-scalars → Python
+    if v is None or v is pd.NA or v is pd.NaT:
+        return None
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float):
+        return v if math.isfinite(v) else None
+    if isinstance(v, (int, str, bool, datetime)):
+        return v
+    return str(v)
+
+def _column_blocks(col, rows: int) -> Iterator[list]:
+    a = col.to_numpy() if isinstance(col, pd.Series) else np.asarray(col)
+    is_dt = np.issubdtype(a.dtype, np.datetime64)
+    for start in range(0, len(a), rows):
+        part = a[start:start + rows]
+        yield list(pd.DatetimeIndex(part).to_pydatetime()) if is_dt else part.tolist()
+
+def sheet_rows(data: Sheet, rows: int = ROW_BLOCK) -> Tuple[List[str], Iterator[tuple]]:
+    # → (kopregel, rij-iterator) zonder de kolommen te kopiëren
+    if isinstance(data, pd.DataFrame):
+        header, cols = [str(c) for c in data.columns], [data.iloc[:, i] for i in range(data.shape[1])]
+    else:
+        header, cols = [str(c) for c in data], list(data.values())
+    def gen():
+        for blocks in zip(*(_column_blocks(c, rows) for c in cols)):
+            yield from zip(*blocks)
+    return header, gen()
+
+def write_xlsx(sheets: Iterable[Tuple[str, Sheet]], target=None) -> bytes:
+    # sheets: (naam, DataFrame | {kolom: array}); target: pad of buffer (None → bytes terug)
+    buf = io.BytesIO() if target is None else target
+    wb = xlsxwriter.Workbook(buf, {"constant_memory": True, "in_memory": False, "remove_timezone": True})
+    head_fmt = wb.add_format({"bold": True, "border": 1})
+    date_fmt = wb.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    for name, data in sheets:
+        ws = wb.add_worksheet(name[:31])
+        header, rows = sheet_rows(data)
+        ws.write_row(0, 0, header, head_fmt)
+        for r, row in enumerate(rows, start=1):
+            for c, v in enumerate(row):
+                v = _cell(v)
+                if v is None:
+                    continue
+                if isinstance(v, datetime):
+                    ws.write_datetime(r, c, v, date_fmt)
+                else:
+                    ws.write(r, c, v)
+    wb.close()
+    return buf.getvalue() if target is None else b""
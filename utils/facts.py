@@ -0,0 +1,101 @@
+# utils/facts.py — Power BI-feiten als append-only Parquet-dataset (Arrow), gepartitioneerd op RunDate/Project
+# Layout: <root>/<Fact>/RunDate=YYYY-MM-DD/Project=<naam>/<Fact>-<RunId>-0.parquet (hive-stijl).
+# Elke run schrijft nieuwe bestanden (RunId in de bestandsnaam), bestaande blijven staan; Power BI, DuckDB
+# (read_parquet('…/FactRun/**/*.parquet', hive_partitioning=1)) of pyarrow lezen maanden aan runs incrementeel.
+# Vaste schema's per tabel; Process/Material/Part als dictionary-kolommen, Project via de partitie (categorie bij
+# read_facts). DimProcess is een snapshot (laatste tarieven).
+# Pad via POWERBI_DIR (env) of data/powerbi naast de app.
+
+import os
+import uuid
+from typing import Dict, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa, pyarrow.dataset as ds, pyarrow.parquet as pq; HAVE_ARROW = True
+except Exception:
+    pa = ds = pq = None; HAVE_ARROW = False
+
+DEFAULT_ROOT = os.environ.get("POWERBI_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                          "data", "powerbi"))
+FACT_TABLES = ["FactRun", "FactRouting", "FactBOM", "FactMC"]
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    dic, f64 = pa.dictionary(pa.int32(), pa.string()), pa.float64()
+    key = [("RunId", pa.string()), ("RunDate", pa.date32()), ("Project", dic)]
+    num = lambda *names: [(n, f64) for n in names]
+    return {
+        "FactRun": pa.schema(key + [("Q", pa.int64()), ("Material", dic)] + num("Material_EURkg")
+                             + [("PriceSource", dic)] + num("UnitCost", "Mat_pc", "Conv_total", "Lean_total", "Buy_total")),
+        "FactRouting": pa.schema(key + [("Process", dic)] + num("Step", "QtyInput") + [("Batches", pa.int64())]
+                                 + num("Setup_min", "Cycle_min", "QA_min", "Attend_pct", "kWh_total")
+                                 + [("Parallel_machines", pa.int32())]
+                                 + num("Cost_Machine", "Cost_Labor", "Cost_Energy", "Cost_Lean", "Cost_TotalStep")),
+        "FactBOM": pa.schema(key + [("Part", dic)] + num("Qty_per", "UnitPrice", "Scrap_pct", "Qty_Run", "Cost_Run")),
+        "FactMC": pa.schema(key + [("ScenarioIdx", pa.int32()), ("UnitCost", f64)]),
+        "DimProcess": pa.schema([("Process", dic), ("MachineRate_EURh", f64)]),
+    }
+
+def _require_arrow():
+    if not HAVE_ARROW:
+        raise RuntimeError("pyarrow is vereist voor het Parquet-dataset (pip install pyarrow).")
+
+def _partitioning() -> "ds.Partitioning":
+    return ds.partitioning(pa.schema([("RunDate", pa.date32()), ("Project", pa.string())]), flavor="hive")
+
+def to_arrow(df: pd.DataFrame, schema: "pa.Schema") -> "pa.Table":
+    # kolommen in schema-volgorde, ontbrekende als null; types worden afgedwongen (ook bij lege tabellen)
+    arrays = []
+    for f in schema:
+        col = df[f.name] if f.name in df else pd.Series([None] * len(df), dtype=object)
+        if pa.types.is_date32(f.type):
+            col = pd.to_datetime(col).dt.date
+        elif pa.types.is_dictionary(f.type):
+            col = col.astype("string").astype(object).where(col.notna(), None)
+        arrays.append(pa.array(col.to_numpy(), type=f.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def write_facts(facts: Dict[str, pd.DataFrame], root: str = DEFAULT_ROOT, run_id: Optional[str] = None) -> dict:
+    # → {"run_id", "rows": {tabel: n}}; voegt één run toe aan het dataset, overschrijft niets
+    _require_arrow()
+    run_id = run_id or uuid.uuid4().hex
+    schemas, rows = _schemas(), {}
+    for name in FACT_TABLES:
+        df = facts.get(name)
+        if df is None or df.empty:
+            continue
+        df = df.assign(RunId=run_id)
+        t = to_arrow(df, schemas[name])
+        # partitiekolommen staan in het pad (niet in de bestanden); Project daar als platte string
+        t = t.set_column(t.schema.get_field_index("Project"), "Project", t["Project"].cast(pa.string()))
+        ds.write_dataset(t, os.path.join(root, name), format="parquet", partitioning=_partitioning(),
+                         basename_template=f"{name}-{run_id}-{{i}}.parquet", existing_data_behavior="overwrite_or_ignore")
+        rows[name] = t.num_rows
+    dim = facts.get("DimProcess")
+    if dim is not None and not dim.empty:
+        os.makedirs(os.path.join(root, "DimProcess"), exist_ok=True)
+        pq.write_table(to_arrow(dim, schemas["DimProcess"]), os.path.join(root, "DimProcess", "DimProcess.parquet"))
+        rows["DimProcess"] = len(dim)
+    return {"run_id": run_id, "rows": rows}
+
+def read_facts(table: str, root: str = DEFAULT_ROOT, project: Optional[str] = None,
+               since: Optional[str] = None, columns: Optional[list] = None) -> pd.DataFrame:
+    # filters op de partities: alleen de betreffende mappen worden gelezen
+    _require_arrow()
+    path = os.path.join(root, table)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=[f.name for f in _schemas()[table]])
+    if table == "DimProcess":
+        return pq.read_table(path).to_pandas()
+    d = ds.dataset(path, format="parquet", partitioning=_partitioning())
+    flt = None
+    if project is not None:
+        flt = ds.field("Project") == project
+    if since is not None:
+        c = ds.field("RunDate") >= pa.scalar(pd.Timestamp(since).date(), type=pa.date32())
+        flt = c if flt is None else flt & c
+    out = d.to_table(columns=columns, filter=flt).to_pandas()
+    if "Project" in out:
+        out["Project"] = out["Project"].astype("category")
+    return out
@@ -0,0 +1,182 @@
+# utils/feeds.py — online prijsbronnen (Outokumpu surcharge, TradingEconomics LME, USD→EUR), zonder Streamlit
+# Elke fetcher krijgt de URL als parameter, zodat een lokale stub-server of mirror gebruikt kan worden.
+# Fetchers gooien een exceptie bij fouten/geen waarde; opslaan en terugvallen gebeurt in utils/pricestore.py.
+# Alle requests lopen via één gedeelde Session (connection pool + retry met backoff);
+# pricestore.fetch_all haalt de bronnen parallel op.
+
+import io
+import re
+import threading
+from html import unescape
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.constants import HEADERS
+
+try:
+    from lxml import etree, html as lxml_html; HAVE_LXML = True
+except Exception:
+    etree = lxml_html = None; HAVE_LXML = False
+
+OTK_URL = "https://www.outokumpu.com/en/surcharges"
+TE_URL = "https://tradingeconomics.com/commodity/aluminum"
+FX_URL = "https://api.exchangerate.host/latest?base=USD&symbols=EUR"
+
+OTK_ALIASES = {
+    "304": ["304", "1.4301"], "316L": ["316l", "1.4404"],
+    "2205": ["2205", "1.4462", "duplex 2205"], "2507": ["2507", "1.4410", "super duplex"],
+    "904L": ["904l", "1.4539"],
+}
+
+# ---------- HTTP-session ----------
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+def make_session(retries: int = 2, backoff: float = 0.5, pool: int = 8) -> requests.Session:
+    s = requests.Session()
+    s.headers.update(HEADERS)
+    # read=0: een trage bron (read-timeout) niet opnieuw proberen, anders duurt hij (1 + retries) × timeout;
+    # alleen verbindingsfouten en de status_forcelist-antwoorden worden herhaald
+    retry = Retry(total=retries, connect=retries, read=0, backoff_factor=backoff,
+                  status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(["GET"]),
+                  respect_retry_after_header=True, raise_on_status=False)
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool, pool_maxsize=pool)
+    s.mount("http://", adapter); s.mount("https://", adapter)
+    return s
+
+def http_session() -> requests.Session:
+    # één Session per proces; GET's vanuit meerdere threads delen de pool
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = make_session()
+        return _SESSION
+
+# ---------- parsing ----------
+# Eén gecompileerde alias-matcher voor alle grades; rijen worden met lxml gestreamd (iterparse op <tr>,
+# elementen direct vrijgegeven) i.p.v. een volledige soup. Benchmark + fixtures: benchmarks/bench_otk_parse.py
+_NUM_RE = re.compile(r"([0-9][0-9\.\,\s]*)")
+_ALIAS_TO_GRADE = {a: k for k, als in OTK_ALIASES.items() for a in als}
+_ALIAS_RE = re.compile("|".join(re.escape(a) for a in sorted(_ALIAS_TO_GRADE, key=len, reverse=True)))
+_EUR_RE = re.compile(r"€\s*([0-9\.\,\s]+)")
+_EUR_TON_RE = re.compile(r"([0-9\.\,\s]+)\s*(?:€/t|€/ton|per ton)", re.IGNORECASE)
+# fallback over de hele tekst: alle grades in één scan (eerste treffer per grade telt)
+_FALLBACK_ALIASES = {"304": "304", "1.4301": "304", "316l": "316L", "1.4404": "316L", "2205": "2205", "1.4462": "2205",
+                     "2507": "2507", "1.4410": "2507", "904l": "904L", "1.4539": "904L"}
+_FALLBACK_RE = re.compile(r"(304|1\.4301|316L|1\.4404|2205|1\.4462|2507|1\.4410|904L|1\.4539)"
+                          r"(?=[^\d€]{0,40}€\s*([0-9\.\, \u00A0]+))", re.IGNORECASE)  # lookahead: bedrag niet consumeren
+_TAG_RE = re.compile(r"<[^>]+>")
+_TR_RE = re.compile(r"<tr\b.*?</tr\s*>", re.IGNORECASE | re.DOTALL)
+_CELL_RE = re.compile(r"<t[hd]\b[^>]*>(.*?)</t[hd]\s*>", re.IGNORECASE | re.DOTALL)
+
+def parse_eur_number(s: str) -> Optional[float]:
+    if not s:
+        return None
+    s = s.replace("\xa0", " ").strip()
+    m = _NUM_RE.search(s)
+    if not m:
+        return None
+    num = m.group(1).replace(" ", "")
+    if "," in num and "." in num:
+        last = max(num.rfind(","), num.rfind("."))
+        dec = num[last]
+        thou = "." if dec == "," else ","
+        num = num.replace(thou, "").replace(dec, ".")
+    elif "," in num:
+        parts = num.split(",")
+        if len(parts[-1]) in (1, 2):
+            num = num.replace(".", "").replace(",", ".")
+        else:
+            num = num.replace(",", "")
+    else:
+        if num.count(".") > 1:
+            num = num.replace(".", "")
+    try:
+        return float(num)
+    except Exception:
+        return None
+
+def _strings(texts) -> str:
+    # zoals get_text(" ", strip=True): gestripte tekststukken met één spatie ertussen
+    return " ".join(t for t in (x.strip() for x in texts) if t)
+
+def _iter_rows(html: str) -> Iterator[str]:
+    if HAVE_LXML:
+        ctx = etree.iterparse(io.BytesIO(html.encode("utf-8")), events=("end",), tag="tr", html=True,
+                              encoding="utf-8", recover=True)
+        for _, tr in ctx:
+            cells = [_strings(td.itertext()) for td in tr.iter("td", "th")]
+            tr.clear()
+            if cells:
+                yield " ".join(cells)
+    else:
+        for tr in _TR_RE.finditer(html):
+            cells = [_strings(_TAG_RE.sub(" ", c).split(" ")) for c in _CELL_RE.findall(tr.group(0))]
+            if cells:
+                yield " ".join(unescape(c) for c in cells)
+
+def _page_text(html: str) -> str:
+    if HAVE_LXML:
+        return _strings(lxml_html.document_fromstring(html).itertext())
+    return unescape(_TAG_RE.sub(" ", html))
+
+def parse_otk_surcharges(html: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    # Tabelrijen: per rij één alias-scan; bedragen één keer parsen (laatste rij per grade wint)
+    for row in _iter_rows(html):
+        grades = {_ALIAS_TO_GRADE[m.group(0)] for m in _ALIAS_RE.finditer(row.lower())}
+        if not grades:
+            continue
+        euros = _EUR_RE.findall(row) or _EUR_TON_RE.findall(row)
+        vals = [v for v in map(parse_eur_number, euros) if v is not None]
+        if vals:
+            best = max(vals)
+            for k in grades:
+                out[k] = best
+    # fallback: één regex-scan over de hele tekst
+    if not out:
+        for m in _FALLBACK_RE.finditer(_page_text(html)):
+            k = _FALLBACK_ALIASES[m.group(1).lower()]
+            if k not in out:
+                v = parse_eur_number(m.group(2))
+                if v is not None:
+                    out[k] = v
+    return out
+
+def parse_te_price(text: str) -> Optional[float]:
+    m = re.search(r'data-price="(\d{3,5}(?:\.\d{1,2})?)"', text)
+    if not m:
+        m = re.search(r'(?i)Aluminum.*?(\d{3,5}(?:\.\d{1,2})?)', text)
+    return float(m.group(1)) if m else None
+
+# ---------- fetchers ----------
+def fetch_otk_surcharges(url: str = OTK_URL, timeout: float = 15, session: Optional[requests.Session] = None) -> Dict[str, float]:
+    r = (session or http_session()).get(url, timeout=timeout)
+    r.raise_for_status()
+    out = parse_otk_surcharges(r.text)
+    if not out:
+        raise ValueError("Geen OTK-surcharges gevonden op de pagina.")
+    return out
+
+def fetch_usd_eur(url: str = FX_URL, timeout: float = 10, session: Optional[requests.Session] = None) -> Dict[str, float]:
+    r = (session or http_session()).get(url, timeout=timeout)
+    r.raise_for_status()
+    return {"USD_EUR": float(r.json()["rates"]["EUR"])}
+
+def fetch_lme_usd_ton(url: str = TE_URL, timeout: float = 12, session: Optional[requests.Session] = None) -> Dict[str, float]:
+    r = (session or http_session()).get(url, timeout=timeout)
+    r.raise_for_status()
+    v = parse_te_price(r.text)
+    if v is None:
+        raise ValueError("Geen aluminiumprijs gevonden op TradingEconomics.")
+    return {"USD_TON": v}
+
+# reeks → (fetcher, maximale leeftijd in s, bronnaam); gedeeld door app.py en Shared
+FEEDS = {
+    "otk_surcharge": (fetch_otk_surcharges, 60 * 60 * 3, "Outokumpu surcharges"),
+    "lme_usd_ton": (fetch_lme_usd_ton, 30 * 60, "TradingEconomics"),
+    "fx_usd_eur": (fetch_usd_eur, 60 * 60, "exchangerate.host"),
+}
@@ -0,0 +1,146 @@
+# utils/ghsync.py — GitHub-presets spiegelen naar een lokale map (zonder Streamlit)
+# Eén listing-request per map (contents API) met If-None-Match: ongewijzigde map = één 304.
+# Alleen bestanden met een nieuwe sha worden opgehaald (ook met ETag); verdwenen bestanden worden lokaal verwijderd.
+# Preset laden = lokaal bestand lezen (utils/presets.load_preset).
+# Indeling: <mirror>/<owner>/<repo>/manifest.json en <mirror>/<owner>/<repo>/<branch>/<folder>/*.json
+# api-parameter (of GITHUB_API_URL): andere basis-URL (GitHub Enterprise of een lokale stub).
+
+import base64
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from utils.feeds import http_session
+
+API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+DEFAULT_MIRROR = os.environ.get("PRESET_MIRROR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                              "data", "github"))
+
+def _headers(token: Optional[str], etag: Optional[str] = None) -> Dict[str, str]:
+    h = {"Accept": "application/vnd.github+json"}
+    if token:
+        h["Authorization"] = f"Bearer {token}"
+    if etag:
+        h["If-None-Match"] = etag
+    return h
+
+def _repo_dir(owner: str, repo: str, mirror_dir: str) -> str:
+    return os.path.join(mirror_dir, owner, repo)
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def load_manifest(owner: str, repo: str, mirror_dir: Optional[str] = None) -> dict:
+    path = os.path.join(_repo_dir(owner, repo, mirror_dir or DEFAULT_MIRROR), "manifest.json")
+    if not os.path.isfile(path):
+        return {"default_branch": {}, "branches": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_manifest(owner: str, repo: str, mirror_dir: str, manifest: dict):
+    path = os.path.join(_repo_dir(owner, repo, mirror_dir), "manifest.json")
+    _write_atomic(path, json.dumps(manifest, indent=1).encode("utf-8"))
+
+def default_branch(owner: str, repo: str, token: Optional[str] = None, manifest: Optional[dict] = None,
+                   api: Optional[str] = None, session: Optional[requests.Session] = None) -> str:
+    api = api or API_URL
+    cached = (manifest or {}).get("default_branch", {})
+    r = (session or http_session()).get(f"{api}/repos/{owner}/{repo}", headers=_headers(token, cached.get("etag")), timeout=20)
+    if r.status_code == 304 and cached.get("value"):
+        return cached["value"]
+    if r.status_code == 404:
+        raise FileNotFoundError(f"Repo '{owner}/{repo}' niet gevonden of geen toegang.")
+    r.raise_for_status()
+    value = r.json().get("default_branch", "main")
+    if manifest is not None:
+        manifest["default_branch"] = {"value": value, "etag": r.headers.get("ETag")}
+    return value
+
+def _file_content(obj: dict, session: requests.Session) -> bytes:
+    if "content" in obj and obj.get("encoding") == "base64":
+        return base64.b64decode(obj["content"])
+    if obj.get("download_url"):
+        r = session.get(obj["download_url"], timeout=20); r.raise_for_status()
+        return r.content
+    raise RuntimeError("Geen content in GitHub API response.")
+
+def sync_presets(owner: str, repo: str, folder: str = "presets", branch: Optional[str] = None,
+                 token: Optional[str] = None, mirror_dir: Optional[str] = None, api: Optional[str] = None,
+                 session: Optional[requests.Session] = None) -> dict:
+    # → {"branch", "dir", "files", "fetched", "removed", "not_modified", "requests"}
+    session = session or http_session()
+    api = api or API_URL; mirror_dir = mirror_dir or DEFAULT_MIRROR
+    manifest = load_manifest(owner, repo, mirror_dir)
+    folder = folder.strip("/")
+    n_req = 0
+    if not branch:
+        branch = default_branch(owner, repo, token, manifest, api, session); n_req += 1
+
+    def _listing(br: str):
+        state = manifest["branches"].get(br, {}).get(folder, {})
+        local = os.path.join(_repo_dir(owner, repo, mirror_dir), br, folder)
+        complete = all(os.path.isfile(os.path.join(local, n)) for n in state.get("files", {}))
+        # alleen conditioneel vragen als de spiegel nog compleet is
+        r = session.get(f"{api}/repos/{owner}/{repo}/contents/{folder}", params={"ref": br},
+                        headers=_headers(token, state.get("etag") if complete else None), timeout=20)
+        return r, state
+
+    r, state = _listing(branch); n_req += 1
+    if r.status_code == 404 and branch != "master":
+        branch = "master"
+        r, state = _listing(branch); n_req += 1
+    if r.status_code == 404:
+        raise FileNotFoundError(f"Map '{folder}' niet gevonden in {owner}/{repo}.")
+    local_dir = os.path.join(_repo_dir(owner, repo, mirror_dir), branch, folder)
+    files: Dict[str, dict] = dict(state.get("files", {}))
+    fetched = removed = 0
+    if r.status_code == 304:
+        not_modified = True
+    else:
+        r.raise_for_status()
+        not_modified = False
+        items = [it for it in r.json()
+                 if isinstance(it, dict) and it.get("type") == "file" and it.get("name", "").lower().endswith(".json")]
+        remote = {it["name"]: it for it in items}
+        for name in set(files) - set(remote):
+            p = os.path.join(local_dir, name)
+            if os.path.isfile(p):
+                os.remove(p)
+            files.pop(name); removed += 1
+        for name, it in remote.items():
+            known = files.get(name, {})
+            have = os.path.isfile(os.path.join(local_dir, name))
+            if have and known.get("sha") == it.get("sha"):
+                continue
+            fr = session.get(f"{api}/repos/{owner}/{repo}/contents/{folder}/{name}", params={"ref": branch},
+                             headers=_headers(token, known.get("etag") if have else None), timeout=20); n_req += 1
+            if fr.status_code == 304:
+                files[name] = {**known, "sha": it.get("sha")}
+                continue
+            fr.raise_for_status()
+            _write_atomic(os.path.join(local_dir, name), _file_content(fr.json(), session))
+            files[name] = {"sha": it.get("sha"), "etag": fr.headers.get("ETag")}
+            fetched += 1
+        state = {"etag": r.headers.get("ETag"), "files": files}
+    state["synced_at"] = time.time()
+    manifest["branches"].setdefault(branch, {})[folder] = state
+    _save_manifest(owner, repo, mirror_dir, manifest)
+    return {"branch": branch, "dir": local_dir, "files": sorted(files), "fetched": fetched, "removed": removed,
+            "not_modified": not_modified, "requests": n_req}
+
+def mirrored_files(owner: str, repo: str, folder: str = "presets", branch: Optional[str] = None,
+                   mirror_dir: Optional[str] = None) -> List[str]:
+    # lokale kopieën zonder netwerk (laatste sync); zonder branch → default uit het manifest
+    mirror_dir = mirror_dir or DEFAULT_MIRROR
+    manifest = load_manifest(owner, repo, mirror_dir)
+    branch = branch or manifest.get("default_branch", {}).get("value")
+    state = manifest.get("branches", {}).get(branch or "", {}).get(folder.strip("/"), {})
+    local_dir = os.path.join(_repo_dir(owner, repo, mirror_dir), branch or "", folder.strip("/"))
+    return [os.path.join(local_dir, n) for n in sorted(state.get("files", {})) if os.path.isfile(os.path.join(local_dir, n))]
@@ -0,0 +1,158 @@
+# utils/kernel.py — kolom-gebaseerde (NumPy) kostprijs-kernel
+# Vervangt de vroegere iterrows-loops (cost_once, scrap-propagatie, capacity_table):
+# de routing wordt één keer naar kolom-arrays omgezet en alle stappen worden in één keer doorgerekend.
+# Bewust zonder streamlit-import, zodat ook CLI/batch-code deze kernel kan gebruiken.
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.routing_graph import Plan, routing_plan, dag_input_qty
+
+# kolom → default (gelijk aan de row.get(...)-defaults van de oude loops)
+ROUTING_DEFAULTS = {
+    "Step": 0.0, "Qty_per_parent": 1.0, "Cycle_min": 0.0, "Setup_min": 0.0, "Attend_pct": 100.0,
+    "kWh_pc": 0.0, "QA_min_pc": 0.0, "Scrap_pct": 0.0, "Parallel_machines": 1.0, "Batch_size": 50.0,
+    "Queue_days": 0.0,
+}
+STEP_FIELDS = ["Step", "Proces", "Eff_Input_Qty", "Batches", "Setup_min", "Cycle_min", "QA_min", "kWh",
+               "Machine_min", "Labor_min", "Cost_Machine", "Cost_Labor", "Cost_Energy", "Cost_Lean", "Cost_TotalStep"]
+
+# ---------- routing → kolommen ----------
+def routing_columns(routing_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    df = pd.DataFrame(routing_df).reset_index(drop=True)
+    if "Step" in df:
+        df = df.sort_values("Step", kind="stable")
+    n = len(df)
+    # "Row" = positie in de oorspronkelijke (ongesorteerde) routing
+    cols: Dict[str, np.ndarray] = {"Row": df.index.to_numpy()}
+    for c, default in ROUTING_DEFAULTS.items():
+        if c in df:
+            cols[c] = pd.to_numeric(df[c], errors="coerce").fillna(default).to_numpy(dtype=float)
+        else:
+            cols[c] = np.full(n, default, dtype=float)
+    cols["Proces"] = df["Proces"].astype(str).to_numpy() if "Proces" in df else np.full(n, "", dtype=object)
+    # int()-truncatie + ondergrens 1, zoals max(1, int(row.get(...)))
+    cols["Parallel_machines"] = np.maximum(1.0, np.trunc(cols["Parallel_machines"]))
+    cols["Batch_size"] = np.maximum(1.0, np.trunc(cols["Batch_size"]))
+    # None = lineaire keten; anders topologische niveaus uit Parent_step (utils/routing_graph.py)
+    cols["Plan"] = routing_plan(cols["Step"], df["Parent_step"]) if "Parent_step" in df else None
+    return cols
+
+def machine_rate_array(proces: np.ndarray, machine_rates: Dict[str, float], labor_rate: float) -> np.ndarray:
+    return np.array([float(machine_rates.get(p, labor_rate)) for p in proces], dtype=float)
+
+def bom_buy_pc(bom_df: pd.DataFrame) -> float:
+    if bom_df is None or len(bom_df) == 0:
+        return 0.0
+    qty = pd.to_numeric(bom_df["Qty"], errors="coerce").to_numpy(dtype=float)
+    price = pd.to_numeric(bom_df["UnitPrice"], errors="coerce").to_numpy(dtype=float)
+    scrap = (pd.to_numeric(bom_df["Scrap_pct"], errors="coerce").to_numpy(dtype=float)
+             if "Scrap_pct" in bom_df else 0.0)
+    return float(np.nansum(qty * price * (1.0 + scrap)))
+
+# ---------- kernel ----------
+def eff_input_qty(scrap: np.ndarray, Q: float, qpp: Optional[np.ndarray] = None,
+                  plan: Optional[Plan] = None) -> np.ndarray:
+    # benodigde input per stap: Q × Qty_per_parent van deze en alle volgende stappen,
+    # gedeeld door hun opbrengst (1 − scrap)
+    good = np.maximum(1e-9, 1.0 - np.asarray(scrap, dtype=float))
+    if plan is not None:
+        return dag_input_qty(good, np.ones(good.shape[-1]) if qpp is None else qpp, Q, plan)
+    rev_cumprod = lambda a: np.flip(np.cumprod(np.flip(a, axis=-1), axis=-1), axis=-1)
+    qty = float(Q) / rev_cumprod(good)
+    return qty if qpp is None else qty * rev_cumprod(np.asarray(qpp, dtype=float))
+
+def step_costs(cols: Dict[str, np.ndarray], Q: float, energy_eur_kwh: float, labor_rate: float,
+               rates: np.ndarray, storage_days: float = 0.0, storage_cost: float = 0.0, km: float = 0.0,
+               eur_km: float = 0.0, rework: float = 0.0, rework_min: float = 0.0,
+               cycle: Optional[np.ndarray] = None, scrap: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    # cycle/scrap mogen (iters × steps) zijn; alle bewerkingen broadcasten over de laatste as
+    cycle = cols["Cycle_min"] if cycle is None else cycle
+    scrap = cols["Scrap_pct"] if scrap is None else scrap
+    qty = eff_input_qty(scrap, Q, cols["Qty_per_parent"], cols["Plan"])
+    batches = np.ceil(qty / cols["Batch_size"])
+    setup_min = cols["Setup_min"] * batches
+    cycle_min = cycle * qty
+    qa_min = cols["QA_min_pc"] * qty
+    kwh = cols["kWh_pc"] * qty
+    machine_min = (setup_min + cycle_min) / cols["Parallel_machines"]
+    labor_min = (setup_min + cycle_min + qa_min) * (cols["Attend_pct"] / 100.0)
+    cost_machine = (machine_min / 60.0) * rates
+    cost_labor = (labor_min / 60.0) * labor_rate
+    cost_energy = kwh * energy_eur_kwh
+    cost_lean = (storage_days * storage_cost * batches + km * eur_km
+                 + rework * qty * (rework_min / 60.0) * labor_rate)
+    return {"Eff_Input_Qty": qty, "Batches": batches, "Setup_min": setup_min, "Cycle_min": cycle_min,
+            "QA_min": qa_min, "kWh": kwh, "Machine_min": machine_min, "Labor_min": labor_min,
+            "Cost_Machine": cost_machine, "Cost_Labor": cost_labor, "Cost_Energy": cost_energy,
+            "Cost_Lean": cost_lean, "Cost_TotalStep": cost_machine + cost_labor + cost_energy + cost_lean}
+
+def cost_kernel(cols: Dict[str, np.ndarray], buy_pc: float, Q: int, netkg: float, mat_price: float,
+                energy_eur_kwh: float, labor_rate: float, machine_rates: Dict[str, float],
+                storage_days: float = 0.0, storage_cost: float = 0.0, km: float = 0.0, eur_km: float = 0.0,
+                rework: float = 0.0, rework_min: float = 0.0) -> dict:
+    rates = machine_rate_array(cols["Proces"], machine_rates, labor_rate)
+    s = step_costs(cols, Q, energy_eur_kwh, labor_rate, rates, storage_days, storage_cost,
+                   km, eur_km, rework, rework_min)
+    mat_pc = netkg * mat_price
+    conv = float((s["Cost_Machine"] + s["Cost_Labor"] + s["Cost_Energy"]).sum())
+    lean = float(s["Cost_Lean"].sum())
+    buy = buy_pc * Q
+    steps = np.rec.fromarrays([cols["Step"], cols["Proces"]] + [s[f] for f in STEP_FIELDS[2:]], names=STEP_FIELDS)
+    return {"mat_pc": mat_pc, "conv_total": conv, "lean_total": lean, "buy_total": buy,
+            "total_pc": (mat_pc * Q + conv + lean + buy) / Q, "steps": steps}
+
+CAPACITY_COLS = ["Proces", "Hours_need", "Hours_cap", "Util_pct", "Batches", "Setup_min", "Cycle_min"]
+
+def capacity_arrays(cols: Dict[str, np.ndarray], Q: int, hours_per_day: float, cap_per_process: dict) -> Dict[str, np.ndarray]:
+    # machine-uren per proces (som over stappen); Hours_cap telt per stap mee, zoals in de oude groupby
+    s = step_costs(cols, Q, 0.0, 0.0, np.zeros(len(cols["Proces"])))
+    procs, inv = np.unique(cols["Proces"].astype(str), return_inverse=True)
+    cap = np.array([float(cap_per_process.get(p, hours_per_day)) for p in procs])[inv]
+    agg = lambda a: np.bincount(inv, weights=a, minlength=procs.size)
+    need, cap_h = agg(s["Machine_min"] / 60.0), agg(cap)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        util = need / cap_h
+    return {"Proces": procs, "Hours_need": need, "Hours_cap": cap_h, "Util_pct": np.where(np.isinf(util), np.nan, util),
+            "Batches": agg(s["Batches"]).astype(int), "Setup_min": agg(s["Setup_min"]), "Cycle_min": agg(s["Cycle_min"])}
+
+def capacity_kernel(cols: Dict[str, np.ndarray], Q: int, hours_per_day: float, cap_per_process: dict) -> pd.DataFrame:
+    if len(cols["Proces"]) == 0:
+        return pd.DataFrame(columns=CAPACITY_COLS)
+    df = pd.DataFrame(capacity_arrays(cols, Q, hours_per_day, cap_per_process), columns=CAPACITY_COLS)
+    return df.sort_values("Util_pct", ascending=False)
+
+# ---------- staffel: kostprijs over een reeks aantallen in één aanroep ----------
+def cost_curve(cols: Dict[str, np.ndarray], buy_pc: float, Qs, netkg: float, mat_price: float,
+               energy_eur_kwh: float, labor_rate: float, machine_rates: Dict[str, float],
+               storage_days: float = 0.0, storage_cost: float = 0.0, km: float = 0.0, eur_km: float = 0.0,
+               rework: float = 0.0, rework_min: float = 0.0, block_cells: int = 1 << 20) -> Dict[str, np.ndarray]:
+    # Input per stap is lineair in Q (qty_i = Q·f_i), dus per stap: kosten = A_i·ceil(Q·f_i/batch_i) + B_i·Q·f_i + C_i.
+    # Alleen de setup-term (stuksgewijs constant in Q) vraagt een (Q × steps)-evaluatie; de rest is één dot-product.
+    Qs = np.atleast_1d(np.asarray(Qs, dtype=float))
+    n = len(cols["Proces"])
+    conv = np.zeros(Qs.size); lean = np.zeros(Qs.size)
+    if n:
+        f = eff_input_qty(cols["Scrap_pct"], 1.0, cols["Qty_per_parent"], cols["Plan"])
+        rates = machine_rate_array(cols["Proces"], machine_rates, labor_rate)
+        att = cols["Attend_pct"] / 100.0
+        min_rate = (rates / cols["Parallel_machines"] + labor_rate * att) / 60.0  # €/min voor setup+cyclus
+        a_conv = cols["Setup_min"] * min_rate
+        b_conv = cols["Cycle_min"] * min_rate + cols["QA_min_pc"] * att * labor_rate / 60.0 + cols["kWh_pc"] * energy_eur_kwh
+        a_lean = storage_days * storage_cost
+        b_lean = rework * (rework_min / 60.0) * labor_rate
+        conv += Qs * float(f @ b_conv)
+        lean += Qs * float(f.sum() * b_lean) + n * km * eur_km
+        per_batch = f / cols["Batch_size"]
+        rows = max(1, block_cells // n)
+        for start in range(0, Qs.size, rows):
+            sl = slice(start, start + rows)
+            batches = np.ceil(Qs[sl, None] * per_batch)
+            conv[sl] += batches @ a_conv
+            lean[sl] += batches.sum(axis=1) * a_lean
+    mat_pc = np.full(Qs.size, netkg * mat_price)
+    buy = buy_pc * Qs
+    return {"Q": Qs, "mat_pc": mat_pc, "conv_total": conv, "lean_total": lean, "buy_total": buy,
+            "total_pc": (mat_pc * Qs + conv + lean + buy) / Qs}
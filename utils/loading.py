@@ -0,0 +1,114 @@
+# utils/loading.py — capaciteitsbelasting van het hele orderboek (duizenden orders, elk met eigen routing, Q en datum)
+# Per order en stap: machine-uren (zelfde formule als step_costs: (setup·batches + cyclus·input) / Parallel_machines),
+# geplaatst op een dag via de Queue_days-offsets van de routing:
+#   - Start bekend  → stap i op Start + Σ Queue_days t/m stap i (vooruit)
+#   - alleen Due    → laatste stap op Due, eerdere stappen Σ Queue_days eerder (terug)
+# Dagen buiten het werkrooster schuiven door naar de eerstvolgende werkdag. Daarna één bincount over
+# (proces, dag/week-bucket) → uren-matrix; capaciteit = uren/dag per proces × werkdagen in de bucket.
+# Bewust zonder streamlit-import, zodat ook CLI/batch-code (batch_quote.py --load) dit kan gebruiken.
+
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.kernel import eff_input_qty
+
+LOAD_COLS = ["Proces", "Bucket", "Hours_need", "Hours_cap", "Util_pct", "Order_steps"]
+OVERLOAD_COLS = ["Proces", "Start", "End", "Buckets", "Peak_util", "Excess_hours"]
+BUCKET_DAYS = {"day": 1, "week": 7}
+WEEKMASK = "1111100"  # ma–vr
+
+def step_offsets(cols: Dict[str, np.ndarray], days: Optional[np.ndarray] = None) -> np.ndarray:
+    # dagen na vrijgave waarop elke stap start: Queue_days (of `days`, mag (… × stappen) zijn) opgeteld langs de
+    # (langste) weg naar die stap
+    wait = cols["Queue_days"] if days is None else np.asarray(days, dtype=float)
+    if cols["Plan"] is None:
+        return np.cumsum(wait, axis=-1)
+    # DAG: van de bladeren naar de eindstap; een stap start pas als al zijn toeleverende takken klaar zijn
+    lead = (slice(None),) * (wait.ndim - 1)
+    ready = np.zeros(wait.shape); off = np.zeros(wait.shape)
+    for nodes, local, parent in reversed(cols["Plan"]):
+        off[lead + (nodes,)] = ready[lead + (nodes,)] + wait[lead + (nodes,)]
+        np.maximum.at(ready, lead + (parent,), off[lead + (nodes[local],)])
+    return off
+
+def order_step_hours(cols: Dict[str, np.ndarray], Qs) -> np.ndarray:
+    # (orders × stappen) machine-uren; input is lineair in Q, alleen de batches vragen een ceil per order
+    Qs = np.asarray(Qs, dtype=float)
+    f = eff_input_qty(cols["Scrap_pct"], 1.0, cols["Qty_per_parent"], cols["Plan"])
+    qty = Qs[:, None] * f
+    batches = np.ceil(qty / cols["Batch_size"])
+    return (cols["Setup_min"] * batches + cols["Cycle_min"] * qty) / cols["Parallel_machines"] / 60.0
+
+def _days(s: pd.Series) -> np.ndarray:
+    return pd.to_datetime(s, errors="coerce").to_numpy().astype("datetime64[D]")
+
+def load_matrix(orders: pd.DataFrame, routing_loader: Callable[[str], Dict[str, np.ndarray]], bucket: str = "week",
+                hours_per_day: float = 8.0, cap_per_process: Optional[dict] = None,
+                weekmask: str = WEEKMASK) -> dict:
+    # orders: Routing (preset-ref of sleutel voor routing_loader), Q, Due en/of Start
+    # → {"Proces", "Buckets" (startdatum), "Hours_need", "Hours_cap", "Util", "Order_steps"} (processen × buckets)
+    cap_per_process = cap_per_process or {}
+    df = pd.DataFrame(orders).reset_index(drop=True)
+    Q = pd.to_numeric(df["Q"], errors="coerce").to_numpy(dtype=float)
+    due = _days(df["Due"]) if "Due" in df else np.full(len(df), np.datetime64("NaT"), dtype="datetime64[D]")
+    start = _days(df["Start"]) if "Start" in df else np.full(len(df), np.datetime64("NaT"), dtype="datetime64[D]")
+    ok = (Q > 0) & ~(np.isnat(due) & np.isnat(start))
+    procs, days, hours = [], [], []
+    for ref, idx in df[ok].groupby(df["Routing"].fillna("").astype(str), sort=False).indices.items():
+        idx = np.flatnonzero(ok)[idx]
+        cols = routing_loader(ref)
+        if len(cols["Proces"]) == 0:
+            continue
+        off = np.floor(step_offsets(cols)).astype(int)
+        anchor = np.where(np.isnat(start[idx]), due[idx] - off.max(), start[idx])
+        procs.append(np.tile(cols["Proces"].astype(str), idx.size))
+        days.append((anchor[:, None] + off).ravel())
+        hours.append(order_step_hours(cols, Q[idx]).ravel())
+    if not procs:
+        empty = np.zeros((0, 0))
+        return {"Proces": np.array([], dtype=object), "Buckets": np.array([], dtype="datetime64[D]"),
+                "Hours_need": empty, "Hours_cap": empty, "Util": empty, "Order_steps": empty.astype(int)}
+    days = np.busday_offset(np.concatenate(days), 0, roll="forward", weekmask=weekmask)
+    code, names = pd.factorize(np.concatenate(procs))
+    step = BUCKET_DAYS[bucket]
+    d = days.astype(np.int64)
+    k = d if step == 1 else d - (d - 4) % 7  # weken beginnen op maandag (1970-01-05 = dag 4)
+    k0 = k.min(); nb = int((k.max() - k0) // step) + 1
+    flat = code * nb + (k - k0) // step
+    need = np.bincount(flat, weights=np.concatenate(hours), minlength=names.size * nb).reshape(names.size, nb)
+    count = np.bincount(flat, minlength=names.size * nb).reshape(names.size, nb)
+    buckets = (k0 + step * np.arange(nb)).astype("datetime64[D]")
+    workdays = np.busday_count(buckets, buckets + step, weekmask=weekmask)
+    per_day = np.array([float(cap_per_process.get(p, hours_per_day)) for p in names])
+    cap = per_day[:, None] * workdays[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        util = np.where(cap > 0, need / cap, np.where(need > 0, np.inf, 0.0))
+    return {"Proces": np.asarray(names, dtype=object), "Buckets": buckets, "Hours_need": need, "Hours_cap": cap,
+            "Util": util, "Order_steps": count}
+
+def load_table(load: dict) -> pd.DataFrame:
+    # lang formaat: één regel per (proces, bucket)
+    P, B = load["Util"].shape
+    return pd.DataFrame({"Proces": np.repeat(load["Proces"], B), "Bucket": np.tile(load["Buckets"], P),
+                         "Hours_need": load["Hours_need"].ravel(), "Hours_cap": load["Hours_cap"].ravel(),
+                         "Util_pct": load["Util"].ravel(), "Order_steps": load["Order_steps"].ravel()},
+                        columns=LOAD_COLS)
+
+def overload_windows(load: dict, threshold: float = 1.0) -> pd.DataFrame:
+    # aaneengesloten buckets per proces met Util > threshold: begin, eind (laatste bucket), piek en uren te veel
+    util = load["Util"]
+    P, B = util.shape
+    if P == 0:
+        return pd.DataFrame(columns=OVERLOAD_COLS)
+    over = np.zeros((P, B + 2), dtype=np.int8); over[:, 1:-1] = util > threshold
+    edge = np.diff(over, axis=1)
+    (p, s), (_, e) = np.nonzero(edge == 1), np.nonzero(edge == -1)  # beide rij-voor-rij gesorteerd → paren
+    excess = np.maximum(load["Hours_need"] - threshold * load["Hours_cap"], 0.0)
+    cs = np.concatenate([np.zeros((P, 1)), np.cumsum(excess, axis=1)], axis=1)
+    flat = np.append(util.ravel(), 0.0)
+    peak = np.maximum.reduceat(flat, np.column_stack([p * B + s, p * B + e]).ravel())[::2] if p.size else np.array([])
+    out = pd.DataFrame({"Proces": load["Proces"][p], "Start": load["Buckets"][s], "End": load["Buckets"][e - 1],
+                        "Buckets": e - s, "Peak_util": peak, "Excess_hours": cs[p, e] - cs[p, s]}, columns=OVERLOAD_COLS)
+    return out.sort_values("Excess_hours", ascending=False, ignore_index=True)
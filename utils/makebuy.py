@@ -0,0 +1,92 @@
+# utils/makebuy.py — Make-vs-Buy breakeven over het hele aantallenbereik
+# Make-curve = kostprijs/stuk (kernel.cost_curve) + capaciteitsstraf (10% per 100% overbelasting, zoals in app.py);
+# Buy-curve  = prijs + transport, onder de MOQ afgeschreven over Q (prijs·MOQ/Q).
+# Alles wordt als (offers × Q)-sweep doorgerekend; cross-overs zijn de Q's waar het beste alternatief wisselt.
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.kernel import eff_input_qty, cost_curve
+
+OFFER_COLS = ["Supplier", "Price", "MOQ", "Transport"]
+
+def buy_unit_curve(Qs: np.ndarray, price, moq, transport) -> np.ndarray:
+    # price/moq/transport mogen arrays per offerte zijn → (offers × Q)
+    Qs = np.asarray(Qs, dtype=float)
+    price = np.asarray(price, dtype=float)[..., None]; moq = np.asarray(moq, dtype=float)[..., None]
+    transport = np.asarray(transport, dtype=float)[..., None]
+    return np.where(Qs >= moq, price, price * moq / Qs) + transport
+
+def max_util_curve(cols: Dict[str, np.ndarray], Qs: np.ndarray, hours_per_day: float, cap_per_process: dict,
+                   block_cells: int = 1 << 20) -> np.ndarray:
+    # hoogste procesbenutting per Q (zelfde uren als capacity_table, gesommeerd per proces)
+    Qs = np.asarray(Qs, dtype=float); n = len(cols["Proces"])
+    if n == 0:
+        return np.zeros(Qs.size)
+    f = eff_input_qty(cols["Scrap_pct"], 1.0, cols["Qty_per_parent"], cols["Plan"])
+    procs, inv = np.unique(cols["Proces"].astype(str), return_inverse=True)
+    onehot = np.zeros((n, procs.size)); onehot[np.arange(n), inv] = 1.0
+    cap_h = onehot.T @ np.array([float(cap_per_process.get(p, hours_per_day)) for p in procs])[inv]
+    par = cols["Parallel_machines"]
+    out = np.empty(Qs.size)
+    rows = max(1, block_cells // n)
+    for start in range(0, Qs.size, rows):
+        q = Qs[start:start + rows, None]
+        hours = (cols["Setup_min"] * np.ceil(q * f / cols["Batch_size"]) + cols["Cycle_min"] * q * f) / par / 60.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            util = (hours @ onehot) / cap_h
+        out[start:start + rows] = np.nanmax(np.where(np.isinf(util), np.nan, util), axis=1)
+    return out
+
+def make_unit_curve(cols: Dict[str, np.ndarray], buy_pc: float, Qs: np.ndarray, netkg: float, mat_price: float,
+                    energy_eur_kwh: float, labor_rate: float, machine_rates: Dict[str, float],
+                    hours_per_day: float, cap_per_process: dict, lean: tuple = ()) -> Dict[str, np.ndarray]:
+    c = cost_curve(cols, buy_pc, Qs, netkg, mat_price, energy_eur_kwh, labor_rate, machine_rates, *lean)
+    util = max_util_curve(cols, Qs, hours_per_day, cap_per_process)
+    penalty = np.maximum(0.0, np.nan_to_num(util) - 1.0) * 0.10 * c["total_pc"]
+    return {"Q": c["Q"], "total_pc": c["total_pc"], "util_max": util, "penalty": penalty,
+            "make_unit": c["total_pc"] + penalty}
+
+def quantity_grid(Q_max: int, dense_upto: int = 100_000, points: int = 4000) -> np.ndarray:
+    # alle gehele Q tot dense_upto, daarboven log-verdeeld
+    if Q_max <= dense_upto:
+        return np.arange(1, int(Q_max) + 1, dtype=float)
+    tail = np.unique(np.round(np.geomspace(dense_upto + 1, Q_max, points)))
+    return np.concatenate([np.arange(1, dense_upto + 1, dtype=float), tail])
+
+def breakeven(make_unit: np.ndarray, Qs: np.ndarray, offers: pd.DataFrame) -> pd.DataFrame:
+    # aaneengesloten Q-bereiken met hetzelfde beste alternatief (MAKE of een leverancier)
+    offers = pd.DataFrame(offers, columns=OFFER_COLS)
+    buy = buy_unit_curve(Qs, offers["Price"], offers["MOQ"], offers["Transport"]) if len(offers) else np.empty((0, Qs.size))
+    allc = np.vstack([make_unit[None, :], buy])
+    best = np.argmin(allc, axis=0)
+    starts = np.flatnonzero(np.r_[True, best[1:] != best[:-1]])
+    ends = np.r_[starts[1:] - 1, Qs.size - 1]
+    names = np.array(["MAKE"] + offers["Supplier"].astype(str).tolist(), dtype=object)
+    best_buy = buy.min(axis=0) if len(buy) else np.full(Qs.size, np.nan)
+    return pd.DataFrame({"Q_from": Qs[starts].astype(int), "Q_to": Qs[ends].astype(int),
+                         "Advies": np.where(best[starts] == 0, "MAKE", "BUY"), "Bron": names[best[starts]],
+                         "Make €/stuk": make_unit[starts], "Buy €/stuk": best_buy[starts]})
+
+def crossovers(segments: pd.DataFrame) -> List[int]:
+    # Q's waar MAKE ↔ BUY omslaat (leverancierswissels binnen BUY tellen niet)
+    adv = segments["Advies"].to_numpy()
+    return segments["Q_from"].to_numpy()[1:][adv[1:] != adv[:-1]].astype(int).tolist()
+
+def make_vs_buy_portfolio(parts: List[dict], Q_max: Optional[int] = None) -> pd.DataFrame:
+    # parts: dicts met cols, buy_pc, netkg, mat_price, energy, labor, rates, hours_per_day, cap, offers (DataFrame), Q
+    # → per onderdeel advies bij de gevraagde Q + de MAKE/BUY-omslagpunten
+    rows = []
+    for p in parts:
+        qmax = int(Q_max or max(1000, 4 * int(p["Q"]), 2 * int(pd.DataFrame(p["offers"])["MOQ"].max())))
+        Qs = quantity_grid(qmax)
+        mk = make_unit_curve(p["cols"], p["buy_pc"], Qs, p["netkg"], p["mat_price"], p["energy"], p["labor"],
+                             p["rates"], p["hours_per_day"], p.get("cap", {}), p.get("lean", ()))
+        seg = breakeven(mk["make_unit"], Qs, p["offers"])
+        at = seg[(seg["Q_from"] <= p["Q"]) & (seg["Q_to"] >= p["Q"])]
+        rows.append({"Part": p.get("name"), "Q": p["Q"],
+                     "Advies": at["Advies"].iloc[0] if len(at) else None, "Bron": at["Bron"].iloc[0] if len(at) else None,
+                     "Crossovers": crossovers(seg)})
+    return pd.DataFrame(rows)
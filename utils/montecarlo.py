@@ -0,0 +1,196 @@
+# utils/montecarlo.py — matrix-gebatchte Monte-Carlo over de kostprijs-kernel
+# Alle scenario's van een blok worden als (iters × steps)-arrays in één keer doorgerekend.
+# De trekkingen volgen exact de stroom van de oude per-iteratie loop (default_rng(seed)):
+# per scenario 1 materiaalprijs, dan len(routing) cyclus- en len(routing) scrap-trekkingen.
+# Met workers=N (ook N=1) krijgt elk blok een eigen child-stream uit SeedSequence(seed).spawn(...);
+# de blokgrootte hangt alleen van de routing af, dus de samples zijn gelijk voor elk aantal workers.
+# Samplers: "random" (bovenstaande stroom), "antithetic" (z en −z), "lhs" (Latin hypercube per blok) en
+# "sobol" (gescrambled, vereist scipy). mc_converge voedt per blok een QuantileSketch (utils/quantiles.py):
+# percentielen met foutgrens zonder alle samples te bewaren (keep_samples=True alleen voor de ruwe export).
+# Het stopcriterium gebruikt de schets: halve breedte van het P95-interval (steekproefinterval z·√(p(1−p)/n)
+# plus de rangfout van de schets) ≤ tolerantie; het aantal gebruikte iteraties wordt gemeld.
+
+import math
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from utils.kernel import machine_rate_array, step_costs
+from utils.quantiles import QuantileSketch
+
+try:
+    from scipy.stats import qmc; HAVE_SCIPY = True
+except Exception:
+    qmc = None; HAVE_SCIPY = False
+
+MC_BLOCK_CELLS = 1 << 20  # max. scenario×stap-cellen per blok (≈8 MB per float-array)
+MC_TASK_CELLS = 1 << 18   # blokgrootte per child-stream/proces-taak (vast, los van het aantal workers)
+
+SAMPLERS = ["random", "antithetic", "lhs"] + (["sobol"] if HAVE_SCIPY else [])
+
+def mc_block_rows(n_steps: int, block_cells: int = MC_BLOCK_CELLS) -> int:
+    return max(1, block_cells // max(1, 2 * n_steps + 1))
+
+# ---------- samplers ----------
+_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02,
+      -3.066479806614716e+01, 2.506628277459239e+00)
+_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01,
+      -1.328068155288572e+01)
+_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00,
+      4.374664141464968e+00, 2.938163982698783e+00)
+_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+
+def norm_ppf(u: np.ndarray) -> np.ndarray:
+    # inverse standaard-normale CDF (Acklam, rel. fout < 1.2e-9), zonder scipy
+    u = np.clip(np.asarray(u, dtype=float), 1e-12, 1.0 - 1e-12)
+    z = np.empty_like(u)
+    lo, hi = u < 0.02425, u > 1.0 - 0.02425
+    mid = ~(lo | hi)
+    q = u[mid] - 0.5; r = q * q
+    z[mid] = (((((_A[0] * r + _A[1]) * r + _A[2]) * r + _A[3]) * r + _A[4]) * r + _A[5]) * q / \
+             (((((_B[0] * r + _B[1]) * r + _B[2]) * r + _B[3]) * r + _B[4]) * r + 1.0)
+    for mask, sign, v in ((lo, 1.0, u[lo]), (hi, -1.0, 1.0 - u[hi])):
+        q = np.sqrt(-2.0 * np.log(v))
+        z[mask] = sign * (((((_C[0] * q + _C[1]) * q + _C[2]) * q + _C[3]) * q + _C[4]) * q + _C[5]) / \
+                  ((((_D[0] * q + _D[1]) * q + _D[2]) * q + _D[3]) * q + 1.0)
+    return z
+
+def _sobol(dims: int, rng: np.random.Generator):
+    if not HAVE_SCIPY:
+        raise RuntimeError("Sobol-sampling vereist scipy (pip install scipy).")
+    return qmc.Sobol(dims, scramble=True, seed=rng)
+
+def draw_normals(sampler: str, rng: np.random.Generator, rows: int, dims: int, engine=None) -> np.ndarray:
+    # (rows × dims) standaard-normale trekkingen; engine = doorlopende Sobol-reeks (anders per blok een nieuwe)
+    if sampler == "random":
+        return rng.standard_normal((rows, dims))
+    if sampler == "antithetic":
+        half = rng.standard_normal(((rows + 1) // 2, dims))
+        return np.concatenate([half, -half])[:rows]
+    if sampler == "lhs":
+        strata = rng.permuted(np.broadcast_to(np.arange(rows)[:, None], (rows, dims)), axis=0)
+        return norm_ppf((strata + rng.random((rows, dims))) / rows)
+    if sampler == "sobol":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # blokken die geen macht van 2 zijn
+            return norm_ppf((engine or _sobol(dims, rng)).random(rows))
+    raise ValueError(f"Onbekende sampler '{sampler}' ({', '.join(SAMPLERS)}).")
+
+def mc_eval_block(z: np.ndarray, cols: Dict[str, np.ndarray], rates: np.ndarray, buy_pc: float, Q: int,
+                  netkg: float, mat_mu: float, sd_mat: float, sd_cycle: float, sd_scrap: float,
+                  energy: float, labor: float, storage_days: float = 0.0, storage_cost: float = 0.0,
+                  km: float = 0.0, eur_km: float = 0.0, rework: float = 0.0, rework_min: float = 0.0) -> np.ndarray:
+    # z: standaard-normale trekkingen (rows × (1 + 2·steps)) in routing-volgorde van de invoer
+    n = len(cols["Proces"])
+    mat = np.maximum(0.01, mat_mu + sd_mat * mat_mu * z[:, 0])
+    conv = lean = 0.0
+    if n:
+        order = cols["Row"]
+        cycle = np.maximum(cols["Cycle_min"] * (1.0 + sd_cycle * z[:, 1:n + 1][:, order]), 0.05)
+        scrap = np.clip(cols["Scrap_pct"] + sd_scrap * z[:, n + 1:2 * n + 1][:, order], 0.0, 0.35)
+        s = step_costs(cols, Q, energy, labor, rates, storage_days, storage_cost, km, eur_km,
+                       rework, rework_min, cycle=cycle, scrap=scrap)
+        conv = (s["Cost_Machine"] + s["Cost_Labor"] + s["Cost_Energy"]).sum(axis=1)
+        lean = s["Cost_Lean"].sum(axis=1)
+    return (netkg * mat * Q + conv + lean + buy_pc * Q) / Q
+
+_POOLS: Dict[int, ProcessPoolExecutor] = {}
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    # hergebruikt over reruns; opstarten van processen kost meer dan een klein MC-blok
+    if workers not in _POOLS:
+        _POOLS[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _POOLS[workers]
+
+def _mc_block_task(args) -> np.ndarray:
+    child, rows, cols, rates, params, sampler = args
+    z = draw_normals(sampler, np.random.default_rng(child), rows, 2 * len(cols["Proces"]) + 1)
+    return mc_eval_block(z, cols, rates, **params)
+
+def _mc_blocks(cols, rates, params, iters: int, seed: int, sampler: str, rows: int,
+               workers: Optional[int], wave: bool = False) -> Iterator[np.ndarray]:
+    # samples per blok; wave=True → met workers per golf van `workers` taken (dan kan de aanroeper tussendoor stoppen)
+    dims = 2 * len(cols["Proces"]) + 1
+    if workers is None:
+        # één stroom; "random" is identiek aan de oude per-iteratie loop
+        rng = np.random.default_rng(seed)
+        engine = _sobol(dims, rng) if sampler == "sobol" else None
+        for start in range(0, iters, rows):
+            stop = min(iters, start + rows)
+            yield mc_eval_block(draw_normals(sampler, rng, stop - start, dims, engine), cols, rates, **params)
+        return
+    sizes = [min(rows, iters - start) for start in range(0, iters, rows)]
+    children = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(child, size, cols, rates, params, sampler) for child, size in zip(children, sizes)]
+    workers = max(1, min(int(workers), os.cpu_count() or 1, len(tasks) or 1))
+    step = workers if wave else max(1, len(tasks))
+    for i in range(0, len(tasks), step):
+        part = tasks[i:i + step]
+        yield from ([_mc_block_task(t) for t in part] if workers == 1 else _pool(workers).map(_mc_block_task, part))
+
+def _block_rows(n: int, block_cells: int, workers: Optional[int], sampler: str, cap: Optional[int] = None) -> int:
+    rows = mc_block_rows(n, block_cells if workers is None else min(block_cells, MC_TASK_CELLS))
+    if cap:
+        rows = min(rows, cap)
+    # Sobol: blokken als macht van 2 (balans van de reeks)
+    return 1 << int(math.log2(rows)) if sampler == "sobol" else rows
+
+def _mc_setup(cols, buy_pc, Q, netkg, mat_mu, sd_mat, sd_cycle, sd_scrap, energy, labor, mrates,
+              storage_days, storage_cost, km, eur_km, rework, rework_min):
+    rates = machine_rate_array(cols["Proces"], mrates or {}, labor)
+    params = dict(buy_pc=buy_pc, Q=Q, netkg=netkg, mat_mu=mat_mu, sd_mat=sd_mat, sd_cycle=sd_cycle,
+                  sd_scrap=sd_scrap, energy=energy, labor=labor, storage_days=storage_days,
+                  storage_cost=storage_cost, km=km, eur_km=eur_km, rework=rework, rework_min=rework_min)
+    return rates, params
+
+def mc_unit_costs(cols: Dict[str, np.ndarray], buy_pc: float, Q: int, netkg: float, mat_mu: float,
+                  sd_mat: float, sd_cycle: float, sd_scrap: float, iters: int = 1000, seed: int = 123,
+                  energy: float = 0.2, labor: float = 45.0, mrates: Dict[str, float] = None,
+                  storage_days: float = 0.0, storage_cost: float = 0.0, km: float = 0.0, eur_km: float = 0.0,
+                  rework: float = 0.0, rework_min: float = 0.0, block_cells: int = MC_BLOCK_CELLS,
+                  workers: Optional[int] = None, sampler: str = "random") -> np.ndarray:
+    iters = int(iters)
+    rates, params = _mc_setup(cols, buy_pc, Q, netkg, mat_mu, sd_mat, sd_cycle, sd_scrap, energy, labor, mrates,
+                              storage_days, storage_cost, km, eur_km, rework, rework_min)
+    rows = _block_rows(len(cols["Proces"]), block_cells, workers, sampler)
+    parts = list(_mc_blocks(cols, rates, params, iters, seed, sampler, rows, workers))
+    return np.concatenate(parts) if parts else np.empty(0)
+
+def mc_converge(cols: Dict[str, np.ndarray], buy_pc: float, Q: int, netkg: float, mat_mu: float,
+                sd_mat: float, sd_cycle: float, sd_scrap: float, iters: int = 1000, seed: int = 123,
+                energy: float = 0.2, labor: float = 45.0, mrates: Dict[str, float] = None,
+                storage_days: float = 0.0, storage_cost: float = 0.0, km: float = 0.0, eur_km: float = 0.0,
+                rework: float = 0.0, rework_min: float = 0.0, block_cells: int = MC_BLOCK_CELLS,
+                workers: Optional[int] = None, sampler: str = "random", tol: float = 0.0,
+                min_iters: int = 1000, check_every: int = 1000, keep_samples: bool = True,
+                delta: float = 500.0) -> dict:
+    # iters = maximum; stopt zodra de halve breedte van het P95-interval (steekproef + schetsfout) ≤ tol · P95
+    # (tol=0 → altijd iters). Geheugen: de schets (≈ δ/2 centroïden) + één blok, tenzij keep_samples.
+    # → {"samples" (of None), "sketch", "iters", "converged", "p95", "ci": (onder, boven), "sampler"}
+    iters = int(iters)
+    rates, params = _mc_setup(cols, buy_pc, Q, netkg, mat_mu, sd_mat, sd_cycle, sd_scrap, energy, labor, mrates,
+                              storage_days, storage_cost, km, eur_km, rework, rework_min)
+    monitor = tol > 0
+    rows = _block_rows(len(cols["Proces"]), block_cells, workers, sampler, check_every if monitor else None)
+    sketch, parts, next_check = QuantileSketch(delta), [], max(min_iters, 1)
+
+    def stable() -> bool:
+        lo, hi = sketch.bounds(0.95, 1.96)
+        return (hi - lo) / 2.0 <= tol * abs(sketch.quantile(0.95))
+
+    for block in _mc_blocks(cols, rates, params, iters, seed, sampler, rows, workers, wave=monitor):
+        sketch.update(block)
+        if keep_samples:
+            parts.append(block)
+        if monitor and sketch.n >= next_check and sketch.n < iters:
+            if stable():
+                break
+            next_check = sketch.n + check_every  # schets: controle kost O(centroïden), niet O(samples)
+    n = int(sketch.n)
+    lo, hi = sketch.bounds(0.95, 1.96) if n else (float("nan"),) * 2
+    return {"samples": (np.concatenate(parts) if parts else np.empty(0)) if keep_samples else None,
+            "sketch": sketch, "iters": n, "converged": bool(monitor and n > 0 and stable()),
+            "p95": sketch.quantile(0.95), "ci": (float(lo), float(hi)), "sampler": sampler}
@@ -0,0 +1,137 @@
+# utils/presetlib.py — presetbibliotheek: geïndexeerde metadata (SQLite), filteren zonder JSON te parsen
+# Index per preset: project, materiaal, klant (client.Company), Q, netto gewicht, aantal stappen, processen.
+# refresh() is incrementeel: alleen nieuwe/gewijzigde bestanden (mtime/grootte) worden geparsed,
+# verdwenen bestanden verdwijnen uit de index. Routing/BOM pas bij open_preset().
+# Pad via PRESET_INDEX (env) of data/presets.sqlite naast de app.
+
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional, Tuple
+
+import pandas as pd
+
+from utils.presets import load_preset, preset_frames
+
+DEFAULT_INDEX = os.environ.get("PRESET_INDEX", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                            "data", "presets.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS presets (
+    path TEXT PRIMARY KEY, root TEXT NOT NULL, name TEXT NOT NULL, mtime REAL NOT NULL, size INTEGER NOT NULL,
+    project TEXT, material TEXT, client TEXT, Q REAL, net_weight REAL, n_steps INTEGER, processes TEXT, error TEXT
+);
+CREATE TABLE IF NOT EXISTS preset_process (path TEXT NOT NULL, proces TEXT NOT NULL, PRIMARY KEY (path, proces));
+CREATE INDEX IF NOT EXISTS ix_presets_root ON presets (root);
+CREATE INDEX IF NOT EXISTS ix_presets_material ON presets (material);
+CREATE INDEX IF NOT EXISTS ix_presets_client ON presets (client);
+CREATE INDEX IF NOT EXISTS ix_presets_q ON presets (Q);
+CREATE INDEX IF NOT EXISTS ix_preset_process ON preset_process (proces, path);
+"""
+LIST_COLS = ["name", "project", "material", "client", "Q", "net_weight", "n_steps", "processes", "path"]
+
+def preset_meta(data: dict) -> dict:
+    routing = data.get("routing") or []
+    procs = sorted({str(r.get("Proces")) for r in routing if isinstance(r, dict) and r.get("Proces")})
+    client = data.get("client")
+    if isinstance(client, dict):
+        client = client.get("Company") or client.get("Name")
+    def _num(v):
+        try:
+            return float(v)
+        except (TypeError, ValueError):
+            return None
+    return {"project": data.get("project"), "material": data.get("material"), "client": client,
+            "Q": _num(data.get("Q")), "net_weight": _num(data.get("net_weight")),
+            "n_steps": len(routing), "processes": procs}
+
+class PresetLibrary:
+    def __init__(self, path: str = DEFAULT_INDEX):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # één verbinding (snelle lookups), gedeeld tussen Streamlit-threads achter een lock
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._con.executescript(SCHEMA)
+
+    def refresh(self, root: str) -> dict:
+        # → {"added", "updated", "removed", "total"}; alleen gewijzigde bestanden worden gelezen
+        root = os.path.abspath(root)
+        seen = {}
+        if os.path.isdir(root):
+            for dirpath, _, names in os.walk(root):
+                for n in names:
+                    if n.lower().endswith(".json") and n != "manifest.json":
+                        p = os.path.join(dirpath, n); st = os.stat(p)
+                        seen[p] = (st.st_mtime, st.st_size)
+        with self._lock:
+            known = {p: (m, s) for p, m, s in
+                     self._con.execute("SELECT path, mtime, size FROM presets WHERE root = ?", (root,))}
+        gone = [p for p in known if p not in seen]
+        todo = [p for p, ms in seen.items() if known.get(p) != ms]
+        rows, procs = [], []
+        for p in todo:
+            try:
+                data = load_preset(p)
+                if not isinstance(data, dict):
+                    raise ValueError(f"geen preset-object maar {type(data).__name__}")
+                meta, err = preset_meta(data), None
+            except (OSError, ValueError, TypeError, AttributeError) as e:
+                meta, err = preset_meta({}), f"{type(e).__name__}: {e}"
+            m, s = seen[p]
+            rows.append((p, root, os.path.relpath(p, root), m, s, meta["project"], meta["material"], meta["client"],
+                         meta["Q"], meta["net_weight"], meta["n_steps"], ";".join(meta["processes"]), err))
+            procs += [(p, pr) for pr in meta["processes"]]
+        with self._lock, self._con:
+            self._con.executemany("DELETE FROM presets WHERE path = ?", [(p,) for p in gone + todo])
+            self._con.executemany("DELETE FROM preset_process WHERE path = ?", [(p,) for p in gone + todo])
+            self._con.executemany("INSERT INTO presets VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+            self._con.executemany("INSERT OR IGNORE INTO preset_process VALUES (?,?)", procs)
+        added = sum(p not in known for p in todo)
+        return {"added": added, "updated": len(todo) - added, "removed": len(gone), "total": len(seen)}
+
+    def search(self, root: Optional[str] = None, material: Optional[Iterable[str]] = None,
+               processes: Optional[Iterable[str]] = None, client: Optional[str] = None,
+               q_range: Optional[Tuple[float, float]] = None, max_steps: Optional[int] = None,
+               text: Optional[str] = None, limit: int = 500) -> pd.DataFrame:
+        # processes: preset moet álle gekozen processen bevatten
+        where, args = ["error IS NULL"], []
+        if root:
+            where.append("root = ?"); args.append(os.path.abspath(root))
+        material = list(material or [])
+        if material:
+            where.append(f"material IN ({','.join('?' * len(material))})"); args += material
+        if client:
+            where.append("client LIKE ?"); args.append(f"%{client}%")
+        if q_range:
+            where.append("Q BETWEEN ? AND ?"); args += [float(q_range[0]), float(q_range[1])]
+        if max_steps:
+            where.append("n_steps <= ?"); args.append(int(max_steps))
+        if text:
+            where.append("(name LIKE ? OR project LIKE ?)"); args += [f"%{text}%"] * 2
+        processes = list(processes or [])
+        if processes:
+            where.append(f"path IN (SELECT path FROM preset_process WHERE proces IN ({','.join('?' * len(processes))}) "
+                         "GROUP BY path HAVING COUNT(*) = ?)")
+            args += processes + [len(processes)]
+        q = f"SELECT {', '.join(LIST_COLS)} FROM presets WHERE {' AND '.join(where)} ORDER BY name LIMIT ?"
+        with self._lock:
+            return pd.read_sql_query(q, self._con, params=args + [int(limit)])
+
+    def facets(self, root: Optional[str] = None) -> dict:
+        # keuzelijsten voor de filters
+        cond, args = ("WHERE root = ?", [os.path.abspath(root)]) if root else ("", [])
+        c = self._con
+        with self._lock:
+            mats = [r[0] for r in c.execute(f"SELECT DISTINCT material FROM presets {cond} ORDER BY 1", args) if r[0]]
+            procs = [r[0] for r in c.execute("SELECT DISTINCT proces FROM preset_process WHERE path IN "
+                                             f"(SELECT path FROM presets {cond}) ORDER BY 1", args)]
+            qmin, qmax = c.execute(f"SELECT MIN(Q), MAX(Q) FROM presets {cond}", args).fetchone()
+        return {"material": mats, "processes": procs, "Q": (qmin or 0.0, qmax or 0.0)}
+
+def open_preset(path: str) -> Tuple[dict, pd.DataFrame, pd.DataFrame]:
+    # volledige preset pas bij openen: (ruwe JSON, routing_df, bom_df)
+    data = load_preset(path)
+    routing, bom = preset_frames(data)
+    return data, routing, bom
@@ -0,0 +1,37 @@
+# utils/presets.py — presets (JSON) laden en omzetten naar routing/BOM-DataFrames
+# Preset-BOM's gebruiken Item/UnitCost_eur/Qty_per_parent; de rekenkern verwacht BOM_COLS.
+
+import json
+import os
+from typing import Tuple
+
+import pandas as pd
+
+from utils.constants import ROUTING_COLS, BOM_COLS
+
+PRESET_BOM_RENAME = {"Item": "Part", "UnitCost_eur": "UnitPrice", "Qty_per_parent": "Qty"}
+
+def load_preset(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def resolve_preset_path(ref: str, preset_dir: str = "presets") -> str:
+    # "duplex_lasframe", "duplex_lasframe.json" of een volledig pad
+    for cand in (ref, ref + ".json", os.path.join(preset_dir, ref), os.path.join(preset_dir, ref + ".json")):
+        if os.path.isfile(cand):
+            return cand
+    raise FileNotFoundError(f"Preset '{ref}' niet gevonden (map: {preset_dir}).")
+
+def normalize_bom(bom: pd.DataFrame) -> pd.DataFrame:
+    bom = pd.DataFrame(bom).rename(columns=PRESET_BOM_RENAME)
+    if bom.empty:
+        return pd.DataFrame(columns=BOM_COLS)
+    if "Scrap_pct" not in bom:
+        bom["Scrap_pct"] = 0.0
+    return bom
+
+def preset_frames(preset: dict) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    routing = pd.DataFrame(preset.get("routing", []))
+    if routing.empty:
+        routing = pd.DataFrame(columns=ROUTING_COLS)
+    return routing, normalize_bom(preset.get("bom_buy", preset.get("bom", [])))
@@ -0,0 +1,101 @@
+# utils/pricestore.py — lokale prijshistorie (SQLite) voor OTK-surcharge, LME en FX
+# Elke opgehaalde waarde wordt met tijdstip en bron bewaard. Opvragen:
+#   - vers genoeg (leeftijd < max_age)  → direct uit de store, geen netwerk
+#   - anders live ophalen en opslaan; bij een fout (of offline) → laatste goede waarde
+# Pad via PRICE_DB (env) of data/prices.sqlite naast de app.
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+DEFAULT_DB = os.environ.get("PRICE_DB", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                      "data", "prices.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    series TEXT NOT NULL, key TEXT NOT NULL, value REAL NOT NULL, ts REAL NOT NULL, source TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_prices_series_ts ON prices (series, ts);
+CREATE INDEX IF NOT EXISTS ix_prices_series_key_ts ON prices (series, key, ts);
+"""
+
+class PriceStore:
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as con:
+            con.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # één verbinding per operatie: veilig vanuit Streamlit-threads
+        con = sqlite3.connect(self.path, timeout=10)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def record(self, series: str, values: Dict[str, float], source: str, ts: Optional[float] = None) -> float:
+        ts = time.time() if ts is None else float(ts)
+        with self._connect() as con:
+            con.executemany("INSERT INTO prices (series, key, value, ts, source) VALUES (?, ?, ?, ?, ?)",
+                            [(series, str(k), float(v), ts, source) for k, v in values.items()])
+        return ts
+
+    def latest(self, series: str) -> Optional[dict]:
+        # laatste opname van een reeks (alle keys van dat moment)
+        with self._connect() as con:
+            rows = con.execute("SELECT key, value, ts, source FROM prices WHERE series = ? AND ts = "
+                               "(SELECT MAX(ts) FROM prices WHERE series = ?)", (series, series)).fetchall()
+        if not rows:
+            return None
+        return {"values": {k: v for k, v, _, _ in rows}, "ts": rows[0][2], "source": rows[0][3]}
+
+    def history(self, series: str, key: Optional[str] = None, since: Optional[float] = None) -> pd.DataFrame:
+        q = "SELECT series, key, value, ts, source FROM prices WHERE series = ?"; args: list = [series]
+        if key is not None:
+            q += " AND key = ?"; args.append(key)
+        if since is not None:
+            q += " AND ts >= ?"; args.append(float(since))
+        with self._connect() as con:
+            df = pd.read_sql_query(q + " ORDER BY ts", con, params=args)
+        df["time"] = pd.to_datetime(df["ts"], unit="s")
+        return df
+
+def cached_fetch(store: PriceStore, series: str, fetch: Callable[[], Dict[str, float]], max_age: float,
+                 source: str, offline: bool = False) -> dict:
+    # → {"values", "ts", "source", "state"}; state: "store" (vers), "live", "stale" (laatste goede), "missing"
+    # offline: nooit netwerk; een verlopen waarde heet dan ook "stale"
+    last = store.latest(series)
+    if last is not None and time.time() - last["ts"] < max_age:
+        return {**last, "state": "store"}
+    if not offline:
+        try:
+            values = fetch()
+            if values:
+                return {"values": values, "ts": store.record(series, values, source), "source": source, "state": "live"}
+        except Exception as e:
+            if last is None:
+                return {"values": {}, "ts": None, "source": f"{source}: {e}", "state": "missing"}
+    if last is None:
+        return {"values": {}, "ts": None, "source": source, "state": "missing"}
+    return {**last, "state": "stale"}
+
+def fetch_all(store: PriceStore, feeds: Dict[str, Tuple[Callable[[], Dict[str, float]], float, str]],
+              offline: bool = False) -> Dict[str, dict]:
+    # alle reeksen tegelijk (thread per bron): wachttijd = traagste bron i.p.v. de som
+    if not feeds:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(feeds)) as ex:
+        futs = {k: ex.submit(cached_fetch, store, k, fn, max_age, source, offline)
+                for k, (fn, max_age, source) in feeds.items()}
+        return {k: f.result() for k, f in futs.items()}
+
+def feed_label(res: dict) -> str:
+    if res["ts"] is None:
+        return "geen waarde"
+    when = datetime.fromtimestamp(res["ts"]).strftime("%Y-%m-%d %H:%M")
+    return {"live": "live", "store": f"opgeslagen {when}", "stale": f"laatste bekende waarde {when}"}.get(res["state"], when)
@@ -0,0 +1,138 @@
+# utils/quantiles.py — streaming-kwantielen met begrensd geheugen (merging t-digest, gevectoriseerd per blok)
+# De schets houdt gesorteerde centroïden (gemiddelde, gewicht) bij. Per update worden de nieuwe waarden en de
+# bestaande centroïden samen gesorteerd en opnieuw gegroepeerd op de k-schaal k(q) = δ/(2π)·asin(2q − 1):
+# één centroïde beslaat hooguit één eenheid k, dus Δq ≤ 2π·√(q(1−q))/δ. Smal in de staarten (P95/P99 bijna
+# exact), breed rond de mediaan; ≈ δ/2 centroïden, los van het aantal samples.
+# Kwantielen: lineaire interpolatie tussen de centroïde-middens (min/max exact). Foutgrens per kwantiel:
+# rangfout ε = gewicht van de omliggende centroïden / n, in € als [Q(p − ε), Q(p + ε)].
+# Tot `exact` waarden blijft de schets ongecomprimeerd: kwantielen/histogram zijn dan exact gelijk aan
+# np.percentile/np.histogram (foutgrens 0), zodat kleine runs niet verschuiven t.o.v. de volledige samples.
+# Schetsen zijn samen te voegen (merge), dus ook per worker of per order op te bouwen.
+# Bewust zonder streamlit-import.
+
+import math
+from typing import Sequence, Tuple
+
+import numpy as np
+
+class QuantileSketch:
+    def __init__(self, delta: float = 500.0, exact: int = 4096):
+        self.delta = float(delta)
+        self.exact = int(exact)
+        self.is_exact = True  # nog alle waarden los (gewicht 1), gesorteerd in mean
+        self.mean = np.empty(0)
+        self.weight = np.empty(0)
+        self.n = 0.0
+        self.min, self.max = math.inf, -math.inf
+
+    def __len__(self):
+        return self.mean.size
+
+    def __fingerprint__(self) -> tuple:
+        # inhoud voor utils.cache.fingerprint (niet de identiteit); is_exact telt mee: zelfde arrays, andere interpolatie
+        return (self.delta, self.exact, self.is_exact, self.mean, self.weight, self.n, self.min, self.max)
+
+    @property
+    def nbytes(self) -> int:
+        return self.mean.nbytes + self.weight.nbytes
+
+    def update(self, x, weight=None) -> "QuantileSketch":
+        # één blok waarden (of centroïden met gewicht); NaN wordt overgeslagen
+        x = np.asarray(x, dtype=float).ravel()
+        w = np.ones(x.size) if weight is None else np.broadcast_to(np.asarray(weight, dtype=float), x.shape)
+        ok = ~np.isnan(x) & (w > 0)
+        x, w = x[ok], w[ok]
+        if not x.size:
+            return self
+        self.min, self.max = min(self.min, float(x.min())), max(self.max, float(x.max()))
+        m = np.concatenate([self.mean, x]); w = np.concatenate([self.weight, w])
+        order = np.argsort(m, kind="stable"); m, w = m[order], w[order]
+        cum = np.cumsum(w); n = cum[-1]
+        if self.is_exact and weight is None and m.size <= self.exact:
+            self.mean, self.weight, self.n = m, w, float(n)
+            return self
+        self.is_exact = False
+        # cluster-index = k-schaal van de linkerrand; aaneengesloten gelijke indices vormen één centroïde
+        left = np.clip((cum - w) / n, 0.0, 1.0)
+        k = np.floor(self.delta / (2.0 * math.pi) * np.arcsin(2.0 * left - 1.0))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        self.weight = np.add.reduceat(w, starts)
+        self.mean = np.add.reduceat(w * m, starts) / self.weight
+        self.n = float(n)
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.n:
+            lo, hi = self.min, self.max
+            self.update(other.mean, None if other.is_exact else other.weight)
+            self.min, self.max = min(lo, other.min), max(hi, other.max)
+        return self
+
+    def shifted(self, c: float) -> "QuantileSketch":
+        # kopie met alle waarden + c (bv. inkoopdelen/stuk achteraf bij de MC-kostprijs)
+        s = QuantileSketch(self.delta, self.exact)
+        s.mean, s.weight, s.n, s.is_exact = self.mean + c, self.weight.copy(), self.n, self.is_exact
+        s.min, s.max = self.min + c, self.max + c
+        return s
+
+    def _knots(self) -> Tuple[np.ndarray, np.ndarray]:
+        # (rangfractie, waarde): centroïde-middens, aangevuld met min op 0 en max op 1
+        mid = (np.cumsum(self.weight) - self.weight / 2.0) / self.n
+        return np.r_[0.0, mid, 1.0], np.r_[self.min, self.mean, self.max]
+
+    def quantile(self, p):
+        # p in [0, 1], scalair of array
+        if not self.n:
+            return np.full(np.shape(p), np.nan) if np.ndim(p) else math.nan
+        if self.is_exact:
+            out = np.quantile(self.mean, np.clip(p, 0.0, 1.0))
+        else:
+            q, v = self._knots()
+            out = np.interp(np.clip(p, 0.0, 1.0), q, v)
+        return out if np.ndim(p) else float(out)
+
+    def cdf(self, x):
+        if self.is_exact:
+            return np.searchsorted(self.mean, x, side="right") / max(self.n, 1.0)
+        q, v = self._knots()
+        return np.interp(x, v, q, left=0.0, right=1.0)
+
+    def rank_error(self, p):
+        # ε: gewichtsfractie van de twee centroïden rond p (0 als alles singleton is en p exact valt)
+        if not self.n:
+            return np.full(np.shape(p), np.nan) if np.ndim(p) else math.nan
+        if self.is_exact:
+            return np.zeros(np.shape(p)) if np.ndim(p) else 0.0
+        mid = (np.cumsum(self.weight) - self.weight / 2.0) / self.n
+        i = np.searchsorted(mid, p)
+        w = np.r_[0.0, self.weight, 0.0]
+        out = np.maximum(w[i], w[i + 1]) / self.n
+        return out if np.ndim(p) else float(out)
+
+    def bounds(self, p, z: float = 0.0):
+        # (ondergrens, bovengrens) van kwantiel p: schetsfout ε, met z > 0 verbreed met het
+        # verdelingsvrije steekproefinterval z·√(p(1−p)/n)
+        p = np.asarray(p, dtype=float)
+        h = self.rank_error(p) + (z * np.sqrt(p * (1.0 - p) / self.n) if z and self.n else 0.0)
+        return self.quantile(p - h), self.quantile(p + h)
+
+    def histogram(self, bins: int = 40) -> Tuple[np.ndarray, np.ndarray]:
+        # (counts, edges) zoals np.histogram, uit de geïnterpoleerde CDF
+        if not self.n:
+            return np.zeros(bins), np.linspace(0.0, 1.0, bins + 1)
+        if self.is_exact:
+            return np.histogram(self.mean, bins=bins)
+        hi = self.max if self.max > self.min else self.min + 1.0
+        edges = np.linspace(self.min, hi, bins + 1)
+        c = self.cdf(edges); c[0], c[-1] = 0.0, 1.0  # singleton op min/max: interp geeft daar het centroïde-midden
+        return self.n * np.diff(c), edges
+
+    def summary(self, ps: Sequence[float] = (0.5, 0.8, 0.95)) -> dict:
+        # {"P50": …, "P50_err": ±halve breedte van de foutgrens, …}
+        ps = np.asarray(ps, dtype=float)
+        q = self.quantile(ps); lo, hi = self.bounds(ps)
+        out = {}
+        for p, v, a, b in zip(ps, q, lo, hi):
+            name = f"P{100 * p:g}"
+            out[name] = float(v); out[f"{name}_err"] = float(max(b - v, v - a))
+        return out
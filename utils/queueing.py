@@ -0,0 +1,74 @@
+# utils/queueing.py — analytisch wachtrijmodel (M/G/c, benadering van Sakasegawa) voor snelle doorlooptijd-sweeps
+# Per stap een station met c = Parallel_machines machines. Achtergrondbelasting ρ₀ per proces (bezettingsgraad van
+# de werkplaats, bv. uit het orderboek) geldt bij de routing-batchgrootte; bij een andere batchgrootte B schaalt die
+# met de werkinhoud per stuk: ρ(B) = ρ₀ · (Setup/B + Cycle) / (Setup/B₀ + Cycle). Kleine batches → meer setups →
+# hogere ρ en lange wachtrijen; grote batches → lange bewerkingstijd per batch (de bekende U-curve).
+#   Wq   = E[S] · (ca² + cs²)/2 · ρ^(√(2(c+1)) − 1) / (c · (1 − ρ))        (ρ ≥ 1 → ∞)
+#   stap = Queue_days + Wq + ⌈batches/c⌉ · bewerkingstijd per batch van deze order
+#   WIP  = λ·(Wq + E[S]) batches (Little), λ = ρ·c / E[S]
+# Doorlooptijd = langste weg door de routing (keten of Parent_step-DAG). Alles gebroadcast over
+# (batchfactoren × aantallen × stappen): één sweep van honderden punten kost microseconden per punt.
+# Bewust zonder streamlit-import.
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.kernel import eff_input_qty
+from utils.loading import step_offsets
+
+QUEUE_COLS = ["Step", "Proces", "Machines", "Batch", "Util", "Wait_days", "Flow_days", "WIP_batches"]
+
+def mgc_wait(rho, c, service, ca2: float = 1.0, cs2: float = 0.5) -> np.ndarray:
+    # wachttijd in de rij (zelfde eenheid als service); broadcast over alle argumenten
+    rho = np.asarray(rho, dtype=float); c = np.asarray(c, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        wq = service * (ca2 + cs2) / 2.0 * rho ** (np.sqrt(2.0 * (c + 1.0)) - 1.0) / (c * (1.0 - rho))
+    return np.where(rho < 1.0, np.maximum(wq, 0.0), np.inf)
+
+def step_utilisation(cols: Dict[str, np.ndarray], util: Dict[str, float], default: float) -> np.ndarray:
+    # achtergrond-ρ₀ per stap uit een {proces: bezetting}-dict (fractie)
+    return np.array([float(util.get(p, default)) for p in cols["Proces"].astype(str)])
+
+def lead_time_sweep(cols: Dict[str, np.ndarray], Qs, batch_factors: Sequence[float] = (1.0,),
+                    util: Optional[Dict[str, float]] = None, default_util: float = 0.75, hours_per_day: float = 8.0,
+                    ca2: float = 1.0, cs2: float = 0.5) -> dict:
+    # → {"Q", "Batch_factor", "Lead_days" (factoren × Q), "Wait_days"/"Flow_days" (factoren × Q × stappen),
+    #    "Util"/"WIP_batches"/"Batch" (factoren × stappen)}
+    Qs = np.atleast_1d(np.asarray(Qs, dtype=float))
+    fac = np.atleast_1d(np.asarray(batch_factors, dtype=float))
+    n = len(cols["Proces"])
+    if n == 0:
+        z = np.zeros((fac.size, Qs.size))
+        return {"Q": Qs, "Batch_factor": fac, "Lead_days": z, "Wait_days": z[..., None], "Flow_days": z[..., None],
+                "Util": np.zeros((fac.size, 0)), "WIP_batches": np.zeros((fac.size, 0)), "Batch": np.zeros((fac.size, 0))}
+    day_min = 60.0 * hours_per_day
+    c = cols["Parallel_machines"]; setup, cycle = cols["Setup_min"], cols["Cycle_min"]
+    B0 = cols["Batch_size"]
+    B = np.maximum(1.0, np.round(B0 * fac[:, None]))                       # (F × S)
+    per_piece = lambda b: setup / b + cycle
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = step_utilisation(cols, util or {}, default_util) * np.where(per_piece(B0) > 0, per_piece(B) / per_piece(B0), 1.0)
+    service = setup + cycle * B                                              # achtergrondbatch (min)
+    wq = mgc_wait(rho, c, service, ca2, cs2)                                 # (F × S) min
+    with np.errstate(divide="ignore", invalid="ignore"):
+        wip = np.where(service > 0, rho * c / service * (wq + service), 0.0)
+    # deze order: input per stap lineair in Q; eigen batches ⌈batches/c⌉ rondes van gemiddeld qty/batches stuks
+    qty = Qs[:, None] * eff_input_qty(cols["Scrap_pct"], 1.0, cols["Qty_per_parent"], cols["Plan"])  # (Q × S)
+    nb = np.maximum(1.0, np.ceil(qty[None] / B[:, None, :]))                 # (F × Q × S)
+    own = np.ceil(nb / c) * (setup + cycle * qty[None] / nb)
+    wait = wq[:, None, :] / day_min
+    flow = cols["Queue_days"] + wait + own / day_min
+    lead = step_offsets(cols, flow).max(axis=-1)
+    return {"Q": Qs, "Batch_factor": fac, "Lead_days": lead, "Wait_days": wait, "Flow_days": flow,
+            "Util": rho, "WIP_batches": wip, "Batch": B}
+
+def queue_table(cols: Dict[str, np.ndarray], Q: float, **kw) -> pd.DataFrame:
+    # per stap bij één aantal en de routing-batchgrootte
+    r = lead_time_sweep(cols, [Q], (1.0,), **kw)
+    if len(cols["Proces"]) == 0:
+        return pd.DataFrame(columns=QUEUE_COLS)
+    return pd.DataFrame({"Step": cols["Step"], "Proces": cols["Proces"], "Machines": cols["Parallel_machines"],
+                         "Batch": r["Batch"][0], "Util": r["Util"][0], "Wait_days": r["Wait_days"][0, 0],
+                         "Flow_days": r["Flow_days"][0, 0], "WIP_batches": r["WIP_batches"][0]}, columns=QUEUE_COLS)
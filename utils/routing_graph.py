@@ -0,0 +1,74 @@
+# utils/routing_graph.py — routing als DAG (parallelle takken die in een samenstelling uitkomen)
+# Optionele kolom "Parent_step": de Step waar de output van deze stap in gaat ("30" of "30;40").
+# Zonder Parent_step blijft de routing een lineaire keten op volgorde van Step.
+# Hoeveelheden worden per topologisch niveau (niet per rij) vectorieel doorgerekend:
+#   input[i] = Qty_per_parent[i] · Σ input[parent] / (1 − Scrap_pct[i]),  eindproduct: parent-input = Q
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+Plan = List[Tuple[np.ndarray, np.ndarray, np.ndarray]]  # per niveau: (nodes, positie-in-nodes per edge, parent per edge)
+
+def parse_parent_edges(parent_step: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    # → (child-positie, parent-Step) per edge; lege cellen zijn eindstappen
+    s = pd.Series(parent_step.to_numpy(), index=np.arange(len(parent_step)))
+    tok = s.astype(str).str.replace(",", ";").str.split(";").explode().str.strip()
+    val = pd.to_numeric(tok, errors="coerce")
+    ok = val.notna().to_numpy()
+    return tok.index.to_numpy()[ok].astype(int), val.to_numpy(dtype=float)[ok]
+
+def routing_plan(steps: np.ndarray, parent_step: Optional[pd.Series]) -> Optional[Plan]:
+    if parent_step is None:
+        return None
+    child, parent_val = parse_parent_edges(parent_step)
+    if child.size == 0:
+        return None
+    n = len(steps)
+    if np.unique(steps).size < n:
+        raise ValueError("Parent_step vereist unieke Step-nummers.")
+    order = np.argsort(steps, kind="stable")
+    pos = np.searchsorted(steps[order], parent_val).clip(0, n - 1)
+    parent = order[pos]
+    bad = steps[parent] != parent_val
+    if bad.any():
+        raise ValueError(f"Parent_step verwijst naar onbekende Step: {sorted(set(parent_val[bad].tolist()))}")
+    return topo_levels(n, child, parent, "Routing bevat een cyclus in Parent_step.")
+
+def topo_levels(n: int, child: np.ndarray, parent: np.ndarray, cycle_msg: str = "Graaf bevat een cyclus.") -> Plan:
+    # Kahn, niveau voor niveau: een knoop is aan de beurt als al zijn parents berekend zijn
+    remaining = np.bincount(child, minlength=n)
+    frontier = np.flatnonzero(remaining == 0)
+    plan: Plan = []; done = 0
+    while frontier.size:
+        in_level = np.zeros(n, dtype=bool); in_level[frontier] = True
+        e = np.flatnonzero(in_level[child])
+        local = np.full(n, -1); local[frontier] = np.arange(frontier.size)
+        plan.append((frontier, local[child[e]], parent[e]))
+        done += frontier.size
+        feeds = np.zeros(n, dtype=bool); feeds[frontier] = True
+        fe = np.flatnonzero(feeds[parent])
+        np.subtract.at(remaining, child[fe], 1)
+        nxt = np.zeros(n, dtype=bool); nxt[child[fe]] = True
+        frontier = np.flatnonzero(nxt & (remaining == 0))
+    if done < n:
+        raise ValueError(cycle_msg)
+    return plan
+
+def dag_input_qty(good: np.ndarray, qpp: np.ndarray, Q: float, plan: Plan) -> np.ndarray:
+    # good/qpp mogen (iters × steps) zijn; niveaus broadcasten over de laatste as
+    good = np.asarray(good, dtype=float)
+    inp = np.zeros(np.broadcast_shapes(good.shape, np.shape(qpp)))
+    lead = (slice(None),) * (inp.ndim - 1)
+    qpp = np.broadcast_to(qpp, inp.shape)
+    good = np.broadcast_to(good, inp.shape)
+    for nodes, local, parent in plan:
+        need = np.zeros(inp.shape[:-1] + (nodes.size,))
+        if parent.size:
+            np.add.at(need, lead + (local,), inp[lead + (parent,)])
+        # eindstappen (geen parent) leveren Q stuks eindproduct
+        roots = np.bincount(local, minlength=nodes.size) == 0
+        need[lead + (roots,)] = float(Q)
+        inp[lead + (nodes,)] = need * qpp[lead + (nodes,)] / good[lead + (nodes,)]
+    return inp
@@ -0,0 +1,148 @@
+# utils/runstore.py — run-historie (SQLite): elke calculatie met invoer, resultaat, kosten per stap en MC-percentielen
+# Geïndexeerd op project, materiaal, tijd en proces, zodat vragen als "kostprijs/stuk van Duplex-frames over het
+# afgelopen jaar" of "eerdere offertes voor dit project" direct uit de store komen, zonder herberekening.
+# run_id = fingerprint van de invoer + dag: dezelfde berekening op dezelfde dag wordt bijgewerkt, niet verdubbeld.
+# Pad via RUN_DB (env) of data/runs.sqlite naast de app.
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DB = os.environ.get("RUN_DB", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                    "data", "runs.sqlite"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY, ts REAL NOT NULL, day TEXT NOT NULL, project TEXT, material TEXT, Q INTEGER,
+    net_kg REAL, mat_eurkg REAL, price_source TEXT, mat_pc REAL, conv_total REAL, lean_total REAL, buy_total REAL,
+    unit_cost REAL, sales_pc REAL, p50 REAL, p80 REAL, p95 REAL, params TEXT
+);
+CREATE TABLE IF NOT EXISTS run_steps (
+    run_id TEXT NOT NULL, step REAL, process TEXT, qty REAL, batches REAL, machine_min REAL, labor_min REAL,
+    cost_machine REAL, cost_labor REAL, cost_energy REAL, cost_lean REAL, cost_total REAL
+);
+CREATE INDEX IF NOT EXISTS ix_runs_project_ts ON runs (project, ts);
+CREATE INDEX IF NOT EXISTS ix_runs_material_ts ON runs (material, ts);
+CREATE INDEX IF NOT EXISTS ix_runs_ts ON runs (ts);
+CREATE INDEX IF NOT EXISTS ix_steps_run ON run_steps (run_id);
+CREATE INDEX IF NOT EXISTS ix_steps_process ON run_steps (process, run_id);
+"""
+RUN_COLS = ["run_id", "ts", "day", "project", "material", "Q", "net_kg", "mat_eurkg", "price_source", "mat_pc",
+            "conv_total", "lean_total", "buy_total", "unit_cost", "sales_pc", "p50", "p80", "p95", "params"]
+STEP_COLS = ["run_id", "step", "process", "qty", "batches", "machine_min", "labor_min", "cost_machine",
+             "cost_labor", "cost_energy", "cost_lean", "cost_total"]
+# kernel-stapvelden (utils/kernel.STEP_FIELDS) → run_steps-kolommen
+STEP_MAP = {"Step": "step", "Proces": "process", "Eff_Input_Qty": "qty", "Batches": "batches",
+            "Machine_min": "machine_min", "Labor_min": "labor_min", "Cost_Machine": "cost_machine",
+            "Cost_Labor": "cost_labor", "Cost_Energy": "cost_energy", "Cost_Lean": "cost_lean",
+            "Cost_TotalStep": "cost_total"}
+PERIODS = {"day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m", "year": "%Y"}
+
+def _ts(when: Union[None, float, str, datetime]) -> Optional[float]:
+    # epoch-seconden of alles wat pd.Timestamp begrijpt ("2025-10-01")
+    if when is None or isinstance(when, (int, float)):
+        return when
+    return pd.Timestamp(when).timestamp()
+
+def _match(col: str, value: str) -> tuple:
+    # "%" in de waarde → LIKE, anders gelijkheid (gebruikt de index)
+    return (f"{col} LIKE ?", value) if "%" in value else (f"{col} = ?", value)
+
+class RunStore:
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as con:
+            con.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # één verbinding per operatie: veilig vanuit Streamlit-threads
+        con = sqlite3.connect(self.path, timeout=10)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def record(self, run_key: str, project: str, material: str, Q: int, net_kg: float, mat_eurkg: float,
+               price_source: str, res: dict, sales_pc: Optional[float] = None, mc: Optional[dict] = None,
+               params: Optional[dict] = None, ts: Optional[float] = None) -> str:
+        # res = cost_kernel-resultaat (incl. "steps"); mc = {"P50", "P80", "P95"} of None
+        ts = time.time() if ts is None else float(ts)
+        day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+        run_id = f"{run_key}-{day}"
+        mc = mc or {}
+        row = (run_id, ts, day, project, material, int(Q), float(net_kg), float(mat_eurkg), price_source,
+               float(res["mat_pc"]), float(res["conv_total"]), float(res["lean_total"]), float(res["buy_total"]),
+               float(res["total_pc"]), None if sales_pc is None else float(sales_pc),
+               mc.get("P50"), mc.get("P80"), mc.get("P95"), json.dumps(params or {}, default=str))
+        steps = res.get("steps")
+        step_rows = []
+        if steps is not None and len(steps):
+            cols = [np.asarray(steps[f]).tolist() for f in STEP_MAP]
+            step_rows = [(run_id,) + r for r in zip(*cols)]
+        with self._connect() as con:
+            # opnieuw dezelfde run: tijdstip bijwerken, percentielen alleen overschrijven als ze er nu zijn
+            con.execute(f"INSERT INTO runs VALUES ({','.join('?' * len(RUN_COLS))}) ON CONFLICT(run_id) DO UPDATE SET "
+                        "ts = excluded.ts, price_source = excluded.price_source, "
+                        "p50 = COALESCE(excluded.p50, p50), p80 = COALESCE(excluded.p80, p80), "
+                        "p95 = COALESCE(excluded.p95, p95)", row)
+            con.execute("DELETE FROM run_steps WHERE run_id = ?", (run_id,))
+            con.executemany(f"INSERT INTO run_steps VALUES ({','.join('?' * len(STEP_COLS))})", step_rows)
+        return run_id
+
+    @staticmethod
+    def _where(project: Optional[str], material: Optional[str], since, until, alias: str = "") -> tuple:
+        # → (lijst condities, argumenten); alias = tabelprefix bij joins ("r.")
+        where, args = [], []
+        for col, v in (("project", project), ("material", material)):
+            if v:
+                cond, a = _match(alias + col, v); where.append(cond); args.append(a)
+        if since is not None:
+            where.append(f"{alias}ts >= ?"); args.append(_ts(since))
+        if until is not None:
+            where.append(f"{alias}ts < ?"); args.append(_ts(until))
+        return where, args
+
+    def runs(self, project: Optional[str] = None, material: Optional[str] = None, since=None, until=None,
+             limit: int = 200) -> pd.DataFrame:
+        # meest recente eerst
+        where, args = self._where(project, material, since, until)
+        cond = (" WHERE " + " AND ".join(where)) if where else ""
+        with self._connect() as con:
+            df = pd.read_sql_query(f"SELECT {', '.join(RUN_COLS)} FROM runs{cond} ORDER BY ts DESC LIMIT ?",
+                                   con, params=args + [int(limit)])
+        df["time"] = pd.to_datetime(df["ts"], unit="s")
+        return df
+
+    def steps(self, run_id: str) -> pd.DataFrame:
+        with self._connect() as con:
+            return pd.read_sql_query(f"SELECT {', '.join(STEP_COLS)} FROM run_steps WHERE run_id = ? ORDER BY step",
+                                     con, params=[run_id])
+
+    def trend(self, project: Optional[str] = None, material: Optional[str] = None, since=None, until=None,
+              period: str = "month") -> pd.DataFrame:
+        # kostprijs/stuk per periode: aantal runs, gemiddelde, min, max (en gemiddelde P95 waar bekend)
+        where, args = self._where(project, material, since, until)
+        cond = (" WHERE " + " AND ".join(where)) if where else ""
+        q = (f"SELECT strftime('{PERIODS[period]}', ts, 'unixepoch', 'localtime') AS period, COUNT(*) AS runs, "
+             "AVG(unit_cost) AS unit_cost, MIN(unit_cost) AS unit_cost_min, MAX(unit_cost) AS unit_cost_max, "
+             f"AVG(p95) AS p95 FROM runs{cond} GROUP BY period ORDER BY period")
+        with self._connect() as con:
+            return pd.read_sql_query(q, con, params=args)
+
+    def process_trend(self, process: str, project: Optional[str] = None, material: Optional[str] = None,
+                      since=None, until=None, period: str = "month") -> pd.DataFrame:
+        # stapkosten van één proces per periode (via ix_steps_process)
+        where, args = self._where(project, material, since, until, alias="r.")
+        q = (f"SELECT strftime('{PERIODS[period]}', r.ts, 'unixepoch', 'localtime') AS period, COUNT(*) AS steps, "
+             "SUM(s.cost_total) / COUNT(DISTINCT r.run_id) AS cost_per_run, SUM(s.machine_min) AS machine_min "
+             "FROM run_steps s JOIN runs r ON r.run_id = s.run_id "
+             f"WHERE {' AND '.join(['s.process = ?'] + where)} "
+             "GROUP BY period ORDER BY period")
+        with self._connect() as con:
+            return pd.read_sql_query(q, con, params=[process] + args)
@@ -0,0 +1,85 @@
+# utils/sensitivity.py — tornado-analyse: elke kostprijs-driver omhoog/omlaag, alle scenario's gebatcht door step_costs
+# Drivers: materiaal €/kg, netto kg, arbeid €/u, energie €/kWh, machinetarief per proces en per stap Cycle/Setup/Scrap.
+# Relatieve verstoring ±rel (default 10%); Scrap absoluut ±scrap_abs (procentpunten), want 0% relatief blijft 0%.
+# Scenario's = rijen (basis + 2 per driver); blokken van (rijen × stappen) ≤ block_cells gaan in één kernel-aanroep,
+# zodat ook routings met honderden stappen (≈ 6·stappen scenario's) vlak in geheugen blijven.
+# Bewust zonder streamlit-import.
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from utils.kernel import step_costs
+
+SENS_COLS = ["Driver", "Group", "Base", "Low", "High", "Cost_low", "Cost_high", "Swing", "Swing_pct"]
+# driver-soorten; globale drivers eerst, daarna per proces / per stap
+MAT, NETKG, LABOR, ENERGY, RATE, CYCLE, SETUP, SCRAP = range(8)
+GROUPS = {MAT: "Materiaal", NETKG: "Materiaal", LABOR: "Tarief", ENERGY: "Tarief", RATE: "Tarief",
+          CYCLE: "Cyclus", SETUP: "Setup", SCRAP: "Scrap"}
+
+def driver_list(cols: Dict[str, np.ndarray], machine_rates: Dict[str, float]) -> pd.DataFrame:
+    # één regel per driver: naam, soort, index (proces- of stapnummer in cols-volgorde)
+    procs = np.unique(cols["Proces"].astype(str))
+    steps = [f"{s:g} {p}" for s, p in zip(cols["Step"], cols["Proces"])]
+    rows = [("Materiaal €/kg", MAT, 0), ("Netto kg", NETKG, 0), ("Arbeid €/u", LABOR, 0), ("Energie €/kWh", ENERGY, 0)]
+    rows += [(f"Machinetarief {p}", RATE, i) for i, p in enumerate(procs) if p in machine_rates]
+    for kind, label in ((CYCLE, "Cyclus"), (SETUP, "Setup"), (SCRAP, "Scrap")):
+        rows += [(f"{label} {s}", kind, i) for i, s in enumerate(steps)]
+    return pd.DataFrame(rows, columns=["Driver", "Kind", "Index"])
+
+def sensitivity(cols: Dict[str, np.ndarray], buy_pc: float, Q: int, netkg: float, mat_price: float,
+                energy_eur_kwh: float, labor_rate: float, machine_rates: Dict[str, float],
+                storage_days: float = 0.0, storage_cost: float = 0.0, km: float = 0.0, eur_km: float = 0.0,
+                rework: float = 0.0, rework_min: float = 0.0, rel: float = 0.10, scrap_abs: float = 0.01,
+                block_cells: int = 1 << 20) -> pd.DataFrame:
+    # → SENS_COLS, gesorteerd op swing (|kostprijs hoog − laag|), grootste eerst; rij "Basis" niet inbegrepen
+    drv = driver_list(cols, machine_rates)
+    kind, idx = drv["Kind"].to_numpy(), drv["Index"].to_numpy()
+    n = len(cols["Proces"]); K = len(drv)
+    procs, proc_of_step = np.unique(cols["Proces"].astype(str), return_inverse=True)
+    has_rate = np.array([p in machine_rates for p in procs])
+    base_rate = np.array([float(machine_rates.get(p, 0.0)) for p in procs])
+    base = {MAT: mat_price, NETKG: netkg, LABOR: labor_rate, ENERGY: energy_eur_kwh}
+    base_val = np.array([base[k] if k < RATE else base_rate[i] if k == RATE else
+                         cols[{CYCLE: "Cycle_min", SETUP: "Setup_min", SCRAP: "Scrap_pct"}[k]][i]
+                         for k, i in zip(kind, idx)], dtype=float)
+    low = np.where(kind == SCRAP, np.maximum(0.0, base_val - scrap_abs), base_val * (1.0 - rel))
+    high = np.where(kind == SCRAP, np.minimum(0.99, base_val + scrap_abs), base_val * (1.0 + rel))
+
+    # scenario-rijen: 0 = basis, 2k+1 = driver k laag, 2k+2 = driver k hoog
+    R = 2 * K + 1
+    r_kind = np.concatenate([[-1], np.repeat(kind, 2)]); r_idx = np.concatenate([[0], np.repeat(idx, 2)])
+    r_val = np.concatenate([[np.nan], np.column_stack([low, high]).ravel()])
+    out = np.empty(R)
+    rows = max(1, block_cells // max(1, n))
+    for start in range(0, R, rows):
+        sl = slice(start, min(R, start + rows)); m = sl.stop - sl.start
+        k, i, v = r_kind[sl], r_idx[sl], r_val[sl]
+        pick = lambda kk: np.flatnonzero(k == kk)
+        glob = {kk: np.full(m, float(base[kk])) for kk in base}
+        for kk in base:
+            glob[kk][pick(kk)] = v[pick(kk)]
+        rate_p = np.tile(base_rate, (m, 1)); r = pick(RATE); rate_p[r, i[r]] = v[r]
+        # processen zonder machinetarief rekenen met het arbeidstarief (zoals machine_rate_array)
+        rate_p = np.where(has_rate, rate_p, glob[LABOR][:, None])
+        c = dict(cols)
+        cycle = np.tile(cols["Cycle_min"], (m, 1)); r = pick(CYCLE); cycle[r, i[r]] = v[r]
+        setup = np.tile(cols["Setup_min"], (m, 1)); r = pick(SETUP); setup[r, i[r]] = v[r]
+        scrap = np.tile(cols["Scrap_pct"], (m, 1)); r = pick(SCRAP); scrap[r, i[r]] = v[r]
+        c["Setup_min"] = setup
+        conv = lean = 0.0
+        if n:
+            s = step_costs(c, Q, glob[ENERGY][:, None], glob[LABOR][:, None], rate_p[:, proc_of_step],
+                           storage_days, storage_cost, km, eur_km, rework, rework_min, cycle=cycle, scrap=scrap)
+            conv = (s["Cost_Machine"] + s["Cost_Labor"] + s["Cost_Energy"]).sum(axis=1)
+            lean = s["Cost_Lean"].sum(axis=1)
+        out[sl] = (glob[NETKG] * glob[MAT] * Q + conv + lean + buy_pc * Q) / Q
+
+    base_pc = out[0]; c_low, c_high = out[1::2], out[2::2]
+    swing = np.abs(c_high - c_low)
+    df = pd.DataFrame({"Driver": drv["Driver"], "Group": [GROUPS[k] for k in kind], "Base": base_val, "Low": low,
+                       "High": high, "Cost_low": c_low, "Cost_high": c_high, "Swing": swing,
+                       "Swing_pct": swing / base_pc if base_pc else np.nan}, columns=SENS_COLS)
+    df.attrs["base_pc"] = float(base_pc)
+    return df.sort_values("Swing", ascending=False, kind="stable", ignore_index=True)